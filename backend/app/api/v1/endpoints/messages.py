@@ -1,21 +1,24 @@
 """
 消息相关端点
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from app.core.database import get_db
+from app.core.redis import get_redis
 from app.core.response import success_response, error_response
-from app.core.security import get_current_user
+from app.core.crud import InvalidCursorError
+from app.core.security import get_current_user, get_current_admin
 from app.models.user import User
 from app.services.message_service import (
-    template_message, internal_message, message_service
+    template_message, internal_message, message_service, message_log, unread_counter
 )
 from app.schemas.message import (
     TemplateMessageCreate, TemplateMessageUpdate,
-    InternalMessageCreate, SendMessageRequest, SmsSendRequest
+    InternalMessageCreate, InternalMessageBroadcast, SendMessageRequest, SmsSendRequest
 )
+from app.tasks import message_broadcast
 
 router = APIRouter()
 
@@ -54,15 +57,16 @@ async def get_internal_messages(
 @router.get("/internal/unread-count")
 async def get_unread_count(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
-    获取未读消息数量
+    获取未读消息数量（读 Redis 计数器，未命中时回源数据库）
 
     Returns:
         dict: 未读消息数量
     """
-    count = await internal_message.get_unread_count(db, current_user.id)
+    count = await unread_counter.get(redis, db, current_user.id)
 
     return success_response(data={"unread_count": count})
 
@@ -71,7 +75,8 @@ async def get_unread_count(
 async def mark_message_read(
     message_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     标记消息为已读
@@ -82,7 +87,7 @@ async def mark_message_read(
     Returns:
         dict: 操作结果
     """
-    message = await internal_message.mark_as_read(db, message_id, current_user.id)
+    message = await internal_message.mark_as_read(db, message_id, current_user.id, redis=redis)
     if not message:
         return error_response(message="消息不存在")
 
@@ -92,7 +97,8 @@ async def mark_message_read(
 @router.post("/internal/read-all")
 async def mark_all_read(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     标记所有消息为已读
@@ -100,7 +106,7 @@ async def mark_all_read(
     Returns:
         dict: 操作结果
     """
-    count = await internal_message.mark_all_read(db, current_user.id)
+    count = await internal_message.mark_all_read(db, current_user.id, redis=redis)
 
     return success_response(
         data={"marked_count": count},
@@ -112,7 +118,8 @@ async def mark_all_read(
 async def delete_message(
     message_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     删除站内消息
@@ -125,6 +132,7 @@ async def delete_message(
     """
     # 检查消息是否属于当前用户
     from app.models.message import InternalMessage
+    from sqlalchemy import select
     result = await db.execute(
         select(InternalMessage).where(
             InternalMessage.id == message_id,
@@ -135,7 +143,10 @@ async def delete_message(
     if not message:
         return error_response(message="消息不存在或无权操作")
 
+    was_unread = not message.is_read
     await internal_message.delete(db, id=message_id)
+    if was_unread:
+        await unread_counter.incr(redis, current_user.id, -1)
 
     return success_response(message="删除成功")
 
@@ -278,7 +289,7 @@ async def send_message(
     if not success:
         return error_response(message="发送失败")
 
-    return success_response(message="发送成功")
+    return success_response(message="已加入发送队列")
 
 
 @router.post("/sms/send")
@@ -310,7 +321,7 @@ async def send_sms(
     if not success:
         return error_response(message="短信发送失败")
 
-    return success_response(message="短信发送成功")
+    return success_response(message="短信已加入发送队列")
 
 
 def generate_sms_content(template_code: str, params: Optional[dict]) -> str:
@@ -344,7 +355,8 @@ def generate_sms_content(template_code: str, params: Optional[dict]) -> str:
 async def create_internal_message(
     message_data: dict,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     创建站内消息（管理员）
@@ -364,18 +376,66 @@ async def create_internal_message(
         message_schema.content,
         message_schema.message_type,
         message_schema.scene_type,
-        message_schema.scene_id
+        message_schema.scene_id,
+        redis=redis
     )
 
     return success_response(data=message, message="站内消息创建成功")
 
 
+@router.post("/internal/broadcast")
+async def broadcast_internal_message(
+    request_data: InternalMessageBroadcast,
+    background_tasks: BackgroundTasks,
+    current_admin: dict = Depends(get_current_admin),
+    redis=Depends(get_redis)
+):
+    """
+    群发站内消息（管理员）
+
+    后台分批写入，立即返回任务ID，用 GET /internal/broadcast/{job_id} 查询进度
+
+    Args:
+        request_data: 群发内容及接收用户（为空时发给所有用户）
+
+    Returns:
+        dict: 任务ID
+    """
+    job_id = await message_broadcast.create_job(redis)
+    background_tasks.add_task(message_broadcast.run, job_id, request_data)
+
+    return success_response(data={"job_id": job_id}, message="群发任务已提交")
+
+
+@router.get("/internal/broadcast/{job_id}")
+async def get_broadcast_progress(
+    job_id: str,
+    current_admin: dict = Depends(get_current_admin),
+    redis=Depends(get_redis)
+):
+    """
+    查询群发进度（管理员）
+
+    Args:
+        job_id: 任务ID
+
+    Returns:
+        dict: status/total/sent 等进度信息
+    """
+    progress = await message_broadcast.get_progress(redis, job_id)
+    if progress is None:
+        return error_response(code=404, message="群发任务不存在或已过期")
+
+    return success_response(data=progress)
+
+
 @router.get("/logs")
 async def get_message_logs(
     user_id: Optional[int] = Query(None, description="用户ID"),
     message_type: Optional[int] = Query(None, description="消息类型"),
     skip: int = Query(0, ge=0, description="跳过数量"),
     limit: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标（传入后按游标分页，首页传空字符串）"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -387,37 +447,35 @@ async def get_message_logs(
         message_type: 消息类型
         skip: 跳过数量
         limit: 每页数量
+        cursor: 上一页返回的 next_cursor；传入时忽略 skip，深分页不随偏移变慢
 
     Returns:
         dict: 消息日志列表
     """
-    from app.models.message import MessageLog
-    from sqlalchemy import select, desc
-
-    query = select(MessageLog)
-
-    if user_id:
-        query = query.where(MessageLog.user_id == user_id)
-    if message_type:
-        query = query.where(MessageLog.message_type == message_type)
+    if cursor is not None:
+        try:
+            page = await message_log.get_logs_cursor(
+                db, user_id=user_id, message_type=message_type, cursor=cursor, limit=limit
+            )
+        except InvalidCursorError as e:
+            return error_response(code=400, message=str(e))
+        return success_response(
+            data={
+                "items": page.items,
+                "limit": limit,
+                "next_cursor": page.next_cursor,
+                "has_more": page.has_more
+            }
+        )
 
-    # 获取总数
-    total_query = select(MessageLog.id).where(
-        MessageLog.user_id == user_id if user_id else True,
-        MessageLog.message_type == message_type if message_type else True
+    page = await message_log.get_logs(
+        db, user_id=user_id, message_type=message_type, skip=skip, limit=limit
     )
-    total = (await db.execute(total_query)).scalar()
-
-    # 分页并按时间倒序
-    query = query.order_by(desc(MessageLog.created_at))
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    items = result.scalars().all()
 
     return success_response(
         data={
-            "items": items,
-            "total": total,
+            "items": page.items,
+            "total": page.total,
             "skip": skip,
             "limit": limit
         }
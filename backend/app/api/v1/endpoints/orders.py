@@ -4,21 +4,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
+from sqlalchemy.orm import selectinload
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Tuple
 import uuid
-import random
 
-from app.core.database import get_db
-from app.core.response import success_response, error_response
-from app.services.order_service import order, order_item, order_log
+from app.core.database import get_db, transaction
+from app.core.redis import get_redis
+from app.core.response import success_response, error_response, page_data, cursor_page_data, ApiResponse, PageData
+from app.core.crud import InvalidCursorError
+from app.core.security import get_current_admin
+from app.services.order_service import order, order_item, order_log, can_transition, BULK_TARGET_STATUSES
 from app.services.product_service import product as product_service
+from app.services.inventory_service import inventory, InsufficientStockError
+from app.services.flash_stock_service import flash_stock, FlashStockReservationError
+from app.services.order_no_service import order_no_generator
 from app.services.delivery_service import delivery_zone
 from app.services.points_service import point_rule
 from app.models.order import Order
 from app.models.product import Product
-from app.schemas.order import OrderCreate, OrderItemCreate, OrderUpdate, OrderDetailResponse, OrderResponse
+from app.schemas.order import (
+    OrderCreate, OrderItemCreate, OrderUpdate, OrderDetailResponse, OrderResponse,
+    OrderItemResponse, OrderLogResponse, OrderListItem, OrderDetailData
+)
 
 router = APIRouter()
 
@@ -54,6 +62,13 @@ class OrderUpdateStatusRequest(BaseModel):
     remark: Optional[str] = None
 
 
+class OrderBulkStatusRequest(BaseModel):
+    """批量更新订单状态请求"""
+    order_ids: List[int] = Field(..., min_length=1, max_length=1000, description="订单ID列表")
+    status: str
+    remark: Optional[str] = None
+
+
 class OrderRefundRequest(BaseModel):
     """用户申请退款"""
     reason: str
@@ -83,10 +98,11 @@ async def preview_order(
     if request.delivery_type == 2 and not request.pickup_point_id:
         return error_response(message="自提类型需选择自提点")
 
-    # 2. 计算商品金额
+    # 2. 计算商品金额（一次性批量加载购物车商品）
+    products = await product_service.get_many(db, (item["product_id"] for item in request.items))
     total_amount = 0.0
     for item in request.items:
-        product_obj = await product_service.get(db, item["product_id"])
+        product_obj = products.get(item["product_id"])
         if not product_obj:
             return error_response(message=f"商品不存在: {item['product_id']}")
         subtotal = float(product_obj.price) * item["quantity"]
@@ -162,6 +178,7 @@ async def get_order_status_count(
 async def create_order(
     request: OrderCreateRequest,
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
     current_user_id: int = Depends(get_current_user_id)
 ):
     """
@@ -179,34 +196,26 @@ async def create_order(
     if request.delivery_type == 2 and not request.pickup_point_id:
         return error_response(message="自提类型需选择自提点")
 
-    # 2. 验证商品并计算金额
+    # 2. 验证商品并计算金额（商品与主图各一次批量查询）
+    product_ids = [item["product_id"] for item in request.items]
+    products = await product_service.get_many(db, product_ids)
+    main_images = await product_service.get_main_images(db, product_ids)
+
     total_amount = 0.0
     items_data = []
     
     for item in request.items:
-        product_obj = await product_service.get(db, item["product_id"])
+        product_obj = products.get(item["product_id"])
         if not product_obj:
             return error_response(message=f"商品不存在: {item['product_id']}")
         
-        if product_obj.stock < item["quantity"]:
-            return error_response(message=f"商品库存不足: {product_obj.name}")
-        
         subtotal = float(product_obj.price) * item["quantity"]
         total_amount += subtotal
         
-        # 获取商品主图
-        images_result = await db.execute(
-            select(product_service.models.ProductImage)
-            .where(product_service.models.ProductImage.product_id == item["product_id"])
-            .order_by(product_service.models.ProductImage.sort_order)
-            .limit(1)
-        )
-        main_image = images_result.scalar_one_or_none()
-        
         items_data.append({
             "product_id": item["product_id"],
             "product_name": product_obj.name,
-            "product_image": main_image.image_url if main_image else None,
+            "product_image": main_images.get(item["product_id"]),
             "price": float(product_obj.price),
             "quantity": item["quantity"],
             "subtotal": subtotal
@@ -248,9 +257,35 @@ async def create_order(
             delivery_address = f"{addr.province}{addr.city}{addr.district or ''}{addr.detail_address}"
 
     # 7. 生成订单号
-    order_no = datetime.now().strftime("%Y%m%d%H%M%S") + str(random.randint(1000, 9999))
-
-    # 8. 创建订单
+    order_no = await order_no_generator.generate(redis)
+
+    # 8. 扣减库存：热点商品先在Redis原子预占，其余（含未加载的）走数据库条件UPDATE
+    product_names = {pid: p.name for pid, p in products.items()}
+    quantities = inventory.merge_lines((i["product_id"], i["quantity"]) for i in items_data)
+    flash_quantities = {}
+    if flash_stock.enabled:
+        flash_quantities = {
+            pid: qty for pid, qty in quantities.items()
+            if flash_stock.is_flash_product(products[pid])
+        }
+    try:
+        unloaded = await flash_stock.reserve(redis, order_no, flash_quantities)
+    except FlashStockReservationError as e:
+        return error_response(code=400, message=f"商品库存不足: {product_names[e.product_id]}")
+
+    db_quantities = {
+        pid: qty for pid, qty in quantities.items()
+        if pid not in flash_quantities or pid in unloaded
+    }
+    try:
+        remaining = await inventory.reserve(db, db_quantities)
+    except InsufficientStockError as e:
+        if flash_quantities:
+            await flash_stock.release(redis, order_no)
+        names = "、".join(product_names[pid] for pid in e.product_ids)
+        return error_response(code=400, message=f"商品库存不足: {names}")
+
+    # 9. 创建订单（与数据库库存扣减同一事务提交）
     order_data = {
         "order_no": order_no,
         "user_id": current_user_id,
@@ -266,15 +301,17 @@ async def create_order(
         "status": "pending"
     }
     
-    new_order = await order.create_order(db, current_user_id, order_data, items_data)
-
-    # 9. 扣减库存
-    for item in items_data:
-        prod = await product_service.get(db, item["product_id"])
-        if prod:
-            prod.stock -= item["quantity"]
-            db.add(prod)
-    await db.commit()
+    try:
+        async with transaction(db):
+            new_order = await order.create_order(db, current_user_id, order_data, items_data, commit=False)
+    except Exception:
+        if flash_quantities:
+            await flash_stock.release(redis, order_no)
+        raise
+
+    await product_service.invalidate_stock(
+        redis, remaining, {pid: -qty for pid, qty in db_quantities.items()}
+    )
 
     return success_response(
         data={
@@ -286,6 +323,26 @@ async def create_order(
     )
 
 
+async def _restore_stock(
+    db: AsyncSession,
+    redis,
+    order_obj: Order
+) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int]]:
+    """恢复订单占用的库存（取消/退款时调用，随调用方事务提交）
+
+    Redis中预占的热点商品在事务内只读查看，由调用方提交后调用 order.release_flash_stock 归还
+    （提交失败时Redis不变，重试不会重复归还）；其余走一条集合式UPDATE。
+
+    Returns:
+        (变化后库存, 数据库归还数量, Redis预占数量)，提交后用于失效商品缓存和归还Redis预占
+    """
+    items, _ = await order_item.get_order_items(db, order_obj.id)
+    reserved = await flash_stock.reserved(redis, order_obj.order_no) if flash_stock.enabled else {}
+    quantities = flash_stock.split_lines(((item.product_id, item.quantity) for item in items), reserved)
+    stocks = await inventory.release(db, quantities)
+    return stocks, quantities, reserved
+
+
 def _map_backend_status_to_front(status: str) -> str:
     """后端细粒度状态 -> 前端聚合展示状态"""
     if status == "pending":
@@ -318,14 +375,32 @@ def _front_status_name(display_status: str) -> str:
     return mapping.get(display_status, display_status)
 
 
-def _serialize_order_with_display(order_obj: Order) -> dict:
+def _serialize_order_with_display(order_obj: Order, include_items: bool = False) -> dict:
     data = OrderResponse.model_validate(order_obj).model_dump()
     display_status = _map_backend_status_to_front(order_obj.status)
     data["display_status"] = display_status
     data["display_status_name"] = _front_status_name(display_status)
+    if include_items:
+        # 调用方需已预加载 Order.items
+        data["items"] = _serialize_order_items(order_obj.items)
     return data
 
 
+def _serialize_order_items(items) -> List[dict]:
+    return [OrderItemResponse.model_validate(i).model_dump() for i in sorted(items, key=lambda i: i.id)]
+
+
+def _serialize_order_logs(logs) -> List[dict]:
+    return [OrderLogResponse.model_validate(l).model_dump() for l in sorted(logs, key=lambda l: l.id)]
+
+
+def _parse_include(include: Optional[str]) -> set:
+    """解析 include=items,... 参数"""
+    if not include:
+        return set()
+    return {part.strip() for part in include.split(",") if part.strip()}
+
+
 def _map_front_status_to_backend(status: Optional[str]):
     """前端聚合状态 -> 后端细粒度状态列表/单值
 
@@ -363,11 +438,13 @@ def _map_front_status_to_backend(status: Optional[str]):
     return mapping.get(s, s)
 
 
-@router.get("/")
+@router.get("/", response_model=ApiResponse[PageData[OrderListItem]], response_model_exclude_unset=True)
 async def get_orders(
     status: Optional[str] = None,
     page: int = 1,
     size: int = 20,
+    with_total: bool = True,
+    include: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user_id: int = Depends(get_current_user_id)
 ):
@@ -378,6 +455,8 @@ async def get_orders(
         status: 订单状态
         page: 页码
         size: 每页数量
+        with_total: 是否计算总数（无限滚动列表传 false，仅返回 has_more）
+        include: 附加数据，逗号分隔；items 表示内嵌订单商品明细（整页一条查询）
 
     Returns:
         dict
@@ -385,23 +464,22 @@ async def get_orders(
     skip = (page - 1) * size
 
     backend_status = _map_front_status_to_backend(status)
+    include_items = "items" in _parse_include(include)
 
-    items, total = await order.get_user_orders(
-        db, user_id=current_user_id, status=backend_status, skip=skip, limit=size
+    result = await order.get_user_orders(
+        db, user_id=current_user_id, status=backend_status, skip=skip, limit=size,
+        with_total=with_total, include_items=include_items
     )
 
     return success_response(
-        data={
-            "items": [_serialize_order_with_display(o) for o in items],
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": (total + size - 1) // size
-        }
+        data=page_data(
+            result, page_no=page, size=size,
+            items=[_serialize_order_with_display(o, include_items) for o in result.items]
+        )
     )
 
 
-@router.get("/{order_id}")
+@router.get("/{order_id}", response_model=ApiResponse[OrderDetailData], response_model_exclude_unset=True)
 async def get_order_detail(
     order_id: int,
     db: AsyncSession = Depends(get_db),
@@ -416,24 +494,19 @@ async def get_order_detail(
     Returns:
         dict
     """
-    order_obj = await order.get(db, order_id)
+    # 订单、商品明细、日志一次预加载
+    order_obj = await order.get_with_details(db, order_id)
     if not order_obj:
         return error_response(message="订单不存在")
 
     if order_obj.user_id != current_user_id:
         return error_response(message="无权限查看此订单")
 
-    # 获取订单商品
-    items, _ = await order_item.get_order_items(db, order_id)
-
-    # 获取订单日志
-    logs, _ = await order_log.get_order_logs(db, order_id)
-
     return success_response(
         data={
             "order": _serialize_order_with_display(order_obj),
-            "items": items,
-            "logs": logs
+            "items": _serialize_order_items(order_obj.items),
+            "logs": _serialize_order_logs(order_obj.logs)
         }
     )
 
@@ -443,6 +516,7 @@ async def cancel_order(
     order_id: int,
     reason: str = "",
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
     current_user_id: int = Depends(get_current_user_id)
 ):
     """
@@ -463,21 +537,18 @@ async def cancel_order(
         return error_response(message="无权限操作此订单")
 
     if order_obj.status not in ["pending", "paid"]:
-        return error_response(message="当前订单状态不允许取消")
-
-    # 更新订单状态
-    await order.update_order_status(
-        db, order_obj, "cancelled", operator="用户", remark=reason or "用户取消"
-    )
-
-    # 恢复库存
-    items, _ = await order_item.get_order_items(db, order_id)
-    for item in items:
-        prod = await product_service.get(db, item.product_id)
-        if prod:
-            prod.stock += item.quantity
-            db.add(prod)
-    await db.commit()
+        return error_response(code=400, message="当前订单状态不允许取消")
+
+    # 条件更新订单状态并恢复库存（一个事务）；与超时取消并发时只有一方成功
+    async with transaction(db):
+        cancelled = await order.mark_cancelled(db, order_id, operator="用户", remark=reason or "用户取消")
+        if cancelled:
+            stocks, quantities, reserved = await _restore_stock(db, redis, order_obj)
+    if not cancelled:
+        return error_response(code=400, message="当前订单状态不允许取消")
+    await product_service.invalidate_stock(redis, stocks, quantities)
+    if reserved:
+        await order.release_flash_stock(db, redis, [order_obj.order_no], reserved)
 
     return success_response(message="订单已取消")
 
@@ -512,14 +583,15 @@ async def request_refund(
     if payment_obj.status != "paid":
         return error_response(message="当前支付状态不允许退款")
 
-    # 1) 订单进入退款中
-    await order.update_order_status(
-        db, order_obj, "refunding", operator="用户", remark=f"申请退款: {request.reason}"
-    )
+    async with transaction(db):
+        # 1) 订单进入退款中
+        await order.update_order_status(
+            db, order_obj, "refunding", operator="用户", remark=f"申请退款: {request.reason}", commit=False
+        )
 
-    # 2) 支付进入退款中（记录退款原因/金额）
-    refund_amount = float(payment_obj.amount)
-    await payment_service.request_refund(db, payment_obj, refund_amount, request.reason)
+        # 2) 支付进入退款中（记录退款原因/金额）
+        refund_amount = float(payment_obj.amount)
+        await payment_service.request_refund(db, payment_obj, refund_amount, request.reason, commit=False)
 
     return success_response(message="退款申请已提交")
 
@@ -549,24 +621,24 @@ async def confirm_order(
     if order_obj.status != "delivering":
         return error_response(message="当前订单状态不允许确认收货")
 
-    # 更新订单状态
-    await order.update_order_status(
-        db, order_obj, "completed", operator="用户", remark="确认收货"
-    )
+    # 更新订单状态并赠送积分（一个事务）
+    async with transaction(db):
+        await order.update_order_status(
+            db, order_obj, "completed", operator="用户", remark="确认收货", commit=False
+        )
 
-    # 赠送积分
-    rule = await point_rule.get_rule_by_type(db, rule_type=2)  # 2-订单
-    points_gained = 0
-    if rule and rule.points > 0:
-        from app.services.user_service import user as user_service
-        from app.models.user import User
-        user_obj = await user_service.get(db, current_user_id)
-        if user_obj:
-            points = int(float(order_obj.final_amount) * rule.points / 100)  # 按比例计算
-            await user_service.update_points(
-                db, user_obj, points, 1, 2, "订单完成", order_id
-            )
-            points_gained = points
+        rule = await point_rule.get_rule_by_type(db, rule_type=2)  # 2-订单
+        points_gained = 0
+        if rule and rule.points > 0:
+            from app.services.user_service import user as user_service
+            from app.models.user import User
+            user_obj = await user_service.get(db, current_user_id)
+            if user_obj:
+                points = int(float(order_obj.final_amount) * rule.points / 100)  # 按比例计算
+                await user_service.update_points(
+                    db, user_obj, points, 1, 2, "订单完成", order_id, commit=False
+                )
+                points_gained = points
 
     return success_response(
         data={"points_gained": points_gained},
@@ -621,6 +693,8 @@ async def get_all_orders(
     status: Optional[str] = None,
     page: int = 1,
     size: int = 20,
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     admin_id: int = Depends(get_admin_id)
 ):
@@ -631,6 +705,8 @@ async def get_all_orders(
         status: 订单状态
         page: 页码
         size: 每页数量
+        cursor: 分页游标（上一页返回的 next_cursor，首页传空字符串）；传入时忽略 page
+        include: 附加数据，逗号分隔；items 表示内嵌订单商品明细（整页一条查询）
 
     Returns:
         dict
@@ -641,11 +717,28 @@ async def get_all_orders(
     if status:
         filters["status"] = status
 
-    items, total = await order.get_multi(db, skip=skip, limit=size, **filters)
+    include_items = "items" in _parse_include(include)
+    options = [selectinload(Order.items)] if include_items else []
+
+    if cursor is not None:
+        try:
+            result = await order.get_multi_cursor(
+                db, cursor=cursor, limit=size, options=options, **filters
+            )
+        except InvalidCursorError as e:
+            return error_response(code=400, message=str(e))
+        return success_response(
+            data=cursor_page_data(
+                result, size=size,
+                items=[_serialize_order_with_display(o, include_items) for o in result.items]
+            )
+        )
+
+    items, total = await order.get_multi(db, skip=skip, limit=size, options=options, **filters)
 
     return success_response(
         data={
-            "items": [_serialize_order_with_display(o) for o in items],
+            "items": [_serialize_order_with_display(o, include_items) for o in items],
             "total": total,
             "page": page,
             "size": size,
@@ -658,6 +751,7 @@ async def get_all_orders(
 async def admin_confirm_refund(
     order_id: int,
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
     admin_id: int = Depends(get_admin_id)
 ):
     """管理员确认退款成功
@@ -682,17 +776,16 @@ async def admin_confirm_refund(
     if payment_obj.status != "refunding":
         return error_response(message="当前支付不处于退款中")
 
-    await payment_service.confirm_refund(db, payment_obj)
-    await order.update_order_status(db, order_obj, "refunded", operator="管理员", remark="确认退款")
-
-    # 恢复库存
-    items, _ = await order_item.get_order_items(db, order_id)
-    for item in items:
-        prod = await product_service.get(db, item.product_id)
-        if prod:
-            prod.stock += item.quantity
-            db.add(prod)
-    await db.commit()
+    # 支付、订单状态与库存恢复一个事务
+    async with transaction(db):
+        await payment_service.confirm_refund(db, payment_obj, commit=False)
+        await order.update_order_status(
+            db, order_obj, "refunded", operator="管理员", remark="确认退款", commit=False
+        )
+        stocks, quantities, reserved = await _restore_stock(db, redis, order_obj)
+    await product_service.invalidate_stock(redis, stocks, quantities)
+    if reserved:
+        await order.release_flash_stock(db, redis, [order_obj.order_no], reserved)
 
     return success_response(message="退款已确认")
 
@@ -706,7 +799,7 @@ async def update_order_status(
 ):
     """更新订单状态（管理员）
 
-    这里做一个最小可用的状态机校验，避免状态随意跳转。
+    按订单状态机（order_service.ORDER_TRANSITIONS）校验，避免状态随意跳转。
     """
     order_obj = await order.get(db, order_id)
     if not order_obj:
@@ -715,20 +808,8 @@ async def update_order_status(
     current = order_obj.status
     target = request.status
 
-    allowed_next = {
-        "pending": ["cancelled"],
-        "paid": ["preparing", "cancelled", "refunding", "refunded"],
-        "preparing": ["ready", "refunding", "refunded"],
-        "ready": ["delivering", "refunding", "refunded"],
-        "delivering": ["completed", "refunding", "refunded"],
-        "completed": ["refunding", "refunded"],
-        "refunding": ["refunded"],
-        "refunded": [],
-        "cancelled": [],
-    }
-
     if target != current:
-        if target not in allowed_next.get(current, []):
+        if not can_transition(current, target):
             return error_response(message=f"状态不允许从 {current} 变更为 {target}")
 
     await order.update_order_status(
@@ -736,3 +817,27 @@ async def update_order_status(
     )
 
     return success_response(message="订单状态已更新")
+
+
+@router.post("/admin/status/batch")
+async def bulk_update_order_status(
+    request: OrderBulkStatusRequest,
+    db: AsyncSession = Depends(get_db),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """批量更新订单状态（管理员，仅履约状态：备货中/已备货/配送中/已完成）
+
+    需要管理员Token，操作人按Token中的管理员ID记录到订单日志。
+    当前状态不允许变更的订单不影响其余订单，在 failed 中逐个返回原因。
+    """
+    if request.status not in BULK_TARGET_STATUSES:
+        return error_response(code=400, message=f"不支持批量变更为 {request.status}")
+
+    result = await order.bulk_transition(
+        db, request.order_ids, request.status, operator=f"管理员#{current_admin['sub']}", remark=request.remark
+    )
+
+    return success_response(data={
+        "updated": result.updated,
+        "failed": [{"order_id": order_id, "reason": reason} for order_id, reason in result.failed.items()]
+    }, message=f"已更新 {len(result.updated)} 个订单")
@@ -3,19 +3,21 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 import hashlib
 import json
 
-from app.core.database import get_db
+from app.core.database import get_db, transaction
 from app.core.response import success_response, error_response
 from app.core.config import settings
+from app.core.logger import logger
 from app.services.payment_service import payment
 from app.services.order_service import order as order_service
 from app.models.payment import Payment
-from app.models.order import Order
+from app.models.order import Order, OrderLog
 from app.schemas.payment import PaymentCreate
 
 router = APIRouter()
@@ -45,6 +47,31 @@ class RefundRequest(BaseModel):
     refund_reason: str = ""
 
 
+async def _settle_order(db: AsyncSession, payment_obj: Payment, remark: str):
+    """
+    支付成功后把订单置为已支付（随调用方事务提交）
+
+    订单已被超时取消（库存已归还）时不再改为已支付，支付记录转为退款中、全额待退，
+    并在订单日志中记录，由管理员原路退款。
+    """
+    if await order_service.mark_paid(db, payment_obj.order_id, operator="系统", remark=remark):
+        return
+
+    order_status = await db.scalar(select(Order.status).where(Order.id == payment_obj.order_id))
+    if order_status != "cancelled":
+        return
+    await payment.request_refund(
+        db, payment_obj, float(payment_obj.amount), "订单已取消，支付需原路退回", commit=False
+    )
+    db.add(OrderLog(
+        order_id=payment_obj.order_id,
+        status="cancelled",
+        operator="系统",
+        remark=f"订单取消后收到支付（{remark}），已转退款"
+    ))
+    logger.warning(f"订单 {payment_obj.order_id} 已取消但收到支付，支付记录 {payment_obj.id} 转为退款中")
+
+
 @router.post("/wx-pay")
 async def create_wx_payment(
     request: WxPayRequest,
@@ -81,21 +108,30 @@ async def create_wx_payment(
     # 这里模拟生成prepay_id
     prepay_id = f"wx{int(datetime.now().timestamp())}{request.order_id}"
 
-    # 4. 创建或更新支付记录
-    if existing_payment:
-        existing_payment.prepay_id = prepay_id
-        existing_payment.amount = float(order_obj.final_amount)
-        existing_payment.status = "pending"
-        db.add(existing_payment)
-        await db.commit()
-        payment_obj = existing_payment
-    else:
-        payment_obj = await payment.create_payment(
-            db,
-            order_id=request.order_id,
-            prepay_id=prepay_id,
-            amount=float(order_obj.final_amount)
-        )
+    # 4. 创建或更新支付记录（与模拟支付成功同一事务提交）
+    async with transaction(db):
+        if existing_payment:
+            existing_payment.prepay_id = prepay_id
+            existing_payment.amount = float(order_obj.final_amount)
+            existing_payment.status = "pending"
+            db.add(existing_payment)
+            payment_obj = existing_payment
+        else:
+            payment_obj = await payment.create_payment(
+                db,
+                order_id=request.order_id,
+                prepay_id=prepay_id,
+                amount=float(order_obj.final_amount),
+                commit=False
+            )
+
+        # MOCK：开发阶段默认当作支付成功（你要求“支付默认成功”）
+        if settings.DEBUG:
+            mock_txn = f"mock_txn_{prepay_id}"
+            await payment.handle_payment_success(db, payment_obj, mock_txn, commit=False)
+
+            # 同步更新订单状态
+            await _settle_order(db, payment_obj, remark="模拟支付成功")
 
     # 5. 生成小程序支付参数
     # TODO: 实际项目中需要使用微信支付SDK生成签名
@@ -107,17 +143,6 @@ async def create_wx_payment(
         "paySign": "mock_pay_sign"  # 实际需要使用微信支付私钥签名
     }
 
-    # MOCK：开发阶段默认当作支付成功（你要求“支付默认成功”）
-    if settings.DEBUG:
-        mock_txn = f"mock_txn_{prepay_id}"
-        await payment.handle_payment_success(db, payment_obj, mock_txn)
-
-        # 同步更新订单状态
-        if order_obj.status == "pending":
-            await order_service.update_order_status(
-                db, order_obj, "paid", operator="系统", remark="模拟支付成功"
-            )
-
     return success_response(
         data={
             "payment_id": payment_obj.id,
@@ -238,7 +263,6 @@ async def wx_payment_callback(
             # 4. 查找支付记录（通过订单号）
             # TODO: 这里需要根据实际业务逻辑关联订单
             # 简化处理，假设可以通过订单ID查找
-            from sqlalchemy import select
             payment_result = await db.execute(
                 select(Payment).where(
                     Payment.prepay_id.contains(transaction_id)
@@ -249,15 +273,16 @@ async def wx_payment_callback(
             if not payment_obj:
                 return {"code": "FAIL", "message": "支付记录不存在"}
 
-            # 5. 更新支付状态
-            await payment.handle_payment_success(db, payment_obj, transaction_id)
+            # 重复回调：已处理过同一笔交易
+            if payment_obj.transaction_id == transaction_id and payment_obj.status != "pending":
+                return {"code": "SUCCESS", "message": "成功"}
 
-            # 6. 更新订单状态
-            order_obj = await order_service.get(db, payment_obj.order_id)
-            if order_obj and order_obj.status == "pending":
-                await order_service.update_order_status(
-                    db, order_obj, "paid", operator="系统", remark="支付成功"
-                )
+            async with transaction(db):
+                # 5. 更新支付状态
+                await payment.handle_payment_success(db, payment_obj, transaction_id, commit=False)
+
+                # 6. 更新订单状态（与支付状态同一事务提交）
+                await _settle_order(db, payment_obj, remark="支付成功")
 
         # 7. 返回成功响应
         return {"code": "SUCCESS", "message": "成功"}
@@ -305,15 +330,17 @@ async def create_refund(
     # TODO: 实际项目中需要调用微信退款API
     # refund_result = wxpay.refund(...)
 
-    # 5. 更新支付记录（进入 refunding）
-    await payment.request_refund(
-        db, payment_obj, request.refund_amount, request.refund_reason
-    )
+    async with transaction(db):
+        # 5. 更新支付记录（进入 refunding）
+        await payment.request_refund(
+            db, payment_obj, request.refund_amount, request.refund_reason, commit=False
+        )
 
-    # 6. 更新订单状态（进入 refunding）
-    await order_service.update_order_status(
-        db, order_obj, "refunding", operator="用户", remark=f"申请退款: {request.refund_reason}"
-    )
+        # 6. 更新订单状态（进入 refunding，与支付记录同一事务提交）
+        await order_service.update_order_status(
+            db, order_obj, "refunding", operator="用户", remark=f"申请退款: {request.refund_reason}",
+            commit=False
+        )
 
     # 7. 这里不立即恢复库存，等待管理员确认退款成功后处理
 
@@ -4,12 +4,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
+from datetime import datetime
 
 from app.core.database import get_db
-from app.core.response import success_response, error_response
+from app.core.redis import get_redis
+from app.core.response import success_response, error_response, page_data, cursor_page_data
+from app.core.crud import InvalidCursorError
 from app.core.security import get_current_user
 from app.models.user import User
 from app.services.points_service import point_rule, points_record, sign_in_record
+from app.services.sign_in_calendar_service import sign_in_calendar
 
 router = APIRouter()
 
@@ -17,7 +21,8 @@ router = APIRouter()
 @router.post("/sign-in")
 async def user_sign_in(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     每日签到
@@ -25,38 +30,71 @@ async def user_sign_in(
     Returns:
         dict: 包含获得的积分、连续签到天数等信息
     """
-    # 检查今天是否已签到
-    has_signed = await sign_in_record.check_today_signed(db, current_user.id)
+    # 检查今天是否已签到（签到日历位图）
+    today = datetime.now().date()
+    has_signed = await sign_in_calendar.is_signed(redis, db, current_user.id, today)
     if has_signed:
-        return error_response(message="今日已签到，请明天再来")
-
-    # 获取签到积分规则
-    rule = await point_rule.get_rule_by_type(db, rule_type=1)
-    if not rule:
-        return error_response(message="签到积分规则未配置")
+        return error_response(code=400, message="今日已签到，请明天再来")
 
-    # 执行签到
-    record = await sign_in_record.sign_in(db, current_user.id, rule.points)
+    # 获取签到积分规则（读缓存）
+    points = await point_rule.get_rule_points_cached(db, redis, rule_type=1)
+    if points is None:
+        return error_response(code=400, message="签到积分规则未配置")
 
-    # 获取连续签到天数
-    summary = await points_record.get_user_summary(db, current_user.id)
+    # 执行签到：一条语句写入签到记录、积分、积分记录和汇总（含连续签到天数），重复签到不写入
+    result = await sign_in_record.sign_in(db, current_user.id, points, today.strftime("%Y-%m-%d"))
+    if result is None:
+        return error_response(code=400, message="今日已签到，请明天再来")
+    await sign_in_calendar.mark(redis, current_user.id, result.sign_date)
 
     return success_response(
         data={
-            "points_gained": record.points,
-            "consecutive_days": summary["consecutive_days"],
-            "total_points": current_user.total_points,
-            "sign_date": record.sign_date
+            "points_gained": result.points,
+            "consecutive_days": result.consecutive_days,
+            "total_points": result.total_points,
+            "sign_date": result.sign_date
         },
         message="签到成功"
     )
 
 
+@router.get("/calendar")
+async def get_sign_in_calendar(
+    year: Optional[int] = Query(None, ge=2000, le=2100, description="年份，默认当年"),
+    month: Optional[int] = Query(None, ge=1, le=12, description="月份，默认当月"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
+):
+    """
+    获取签到月历
+
+    Args:
+        year: 年份（默认当年）
+        month: 月份（默认当月）
+
+    Returns:
+        dict: 当月已签到日期、签到次数、今天是否已签到、连续签到天数
+    """
+    today = datetime.now().date()
+    data = await sign_in_calendar.month_calendar(
+        redis,
+        db,
+        current_user.id,
+        year or today.year,
+        month or today.month,
+        today
+    )
+    return success_response(data=data)
+
+
 @router.get("/records")
 async def get_points_records(
     change_type: Optional[int] = Query(None, description="类型 1-获得 2-消耗"),
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页数量"),
+    with_total: bool = Query(True, description="是否计算总数"),
+    cursor: Optional[str] = Query(None, description="分页游标（传入后按游标分页，首页传空字符串）"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -67,28 +105,36 @@ async def get_points_records(
         change_type: 类型筛选 (可选)
         page: 页码
         size: 每页数量
+        with_total: 是否计算总数（无限滚动列表传 false，仅返回 has_more）
+        cursor: 上一页返回的 next_cursor；传入时忽略 page，深分页不随页码变慢
 
     Returns:
         dict: 积分记录列表
     """
+    if cursor is not None:
+        try:
+            result = await points_record.get_user_records_cursor(
+                db,
+                current_user.id,
+                change_type=change_type,
+                cursor=cursor,
+                limit=size
+            )
+        except InvalidCursorError as e:
+            return error_response(code=400, message=str(e))
+        return success_response(data=cursor_page_data(result, size=size))
+
     skip = (page - 1) * size
-    records, total = await points_record.get_user_records(
+    result = await points_record.get_user_records(
         db,
         current_user.id,
         change_type=change_type,
         skip=skip,
-        limit=size
+        limit=size,
+        with_total=with_total
     )
 
-    return success_response(
-        data={
-            "items": records,
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": (total + size - 1) // size
-        }
-    )
+    return success_response(data=page_data(result, page_no=page, size=size))
 
 
 @router.get("/rules")
@@ -129,7 +175,8 @@ async def get_points_rules(
 @router.post("/rules")
 async def create_point_rule(
     rule_data: dict,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     创建积分规则（管理员）
@@ -151,6 +198,7 @@ async def create_point_rule(
     from app.schemas.points import PointRuleCreate
     rule_schema = PointRuleCreate(**rule_data)
     rule = await point_rule.create(db, obj_in=rule_schema)
+    await point_rule.invalidate_cache(redis)
 
     return success_response(data=rule, message="积分规则创建成功")
 
@@ -159,7 +207,8 @@ async def create_point_rule(
 async def update_point_rule(
     rule_id: int,
     rule_data: dict,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     更新积分规则（管理员）
@@ -178,6 +227,7 @@ async def update_point_rule(
     from app.schemas.points import PointRuleUpdate
     update_schema = PointRuleUpdate(**rule_data)
     updated_rule = await point_rule.update(db, db_obj=rule, obj_in=update_schema)
+    await point_rule.invalidate_cache(redis)
 
     return success_response(data=updated_rule, message="积分规则更新成功")
 
@@ -185,7 +235,8 @@ async def update_point_rule(
 @router.delete("/rules/{rule_id}")
 async def delete_point_rule(
     rule_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     删除积分规则（管理员）
@@ -199,6 +250,7 @@ async def delete_point_rule(
     rule = await point_rule.delete(db, id=rule_id)
     if not rule:
         return error_response(message="积分规则不存在")
+    await point_rule.invalidate_cache(redis)
 
     return success_response(message="积分规则删除成功")
 
@@ -7,11 +7,13 @@ from pydantic import BaseModel
 from typing import List, Optional
 
 from app.core.database import get_db
-from app.core.response import success_response, error_response
+from app.core.redis import get_redis
+from app.core.response import success_response, error_response, page_data, ApiResponse, PageData
 from app.services.product_service import product, category, product_image
+from app.services.flash_stock_service import flash_stock
 from app.schemas.product import (
     ProductCreate, ProductUpdate, CategoryCreate, CategoryUpdate,
-    ProductDetailResponse, CategoryResponse
+    ProductDetailResponse, CategoryResponse, ProductResponse, ProductListItem, ProductDetailData
 )
 
 router = APIRouter()
@@ -60,7 +62,7 @@ class ProductUpdateRequest(BaseModel):
     tags: Optional[str] = None
 
 
-@router.get("/")
+@router.get("/", response_model=ApiResponse[PageData[ProductListItem]])
 async def get_products(
     keyword: Optional[str] = None,
     category_id: Optional[int] = None,
@@ -70,7 +72,9 @@ async def get_products(
     merchant_id: Optional[int] = None,
     page: int = 1,
     size: int = 20,
-    db: AsyncSession = Depends(get_db)
+    with_total: bool = True,
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     获取商品列表（支持搜索和筛选）
@@ -84,14 +88,15 @@ async def get_products(
         merchant_id: 商家ID
         page: 页码
         size: 每页数量
+        with_total: 是否计算总数（无限滚动列表传 false，仅返回 has_more）
 
     Returns:
         dict
     """
     skip = (page - 1) * size
 
-    items, total = await product.search_products(
-        db=db,
+    result = await product.search_products_cached(
+        db, redis,
         keyword=keyword,
         category_id=category_id,
         is_recommended=is_recommended,
@@ -99,25 +104,20 @@ async def get_products(
         is_group_buy=is_group_buy,
         merchant_id=merchant_id,
         skip=skip,
-        limit=size
+        limit=size,
+        with_total=with_total
     )
 
-    return success_response(
-        data={
-            "items": items,
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": (total + size - 1) // size
-        }
-    )
+    return success_response(data=page_data(result, page_no=page, size=size))
 
 
-@router.get("/recommended")
+@router.get("/recommended", response_model=ApiResponse[PageData[ProductListItem]])
 async def get_recommended_products(
     page: int = 1,
     size: int = 20,
-    db: AsyncSession = Depends(get_db)
+    with_total: bool = True,
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     获取推荐商品列表
@@ -125,35 +125,31 @@ async def get_recommended_products(
     Args:
         page: 页码
         size: 每页数量
+        with_total: 是否计算总数
 
     Returns:
         dict
     """
     skip = (page - 1) * size
 
-    items, total = await product.search_products(
-        db=db,
+    result = await product.search_products_cached(
+        db, redis,
         is_recommended=True,
         skip=skip,
-        limit=size
+        limit=size,
+        with_total=with_total
     )
 
-    return success_response(
-        data={
-            "items": items,
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": (total + size - 1) // size
-        }
-    )
+    return success_response(data=page_data(result, page_no=page, size=size))
 
 
-@router.get("/hot")
+@router.get("/hot", response_model=ApiResponse[PageData[ProductListItem]])
 async def get_hot_products(
     page: int = 1,
     size: int = 20,
-    db: AsyncSession = Depends(get_db)
+    with_total: bool = True,
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     获取热销商品列表
@@ -161,35 +157,31 @@ async def get_hot_products(
     Args:
         page: 页码
         size: 每页数量
+        with_total: 是否计算总数
 
     Returns:
         dict
     """
     skip = (page - 1) * size
 
-    items, total = await product.search_products(
-        db=db,
+    result = await product.search_products_cached(
+        db, redis,
         is_hot=True,
         skip=skip,
-        limit=size
+        limit=size,
+        with_total=with_total
     )
 
-    return success_response(
-        data={
-            "items": items,
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": (total + size - 1) // size
-        }
-    )
+    return success_response(data=page_data(result, page_no=page, size=size))
 
 
-@router.get("/group-buy")
+@router.get("/group-buy", response_model=ApiResponse[PageData[ProductListItem]])
 async def get_group_buy_products(
     page: int = 1,
     size: int = 20,
-    db: AsyncSession = Depends(get_db)
+    with_total: bool = True,
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     获取拼团商品列表
@@ -197,34 +189,29 @@ async def get_group_buy_products(
     Args:
         page: 页码
         size: 每页数量
+        with_total: 是否计算总数
 
     Returns:
         dict
     """
     skip = (page - 1) * size
 
-    items, total = await product.search_products(
-        db=db,
+    result = await product.search_products_cached(
+        db, redis,
         is_group_buy=True,
         skip=skip,
-        limit=size
+        limit=size,
+        with_total=with_total
     )
 
-    return success_response(
-        data={
-            "items": items,
-            "total": total,
-            "page": page,
-            "size": size,
-            "pages": (total + size - 1) // size
-        }
-    )
+    return success_response(data=page_data(result, page_no=page, size=size))
 
 
-@router.get("/{product_id}")
+@router.get("/{product_id}", response_model=ApiResponse[ProductDetailData])
 async def get_product_detail(
     product_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis)
 ):
     """
     获取商品详情（含图片）
@@ -235,7 +222,7 @@ async def get_product_detail(
     Returns:
         dict
     """
-    product_detail = await product.get_product_detail(db, product_id)
+    product_detail = await product.get_product_detail_cached(db, redis, product_id)
 
     if not product_detail:
         return error_response(message="商品不存在")
@@ -247,6 +234,7 @@ async def get_product_detail(
 async def create_product(
     request: ProductCreateRequest,
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
     admin_id: int = Depends(get_admin_id)
 ):
     """
@@ -261,18 +249,15 @@ async def create_product(
     product_data = request.model_dump(exclude={"images"})
     new_product = await product.create(db, obj_in=product_data)
 
-    # 添加商品图片
+    # 添加商品图片（记录缩略图等变体）
     if request.images:
         for idx, image_url in enumerate(request.images):
-            image_data = {
-                "product_id": new_product.id,
-                "image_url": image_url,
-                "sort_order": idx
-            }
-            await product_image.create(db, obj_in=image_data)
+            await product_image.create_with_variants(db, new_product.id, image_url, sort_order=idx)
+
+    await product.invalidate_cache(redis, [new_product.id])
 
     # 重新获取含图片的商品详情
-    product_detail = await product.get_product_detail(db, new_product.id)
+    product_detail = await product.get_product_detail_cached(db, redis, new_product.id)
 
     return success_response(data=product_detail, message="创建成功")
 
@@ -282,6 +267,7 @@ async def update_product(
     product_id: int,
     request: ProductUpdateRequest,
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
     admin_id: int = Depends(get_admin_id)
 ):
     """
@@ -298,15 +284,28 @@ async def update_product(
     if not product_obj:
         return error_response(message="商品不存在")
 
+    # 修改库存时先卸载Redis热点库存（回写已扣减部分），更新后按需重新加载
+    stock_changed = flash_stock.enabled and request.stock is not None
+    if stock_changed:
+        await flash_stock.unload(redis, db, product_id)
+
     updated_product = await product.update(db, db_obj=product_obj, obj_in=request)
 
-    return success_response(data=updated_product, message="更新成功")
+    if stock_changed and flash_stock.is_flash_product(updated_product):
+        await flash_stock.preload(redis, db, [product_id])
+
+    await product.invalidate_cache(redis, [product_id])
+
+    return success_response(
+        data=ProductResponse.model_validate(updated_product).model_dump(), message="更新成功"
+    )
 
 
 @router.delete("/{product_id}")
 async def delete_product(
     product_id: int,
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
     admin_id: int = Depends(get_admin_id)
 ):
     """
@@ -323,10 +322,35 @@ async def delete_product(
         return error_response(message="商品不存在")
 
     await product.delete(db, id=product_id)
+    await product.invalidate_cache(redis, [product_id])
 
     return success_response(message="删除成功")
 
 
+@router.post("/flash-stock/preload")
+async def preload_flash_stock(
+    product_ids: List[int] = [],
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
+    admin_id: int = Depends(get_admin_id)
+):
+    """
+    预加载热点商品库存到Redis（管理员，秒杀/拼团开始前调用）
+
+    Args:
+        product_ids: 商品ID列表，为空则加载所有上架的热销/拼团商品
+
+    Returns:
+        dict
+    """
+    if not flash_stock.enabled:
+        return error_response(code=400, message="热点库存未启用")
+
+    loaded = await flash_stock.preload(redis, db, product_ids)
+
+    return success_response(data={"loaded": loaded}, message="预加载成功")
+
+
 @router.get("/categories/list")
 async def get_categories(
     parent_id: Optional[int] = None,
@@ -4,7 +4,7 @@
 - 小程序端 Taro.uploadFile -> /upload
 - 后台管理（admin）图片上传
 
-当前实现：上传到 MinIO 公共 bucket，返回可访问 URL。
+当前实现：上传到 MinIO 公共 bucket，返回可访问 URL 以及缩略图/中图/大图（JPEG + WebP）变体 URL。
 """
 
 from fastapi import APIRouter, UploadFile, File
@@ -25,5 +25,5 @@ async def upload_file(file: UploadFile = File(...)):
     if content_type and not content_type.startswith("image/"):
         return error_response(message="仅支持图片上传")
 
-    url = await minio_storage.upload_file(file, folder="images")
-    return success_response(data={"url": url})
+    result = await minio_storage.upload_image(file, folder="images")
+    return success_response(data=result)
@@ -7,11 +7,13 @@ from pydantic import BaseModel
 from typing import List, Optional
 
 from app.core.database import get_db
+from app.core.redis import get_redis
 from app.core.response import success_response, error_response
 from app.services.user_service import (
-    user, address, sign_in_record, points_record
+    user, address, points_record
 )
-from app.services.points_service import point_rule
+from app.services.points_service import point_rule, sign_in_record
+from app.services.sign_in_calendar_service import sign_in_calendar
 from app.schemas.user import (
     UserUpdate, AddressCreate, AddressUpdate, AddressResponse,
     SignInResponse, PointsRecordResponse
@@ -202,6 +204,7 @@ async def delete_address(
 @router.post("/sign-in")
 async def sign_in(
     db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
     current_user_id: int = Depends(get_current_user_id)
 ):
     """
@@ -210,40 +213,34 @@ async def sign_in(
     Returns:
         dict
     """
-    # 检查今日是否已签到
-    has_signed = await sign_in_record.has_signed_today(db, current_user_id)
+    # 检查今日是否已签到（签到日历位图，已签到时不访问数据库）
+    from datetime import date
+    today = date.today()
+    has_signed = await sign_in_calendar.is_signed(redis, db, current_user_id, today)
     if has_signed:
-        return error_response(message="今日已签到")
-    
-    # 获取签到积分规则
-    rule = await point_rule.get_rule_by_type(db, rule_type=1)  # 1-签到
-    if not rule:
-        return error_response(message="签到规则配置错误")
-    
-    # 获取用户
-    user_obj = await user.get(db, current_user_id)
-    if not user_obj:
-        return error_response(message="用户不存在")
+        return error_response(code=400, message="今日已签到")
     
-    # 更新积分
-    updated_user = await user_service.update_points(
-        db, user_obj, rule.points, 1, 1, "每日签到"
-    )
+    # 获取签到积分规则（读缓存）
+    points = await point_rule.get_rule_points_cached(db, redis, rule_type=1)  # 1-签到
+    if points is None:
+        return error_response(code=400, message="签到规则配置错误")
     
-    # 记录签到
-    from datetime import date
-    sign_in_data = {
-        "user_id": current_user_id,
-        "sign_date": date.today().strftime("%Y-%m-%d"),
-        "points": rule.points
-    }
-    sign_record = await sign_in_record.create(db, obj_in=sign_in_data)
+    # 签到：签到记录、用户积分、积分记录、积分汇总在一条语句中写入，重复签到不写入
+    result = await sign_in_record.sign_in(db, current_user_id, points, today.strftime("%Y-%m-%d"))
+    if result is None:
+        return error_response(code=400, message="今日已签到")
+    await sign_in_calendar.mark(redis, current_user_id, result.sign_date)
     
     return success_response(
         data={
-            "points_gained": rule.points,
-            "total_points": updated_user.total_points,
-            "record": sign_record
+            "points_gained": result.points,
+            "total_points": result.total_points,
+            "record": {
+                "id": result.record_id,
+                "user_id": current_user_id,
+                "sign_date": result.sign_date,
+                "points": result.points
+            }
         },
         message="签到成功"
     )
@@ -0,0 +1,226 @@
+"""
+读缓存
+
+两级缓存：进程内 L1（TTL + LRU）+ Redis L2。
+
+失效采用版本号：Redis 中 cache:{namespace}:version 自增后，旧版本的 key
+不再被读取，等待 TTL 自然过期，无需 SCAN 删除。L1 条目最多存活
+CACHE_LOCAL_TTL 秒，本进程失效时立即清空，其他进程最多延迟 CACHE_LOCAL_TTL 秒。
+
+Redis 不可用时降级为直接调用 loader，不影响业务。
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.logger import logger
+
+_MISSING = object()
+
+
+class LocalCache:
+    """进程内缓存（TTL + LRU）"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        """获取缓存，未命中或已过期返回 _MISSING"""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class VersionedCache:
+    """带版本号的两级缓存
+
+    值需可 JSON 序列化（None 也会被缓存，用于防止缓存穿透）。
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: Optional[int] = None,
+        local_ttl: Optional[float] = None,
+        local_maxsize: Optional[int] = None
+    ):
+        self.namespace = namespace
+        self.ttl = ttl or settings.CACHE_TTL
+        self.local = LocalCache(
+            maxsize=local_maxsize or settings.CACHE_LOCAL_MAXSIZE,
+            ttl=local_ttl if local_ttl is not None else settings.CACHE_LOCAL_TTL
+        )
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "invalidations": 0, "errors": 0}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 本进程失效计数：加载期间发生失效时，不回填可能过期的数据
+        self._generation = 0
+        _registry[namespace] = self
+
+    @property
+    def version_key(self) -> str:
+        return f"cache:{self.namespace}:version"
+
+    async def _version(self, redis: Redis) -> str:
+        version = await redis.get(self.version_key)
+        if isinstance(version, bytes):
+            version = version.decode()
+        return version or "0"
+
+    def _redis_key(self, version: str, key: str) -> str:
+        return f"cache:{self.namespace}:v{version}:{key}"
+
+    async def get_or_load(
+        self,
+        redis: Optional[Redis],
+        key: str,
+        loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        读取缓存，未命中时调用 loader 加载并回填
+
+        同一进程内同一 key 的并发未命中只会调用一次 loader。
+        """
+        if not settings.CACHE_ENABLED:
+            return await loader()
+
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self.stats["l1_hits"] += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(redis, key, loader)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _load(self, redis: Optional[Redis], key: str, loader) -> Any:
+        redis_key = None
+        if redis is not None:
+            try:
+                redis_key = self._redis_key(await self._version(redis), key)
+                raw = await redis.get(redis_key)
+                if raw is not None:
+                    self.stats["l2_hits"] += 1
+                    value = json.loads(raw)
+                    self.local.set(key, value)
+                    return value
+            except RedisError as e:
+                self.stats["errors"] += 1
+                redis_key = None
+                logger.warning(f"缓存读取失败 {self.namespace}:{key}: {e}")
+
+        self.stats["misses"] += 1
+        generation = self._generation
+        value = await loader()
+        if generation != self._generation:
+            return value
+        self.local.set(key, value)
+
+        if redis_key is not None:
+            try:
+                await redis.set(redis_key, json.dumps(value, ensure_ascii=False), ex=self.ttl)
+            except RedisError as e:
+                self.stats["errors"] += 1
+                logger.warning(f"缓存写入失败 {self.namespace}:{key}: {e}")
+        return value
+
+    async def invalidate(self, redis: Optional[Redis]):
+        """整体失效（版本号自增）"""
+        self.local.clear()
+        self._inflight.clear()
+        self._generation += 1
+        self.stats["invalidations"] += 1
+        if redis is None:
+            return
+        try:
+            await redis.incr(self.version_key)
+        except RedisError as e:
+            self.stats["errors"] += 1
+            logger.warning(f"缓存失效失败 {self.namespace}: {e}")
+
+    async def delete(self, redis: Optional[Redis], keys: Iterable[str]):
+        """失效当前版本下的指定 key"""
+        keys = list(keys)
+        if not keys:
+            return
+        for key in keys:
+            self.local.pop(key)
+            self._inflight.pop(key, None)
+        self._generation += 1
+        self.stats["invalidations"] += 1
+        if redis is None:
+            return
+        try:
+            version = await self._version(redis)
+            await redis.delete(*(self._redis_key(version, key) for key in keys))
+        except RedisError as e:
+            self.stats["errors"] += 1
+            logger.warning(f"缓存删除失败 {self.namespace}: {e}")
+
+    def snapshot(self) -> dict:
+        """命中统计"""
+        hits = self.stats["l1_hits"] + self.stats["l2_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "local_size": len(self.local)
+        }
+
+
+_registry: Dict[str, VersionedCache] = {}
+
+
+def cache_stats() -> Dict[str, dict]:
+    """所有缓存的命中统计（/metrics 使用）"""
+    return {namespace: cache.snapshot() for namespace, cache in _registry.items()}
+
+
+def make_key(*parts: Any, **params: Any) -> str:
+    """由位置参数和关键字参数构造稳定的缓存 key（忽略值为 None 的参数）"""
+    items: List[str] = [str(part) for part in parts]
+    items += [f"{name}={params[name]}" for name in sorted(params) if params[name] is not None]
+    return ":".join(items)
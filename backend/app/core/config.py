@@ -13,6 +13,10 @@ class Settings(BaseSettings):
 
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50  # 每个进程的连接池上限
+    REDIS_POOL_TIMEOUT: int = 5  # 连接池满时等待空闲连接的时间（秒）
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # 连接空闲超过该时间后使用前先 PING（秒）
+    REDIS_SOCKET_TIMEOUT: float = 5.0  # 连接/读写超时（秒）
 
     # 微信小程序配置
     WECHAT_APP_ID: str = ""
@@ -38,6 +42,62 @@ class Settings(BaseSettings):
     MINIO_SECURE: bool = False
     # Docker内部访问（注意：Minio SDK endpoint 不带 http(s):// 前缀）
     MINIO_INTERNAL_ENDPOINT: str = "minio:9000"
+    MINIO_UPLOAD_THREADS: int = 8  # 执行 SDK 阻塞调用的线程数
+    MINIO_UPLOAD_CONCURRENCY: int = 4  # 批量上传时同时上传的文件数
+    MINIO_PART_SIZE: int = 10 * 1024 * 1024  # 分片大小（字节，最小 5MB），超过则分片上传
+
+    # 图片变体（缩略图/中图/大图，JPEG + WebP）
+    IMAGE_VARIANTS_ENABLED: bool = True
+    IMAGE_PROCESS_WORKERS: int = 0  # 图片处理进程数，0 表示 CPU 核数
+    IMAGE_JPEG_QUALITY: int = 85
+    IMAGE_WEBP_QUALITY: int = 80
+    IMAGE_MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 图片上传大小上限（字节）
+
+    # 热点商品Redis库存（秒杀/拼团）
+    FLASH_STOCK_ENABLED: bool = False
+    FLASH_STOCK_RESERVATION_TTL: int = 7 * 24 * 3600  # 订单预占记录保留时间（秒）
+    FLASH_STOCK_SYNC_INTERVAL: int = 5  # 回写 products.stock 的间隔（秒）
+
+    # 读缓存（Redis L2 + 进程内 L1）
+    CACHE_ENABLED: bool = True
+    CACHE_TTL: int = 300  # Redis 缓存过期时间（秒）
+    CACHE_LOCAL_TTL: int = 5  # 进程内缓存过期时间（秒），即跨进程失效的最大延迟
+    CACHE_LOCAL_MAXSIZE: int = 1024  # 进程内缓存最大条目数（LRU淘汰）
+
+    # 运行指标 /metrics（缓存命中率、Redis连接池、超时取消数），开启后仍需管理员Token
+    METRICS_ENABLED: bool = False
+
+    # 商品搜索：auto（PostgreSQL 用 tsvector 索引，其他用内存索引）/ database / memory
+    SEARCH_BACKEND: str = "auto"
+
+    # 站内消息未读计数（Redis 计数器）
+    MESSAGE_UNREAD_TTL: int = 7 * 24 * 3600  # 计数器过期时间（秒），过期后从数据库重新统计
+    MESSAGE_UNREAD_RECONCILE_INTERVAL: int = 600  # 与数据库对账的间隔（秒），0 表示不启动
+    MESSAGE_BROADCAST_CHUNK_SIZE: int = 5000  # 群发每批写入的消息数（每批提交一次）
+
+    # 消息发送队列（模板消息/短信，后台 worker 异步发送）
+    NOTIFICATION_WORKER_ENABLED: bool = True  # 随应用启动 worker（也可 python -m app.tasks.notification_worker 独立部署）
+    NOTIFICATION_SENDER: str = "stub"  # 发送通道，stub 为本地模拟（不调用第三方接口）
+    NOTIFICATION_CONCURRENCY: int = 20  # 同时进行的第三方调用数
+    NOTIFICATION_BATCH_SIZE: int = 100  # 每次领取的任务数
+    NOTIFICATION_POLL_INTERVAL: float = 1.0  # 队列为空时的轮询间隔（秒）
+    NOTIFICATION_LEASE_SECONDS: int = 60  # 领取后的占用时间，worker 异常退出后任务在此之后重新可见
+    NOTIFICATION_MAX_RETRIES: int = 5  # 最大重试次数，超过后标记为发送失败
+    NOTIFICATION_RETRY_BACKOFF: float = 2.0  # 重试退避基数（秒），第 n 次重试等待 基数 * 2^(n-1)
+    NOTIFICATION_RETRY_BACKOFF_MAX: float = 600.0  # 重试等待上限（秒）
+
+    # 超时未支付订单自动取消（归还库存）
+    ORDER_EXPIRY_ENABLED: bool = True  # 随应用启动（也可 python -m app.tasks.order_expiry 独立部署）
+    ORDER_PAYMENT_TTL: int = 30 * 60  # 下单后未支付的保留时间（秒）
+    ORDER_EXPIRY_INTERVAL: int = 60  # 扫描间隔（秒）
+    ORDER_EXPIRY_BATCH_SIZE: int = 200  # 每个事务取消的订单数
+
+    # 订单号（时间 + 机器号 + 序列号）
+    ORDER_NO_WORKER_ID: int = -1  # 固定机器号（0-1023，仅单进程部署使用）；-1 表示从Redis租用
+    ORDER_NO_WORKER_TTL: int = 60  # 机器号租约时间（秒），每 1/3 租约续租一次
+
+    # 签到日历（Redis 位图，每用户每月一个 key）
+    SIGN_IN_CALENDAR_TTL: int = 62 * 24 * 3600  # 位图过期时间（秒），过期后从签到记录重新加载
 
     # 服务配置
     API_HOST: str = "0.0.0.0"
@@ -1,8 +1,12 @@
 """CRUD基础类"""
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update, delete
+from sqlalchemy import select, func, update, delete, tuple_, Select
 
 from app.core.database import Base
 
@@ -11,8 +15,55 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+@dataclass
+class Page:
+    """分页结果
+
+    兼容 `items, total = await crud.get_multi(...)` 的二元解包写法。
+    with_total=False 时 total 为 None，只通过 has_more 判断是否还有下一页。
+    """
+    items: List[Any]
+    total: Optional[int]
+    has_more: bool
+
+    def __iter__(self):
+        return iter((self.items, self.total))
+
+
+@dataclass
+class CursorPage:
+    """游标分页结果，next_cursor 为 None 表示已到最后一页"""
+    items: List[Any]
+    next_cursor: Optional[str]
+    has_more: bool
+
+
+class InvalidCursorError(ValueError):
+    """分页游标无法解析"""
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """把 (created_at, id) 编码为不透明游标"""
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标为 (created_at, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"无效的分页游标: {cursor}") from e
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    """CRUD基础类"""
+    """CRUD基础类
+
+    写方法默认各自提交；传 commit=False 时只写入会话，由调用方在
+    app.core.database.transaction 块结束时统一提交（多步业务一个事务、一次提交）。
+    """
 
     def __init__(self, model: Type[ModelType]):
         self.model = model
@@ -28,35 +79,128 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         *,
         skip: int = 0,
         limit: int = 100,
+        with_total: bool = True,
+        options: Sequence[Any] = (),
         **filters
-    ) -> tuple[List[ModelType], int]:
+    ) -> Page:
         """
         获取多条记录
-        返回: (记录列表, 总数)
+        options: 加载选项（如 selectinload(Model.children)）
+        返回: Page（可解包为 (记录列表, 总数)）
         """
-        query = select(self.model)
+        query = select(self.model).options(*options)
 
         # 应用过滤条件
         for key, value in filters.items():
             if value is not None and hasattr(self.model, key):
                 query = query.where(getattr(self.model, key) == value)
 
-        # 获取总数
-        count_query = select(func.count()).select_from(query.subquery())
-        total = (await db.execute(count_query)).scalar()
+        return await self.paginate(db, query, skip=skip, limit=limit, with_total=with_total)
+
+    async def paginate(
+        self,
+        db: AsyncSession,
+        query: Select,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        with_total: bool = True
+    ) -> Page:
+        """
+        分页查询（单次往返）
+
+        - with_total=True: 通过 count(*) OVER () 在同一条SQL中返回总数
+        - with_total=False: 多取一条（limit+1）判断 has_more，不计算总数，适合无限滚动列表
+
+        Args:
+            query: 只选择一个实体的 select 语句（已包含过滤和排序）
+        """
+        if not with_total:
+            result = await db.execute(query.offset(skip).limit(limit + 1))
+            rows = list(result.scalars().all())
+            return Page(items=rows[:limit], total=None, has_more=len(rows) > limit)
+
+        result = await db.execute(
+            query.add_columns(func.count().over().label("_total")).offset(skip).limit(limit)
+        )
+        rows = result.all()
+        items = [row[0] for row in rows]
+
+        if rows:
+            total = rows[0][1]
+        elif skip > 0:
+            # 页码越界时窗口计数拿不到总数，退回一次 COUNT
+            count_query = select(func.count()).select_from(query.order_by(None).subquery())
+            total = (await db.execute(count_query)).scalar() or 0
+        else:
+            total = 0
+
+        return Page(items=items, total=total, has_more=skip + len(items) < total)
+
+    async def get_multi_cursor(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        options: Sequence[Any] = (),
+        **filters
+    ) -> CursorPage:
+        """
+        游标分页获取多条记录（按 created_at, id 倒序）
+        options: 加载选项（如 selectinload(Model.children)）
+        """
+        query = select(self.model).options(*options)
+
+        for key, value in filters.items():
+            if value is not None and hasattr(self.model, key):
+                query = query.where(getattr(self.model, key) == value)
+
+        return await self.paginate_cursor(db, query, cursor=cursor, limit=limit)
 
-        # 分页
-        query = query.offset(skip).limit(limit)
-        result = await db.execute(query)
-        items = result.scalars().all()
+    async def paginate_cursor(
+        self,
+        db: AsyncSession,
+        query: Select,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> CursorPage:
+        """
+        键集（游标）分页
 
-        return list(items), total
+        按 (created_at DESC, id DESC) 排序，下一页条件为
+        (created_at, id) < 游标值，配合 (…, created_at, id) 复合索引，
+        任意深度的翻页都只扫描 limit+1 行，不受 OFFSET 影响。
+
+        Args:
+            query: 只选择一个实体的 select 语句（已有排序会被替换）
+            cursor: 上一页返回的 next_cursor，为空表示第一页
+
+        Raises:
+            InvalidCursorError: 游标无法解析
+        """
+        created_at, id = self.model.created_at, self.model.id
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            query = query.where(tuple_(created_at, id) < tuple_(cursor_created_at, cursor_id))
 
-    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
-        """创建记录"""
+        query = query.order_by(None).order_by(created_at.desc(), id.desc()).limit(limit + 1)
+        rows = list((await db.execute(query)).scalars().all())
+
+        has_more = len(rows) > limit
+        items = rows[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if has_more else None
+        return CursorPage(items=items, next_cursor=next_cursor, has_more=has_more)
+
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType, commit: bool = True) -> ModelType:
+        """创建记录（commit=False 时只 flush 以取得主键）"""
         obj_in_data = obj_in.model_dump() if isinstance(obj_in, BaseModel) else obj_in
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
+        if not commit:
+            await db.flush()
+            return db_obj
         await db.commit()
         await db.refresh(db_obj)
         return db_obj
@@ -66,9 +210,10 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db: AsyncSession,
         *,
         db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        commit: bool = True
     ) -> ModelType:
-        """更新记录"""
+        """更新记录（commit=False 时只写入会话，随事务提交）"""
         if isinstance(obj_in, BaseModel):
             update_data = obj_in.model_dump(exclude_unset=True)
         else:
@@ -79,16 +224,18 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 setattr(db_obj, field, value)
 
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        if commit:
+            await db.commit()
+            await db.refresh(db_obj)
         return db_obj
 
-    async def delete(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
-        """删除记录"""
+    async def delete(self, db: AsyncSession, *, id: int, commit: bool = True) -> Optional[ModelType]:
+        """删除记录（commit=False 时随事务提交）"""
         obj = await self.get(db, id)
         if obj:
             await db.delete(obj)
-            await db.commit()
+            if commit:
+                await db.commit()
         return obj
 
     async def get_by_field(
@@ -1,6 +1,9 @@
 """
 数据库连接和会话管理
 """
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
 from app.core.config import settings
@@ -34,3 +37,21 @@ async def get_db() -> AsyncSession:
             yield session
         finally:
             await session.close()
+
+
+@asynccontextmanager
+async def transaction(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """
+    工作单元：块内的写操作（服务层方法传 commit=False）在退出时一次提交，异常时整体回滚
+
+    用法:
+        async with transaction(db):
+            await order.update_order_status(db, order_obj, "cancelled", commit=False)
+            await inventory.release(db, quantities)
+    """
+    try:
+        yield db
+    except BaseException:
+        await db.rollback()
+        raise
+    await db.commit()
@@ -1,8 +1,16 @@
 """
 Redis客户端
+
+进程内共享一个异步客户端和有上限的连接池（在 main.py 的 lifespan 中创建和关闭），
+请求之间复用连接，不再每次依赖注入都新建连接池和TCP连接。
+连接池满时等待空闲连接（最多 REDIS_POOL_TIMEOUT 秒），而不是无限制地新建连接。
 """
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
 import redis
 from redis import asyncio as aioredis
+from redis.asyncio.client import Pipeline
 
 from app.core.config import settings
 
@@ -10,14 +18,82 @@ from app.core.config import settings
 # 创建同步Redis客户端（用于某些同步场景）
 redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
 
+_pool: Optional[aioredis.BlockingConnectionPool] = None
+_client: Optional[aioredis.Redis] = None
+
+
+def init_redis() -> aioredis.Redis:
+    """创建共享的异步客户端（幂等）"""
+    global _pool, _client
+    if _client is None:
+        _pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT
+        )
+        _client = aioredis.Redis(connection_pool=_pool)
+    return _client
+
+
+async def close_redis():
+    """关闭共享客户端并断开池中所有连接"""
+    global _pool, _client
+    if _client is not None:
+        await _client.aclose()
+        await _pool.disconnect()
+    _pool = None
+    _client = None
+
+
+def get_redis_client() -> aioredis.Redis:
+    """获取共享的异步客户端（后台任务、脚本使用；未初始化时自动创建）"""
+    return _client or init_redis()
+
 
 async def get_redis():
     """
     获取异步Redis客户端
-    依赖注入使用
+    依赖注入使用（共享连接池，请求结束时不关闭）
     """
-    redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
-    try:
-        yield redis
-    finally:
-        await redis.close()
+    yield get_redis_client()
+
+
+@asynccontextmanager
+async def pipeline(
+    client: Optional[aioredis.Redis] = None,
+    transaction: bool = False
+) -> AsyncIterator[Pipeline]:
+    """
+    批量执行命令（一次往返）
+
+    用法:
+        async with pipeline() as pipe:
+            pipe.get("a")
+            pipe.incr("b")
+        a, b = pipe.results
+
+    Args:
+        client: Redis客户端，默认共享客户端
+        transaction: 是否包在 MULTI/EXEC 中
+    """
+    client = client or get_redis_client()
+    async with client.pipeline(transaction=transaction) as pipe:
+        yield pipe
+        pipe.results = await pipe.execute()
+
+
+def redis_pool_stats() -> Optional[dict]:
+    """连接池使用情况（/metrics 使用），未初始化时返回 None"""
+    if _pool is None:
+        return None
+    in_use = len(_pool._in_use_connections)
+    return {
+        "max_connections": _pool.max_connections,
+        "in_use": in_use,
+        "idle": len(_pool._available_connections),
+        "utilization": round(in_use / _pool.max_connections, 4)
+    }
@@ -1,9 +1,17 @@
 """
 API响应工具
+
+应用默认响应类为 ORJSONResponse。热点端点声明类型化的 response_model
+（如 ApiResponse[PageData[ProductListItem]]），由 pydantic-core 按编译好的 schema 校验和序列化，
+不再经过 jsonable_encoder 逐个反射对象属性。
 """
-from typing import Any, Optional, Generic, TypeVar
+from decimal import Decimal
+from typing import Any, List, Optional, Generic, TypeVar
+
+import orjson
 from pydantic import BaseModel
 from fastapi import status
+from fastapi.responses import JSONResponse
 
 DataT = TypeVar("DataT")
 
@@ -16,6 +24,31 @@ class ApiResponse(BaseModel, Generic[DataT]):
     timestamp: int = 0
 
 
+class PageData(BaseModel, Generic[DataT]):
+    """分页列表响应数据（page_data 的类型）"""
+    items: List[DataT]
+    total: Optional[int] = None
+    page: int
+    size: int
+    pages: Optional[int] = None
+    has_more: bool
+
+
+def _orjson_default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """用 orjson 渲染的 JSON 响应（比标准库 json 快数倍，直接输出 bytes）"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
 def success_response(data: Any = None, message: str = "success") -> ApiResponse:
     """
     成功响应
@@ -36,6 +69,50 @@ def success_response(data: Any = None, message: str = "success") -> ApiResponse:
     )
 
 
+def page_data(page, *, page_no: int, size: int, items: Any = None) -> dict:
+    """
+    分页列表响应数据
+
+    Args:
+        page: CRUDBase 返回的 Page
+        page_no: 页码
+        size: 每页数量
+        items: 序列化后的列表（默认直接使用 page.items）
+
+    Returns:
+        dict: items/total/page/size/pages/has_more，不计总数模式下 total/pages 为 None
+    """
+    total = page.total
+    return {
+        "items": page.items if items is None else items,
+        "total": total,
+        "page": page_no,
+        "size": size,
+        "pages": (total + size - 1) // size if total is not None else None,
+        "has_more": page.has_more
+    }
+
+
+def cursor_page_data(page, *, size: int, items: Any = None) -> dict:
+    """
+    游标分页列表响应数据
+
+    Args:
+        page: CRUDBase 返回的 CursorPage
+        size: 每页数量
+        items: 序列化后的列表（默认直接使用 page.items）
+
+    Returns:
+        dict: items/size/next_cursor/has_more
+    """
+    return {
+        "items": page.items if items is None else items,
+        "size": size,
+        "next_cursor": page.next_cursor,
+        "has_more": page.has_more
+    }
+
+
 def error_response(code: int, message: str, data: Any = None) -> ApiResponse:
     """
     错误响应
@@ -135,3 +135,20 @@ async def get_current_user(
         raise credentials_exception
 
     return payload
+
+
+async def get_current_admin(
+    current_user: dict = Depends(get_current_user)
+) -> dict:
+    """
+    要求管理员Token（/admin/login 签发，type=admin）
+
+    Raises:
+        HTTPException: 非管理员Token
+    """
+    if current_user.get("type") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限",
+        )
+    return current_user
@@ -1,6 +1,6 @@
 """数据库模型模块"""
 from .base import Base, TimestampMixin
-from .user import User, UserAddress, SignInRecord, PointsRecord
+from .user import User, UserAddress, SignInRecord, PointsRecord, UserPointsSummary
 from .merchant import Merchant
 from .product import Product, ProductImage, Category
 from .order import Order, OrderItem, OrderLog
@@ -9,12 +9,13 @@ from .group_buy import GroupBuy, GroupBuyMember
 from .activity import Activity, ActivityRecord, Coupon, UserCoupon
 from .delivery import DeliveryZone, PickupPoint
 from .config import PointRule, Admin
+from .storage import StorageObject
 
 __all__ = [
     # Base
     "Base", "TimestampMixin",
     # User
-    "User", "UserAddress", "SignInRecord", "PointsRecord",
+    "User", "UserAddress", "SignInRecord", "PointsRecord", "UserPointsSummary",
     # Merchant
     "Merchant",
     # Product
@@ -31,4 +32,6 @@ __all__ = [
     "DeliveryZone", "PickupPoint",
     # Config
     "PointRule", "Admin",
+    # Storage
+    "StorageObject",
 ]
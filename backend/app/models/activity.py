@@ -1,6 +1,6 @@
 """活动相关模型"""
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Boolean, DECIMAL
+from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Boolean, DECIMAL, Index
 from sqlalchemy.orm import relationship
 from .base import TimestampMixin
 
@@ -28,6 +28,12 @@ class Activity(TimestampMixin):
 class ActivityRecord(TimestampMixin):
     """用户活动记录表"""
     __tablename__ = "activity_records"
+    __table_args__ = (
+        # 弹窗展示记录查重
+        Index("idx_activity_records_user_activity_date", "user_id", "activity_id", "record_date"),
+        # 活动统计
+        Index("idx_activity_records_activity_date", "activity_id", "record_date"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="记录ID")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="用户ID")
@@ -65,6 +71,12 @@ class Coupon(TimestampMixin):
 class UserCoupon(TimestampMixin):
     """用户优惠券表"""
     __tablename__ = "user_coupons"
+    __table_args__ = (
+        # 我的优惠券（按状态筛选、按过期时间排序）
+        Index("idx_user_coupons_user_status_expire", "user_id", "status", "expire_at"),
+        # 领取查重
+        Index("idx_user_coupons_user_coupon", "user_id", "coupon_id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="记录ID")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="用户ID")
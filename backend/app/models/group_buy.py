@@ -1,6 +1,6 @@
 """拼团相关模型"""
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from .base import TimestampMixin
 
@@ -32,6 +32,9 @@ class GroupBuy(TimestampMixin):
 class GroupBuyMember(TimestampMixin):
     """拼团成员表"""
     __tablename__ = "group_buy_members"
+    __table_args__ = (
+        Index("idx_group_buy_members_group", "group_buy_id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="成员ID")
     group_buy_id = Column(Integer, ForeignKey("group_buys.id", ondelete="CASCADE"), nullable=False, comment="拼团ID")
@@ -1,6 +1,6 @@
 """消息相关模型"""
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Text, Boolean, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from .base import TimestampMixin
 
@@ -21,6 +21,13 @@ class TemplateMessage(TimestampMixin):
 class MessageLog(TimestampMixin):
     """消息发送记录表"""
     __tablename__ = "message_logs"
+    __table_args__ = (
+        # 游标分页 (created_at, id)
+        Index("idx_msg_logs_created_id", "created_at", "id"),
+        Index("idx_msg_logs_user_created_id", "user_id", "created_at", "id"),
+        # 发送队列：只索引待发送的记录
+        Index("idx_msg_logs_queue", "next_retry_at", postgresql_where=text("send_status = 0")),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="记录ID")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="用户ID")
@@ -32,6 +39,8 @@ class MessageLog(TimestampMixin):
     error_msg = Column(Text, comment="错误信息")
     send_time = Column(DateTime, comment="发送时间")
     scene_type = Column(Integer, comment="场景类型 1-订单创建 2-支付成功 3-订单发货 4-订单完成")
+    retry_count = Column(Integer, default=0, nullable=False, comment="已重试次数")
+    next_retry_at = Column(DateTime, comment="下次可发送时间（待发送记录）")
 
     # 关系
     user = relationship("User", backref="message_logs")
@@ -40,6 +49,12 @@ class MessageLog(TimestampMixin):
 class InternalMessage(TimestampMixin):
     """站内消息表"""
     __tablename__ = "internal_messages"
+    __table_args__ = (
+        # 未读数 / 全部已读
+        Index("idx_internal_msgs_user_read", "user_id", "is_read"),
+        # 消息列表（按时间倒序）
+        Index("idx_internal_msgs_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="消息ID")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="用户ID")
@@ -58,6 +73,10 @@ class InternalMessage(TimestampMixin):
 class SmsLog(TimestampMixin):
     """短信发送记录表"""
     __tablename__ = "sms_logs"
+    __table_args__ = (
+        # 发送队列：只索引待发送的记录
+        Index("idx_sms_logs_queue", "next_retry_at", postgresql_where=text("send_status = 0")),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="记录ID")
     phone = Column(String(20), nullable=False, comment="手机号")
@@ -66,3 +85,5 @@ class SmsLog(TimestampMixin):
     send_status = Column(Integer, default=0, nullable=False, comment="发送状态 0-待发送 1-发送成功 2-发送失败")
     error_msg = Column(Text, comment="错误信息")
     send_time = Column(DateTime, comment="发送时间")
+    retry_count = Column(Integer, default=0, nullable=False, comment="已重试次数")
+    next_retry_at = Column(DateTime, comment="下次可发送时间（待发送记录）")
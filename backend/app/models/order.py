@@ -1,6 +1,6 @@
 """订单相关模型"""
 from datetime import datetime
-from sqlalchemy import DateTime,  Column, String, Integer, Text, DECIMAL, ForeignKey, Enum as SQLEnum
+from sqlalchemy import DateTime,  Column, String, Integer, Text, DECIMAL, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from .base import TimestampMixin
 
@@ -8,6 +8,13 @@ from .base import TimestampMixin
 class Order(TimestampMixin):
     """订单表"""
     __tablename__ = "orders"
+    __table_args__ = (
+        # 游标分页 (created_at, id)
+        Index("idx_orders_created_id", "created_at", "id"),
+        Index("idx_orders_status_created_id", "status", "created_at", "id"),
+        # 用户订单列表（按状态筛选）
+        Index("idx_orders_user_status_created", "user_id", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="订单ID")
     order_no = Column(String(32), unique=True, nullable=False, index=True, comment="订单号")
@@ -40,6 +47,9 @@ class Order(TimestampMixin):
 class OrderItem(TimestampMixin):
     """订单商品表"""
     __tablename__ = "order_items"
+    __table_args__ = (
+        Index("idx_order_items_order", "order_id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="明细ID")
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, comment="订单ID")
@@ -58,6 +68,9 @@ class OrderItem(TimestampMixin):
 class OrderLog(TimestampMixin):
     """订单日志表"""
     __tablename__ = "order_logs"
+    __table_args__ = (
+        Index("idx_order_logs_order", "order_id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="日志ID")
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, comment="订单ID")
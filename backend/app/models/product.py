@@ -1,7 +1,8 @@
 """商品相关模型"""
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Text, DECIMAL, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Text, DECIMAL, ForeignKey, Boolean, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from .base import TimestampMixin
 
 
@@ -23,6 +24,11 @@ class Category(TimestampMixin):
 class Product(TimestampMixin):
     """商品表"""
     __tablename__ = "products"
+    __table_args__ = (
+        Index("idx_products_search", "search_vector", postgresql_using="gin"),
+        Index("idx_products_merchant", "merchant_id"),
+        Index("idx_products_category", "category_id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="商品ID")
     merchant_id = Column(Integer, ForeignKey("merchants.id", ondelete="CASCADE"), nullable=False, comment="商家ID")
@@ -41,6 +47,8 @@ class Product(TimestampMixin):
     group_buy_price = Column(DECIMAL(10, 2), comment="拼团价")
     group_buy_min_count = Column(Integer, comment="拼团最少人数")
     tags = Column(Text, comment="标签 JSON数组")
+    # 搜索词项（名称/标签/描述的 n-gram，见 app/services/search_service.py），默认不加载
+    search_vector = deferred(Column(TSVECTOR().with_variant(Text, "sqlite"), comment="搜索向量"))
 
     # 关系
     merchant = relationship("Merchant", back_populates="products")
@@ -52,10 +60,15 @@ class Product(TimestampMixin):
 class ProductImage(TimestampMixin):
     """商品图片表"""
     __tablename__ = "product_images"
+    __table_args__ = (
+        # 商品图片 / 批量取主图
+        Index("idx_product_images_product_sort", "product_id", "sort_order"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="图片ID")
     product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False, comment="商品ID")
     image_url = Column(String(255), nullable=False, comment="图片URL")
+    variants = Column(Text, comment="图片变体URL JSON {变体名称: {格式: URL}}")
     sort_order = Column(Integer, default=0, comment="排序")
 
     # 关系
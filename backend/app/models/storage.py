@@ -0,0 +1,16 @@
+"""对象存储相关模型"""
+from sqlalchemy import Column, String, Integer, BigInteger
+
+from .base import TimestampMixin
+
+
+class StorageObject(TimestampMixin):
+    """按内容寻址的上传对象（对象名由 SHA-256 确定，相同内容只存一份）"""
+    __tablename__ = "storage_objects"
+
+    id = Column(Integer, primary_key=True, autoincrement=True, comment="ID")
+    object_name = Column(String(255), nullable=False, unique=True, comment="MinIO对象名")
+    sha256 = Column(String(64), nullable=False, comment="内容SHA-256")
+    size = Column(BigInteger, nullable=False, comment="字节数")
+    content_type = Column(String(100), comment="内容类型")
+    ref_count = Column(Integer, nullable=False, default=1, comment="上传次数（每次上传 +1，delete_file -1，为 0 时删除对象；不是实际引用数）")
@@ -1,6 +1,6 @@
 """用户相关模型"""
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, Text, DECIMAL, ForeignKey
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, Text, DECIMAL, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .base import TimestampMixin
 
@@ -30,6 +30,9 @@ class User(TimestampMixin):
 class UserAddress(TimestampMixin):
     """用户地址表"""
     __tablename__ = "user_addresses"
+    __table_args__ = (
+        Index("idx_user_addresses_user", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="地址ID")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="用户ID")
@@ -50,6 +53,10 @@ class UserAddress(TimestampMixin):
 class SignInRecord(TimestampMixin):
     """签到记录表"""
     __tablename__ = "sign_in_records"
+    __table_args__ = (
+        # 每天只能签到一次（签到 INSERT ... ON CONFLICT DO NOTHING 依赖此约束）
+        UniqueConstraint("user_id", "sign_date", name="sign_in_records_user_id_sign_date_key"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="记录ID")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="用户ID")
@@ -63,6 +70,12 @@ class SignInRecord(TimestampMixin):
 class PointsRecord(TimestampMixin):
     """积分记录表"""
     __tablename__ = "points_records"
+    __table_args__ = (
+        # 游标分页 (user_id, created_at, id)
+        Index("idx_points_user_created_id", "user_id", "created_at", "id"),
+        # 积分汇总（按获得/消耗求和）
+        Index("idx_points_user_type", "user_id", "change_type"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True, comment="记录ID")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="用户ID")
@@ -74,3 +87,15 @@ class PointsRecord(TimestampMixin):
 
     # 关系
     user = relationship("User", back_populates="points_records")
+
+
+class UserPointsSummary(TimestampMixin):
+    """用户积分汇总表（积分记录/签到写入时在同一事务内增量维护）"""
+    __tablename__ = "user_points_summary"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, comment="用户ID")
+    earned_points = Column(Integer, default=0, nullable=False, comment="累计获得积分")
+    spent_points = Column(Integer, default=0, nullable=False, comment="累计消耗积分")
+    sign_count = Column(Integer, default=0, nullable=False, comment="签到次数")
+    current_streak = Column(Integer, default=0, nullable=False, comment="截至最后签到日的连续签到天数")
+    last_sign_date = Column(String(10), comment="最后签到日期 YYYY-MM-DD")
@@ -1,6 +1,6 @@
 """消息相关Schemas"""
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -52,6 +52,13 @@ class InternalMessageCreate(InternalMessageBase):
     scene_id: Optional[int] = None
 
 
+class InternalMessageBroadcast(InternalMessageBase):
+    """群发站内消息"""
+    user_ids: Optional[List[int]] = Field(None, description="接收用户ID，为空时发给所有正常状态的用户")
+    scene_type: Optional[int] = None
+    scene_id: Optional[int] = None
+
+
 class InternalMessageResponse(InternalMessageBase):
     """站内消息响应"""
     id: int
@@ -22,6 +22,7 @@ class OrderItemCreate(OrderItemBase):
 
 class OrderItemResponse(OrderItemBase):
     """订单商品响应"""
+    product_id: Optional[int] = None  # 商品删除后置空
     id: int
     order_id: int
     created_at: datetime
@@ -87,3 +88,17 @@ class OrderLogResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class OrderListItem(OrderResponse):
+    """订单列表项（含前端展示状态）"""
+    display_status: str
+    display_status_name: str
+    items: Optional[list[OrderItemResponse]] = None  # include=items 时返回
+
+
+class OrderDetailData(BaseModel):
+    """订单详情响应数据"""
+    order: OrderListItem
+    items: list[OrderItemResponse]
+    logs: list[OrderLogResponse]
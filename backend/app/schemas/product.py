@@ -1,7 +1,8 @@
 """商品相关Schemas"""
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field
+import json
+from typing import Optional, Dict, List
+from pydantic import BaseModel, Field, field_validator
 
 
 class CategoryBase(BaseModel):
@@ -99,8 +100,27 @@ class ProductImageResponse(BaseModel):
     id: int
     product_id: int
     image_url: str
+    variants: Optional[Dict[str, Dict[str, str]]] = Field(None, description="图片变体URL {变体名称: {格式: URL}}")
     sort_order: int
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+    @field_validator("variants", mode="before")
+    @classmethod
+    def parse_variants(cls, value):
+        """数据库中以 JSON 文本存储"""
+        return json.loads(value) if isinstance(value, str) else value
+
+
+class ProductListItem(ProductResponse):
+    """商品列表项（含主图及其变体）"""
+    main_image: Optional[str] = None
+    main_image_variants: Optional[Dict[str, Dict[str, str]]] = None
+
+
+class ProductDetailData(BaseModel):
+    """商品详情响应数据"""
+    product: ProductResponse
+    images: List[ProductImageResponse]
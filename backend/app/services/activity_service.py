@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, desc, func
 
 from app.models.activity import Activity, ActivityRecord, Coupon, UserCoupon
-from app.core.crud import CRUDBase
+from app.core.crud import CRUDBase, Page
 from app.schemas.activity import (
     ActivityCreate, ActivityUpdate,
     CouponCreate, CouponUpdate,
@@ -189,25 +189,18 @@ class CRUDDiscount(CRUDBase[Coupon, CouponCreate, CouponUpdate]):
         user_id: int,
         status: Optional[int] = None,
         skip: int = 0,
-        limit: int = 20
-    ) -> Tuple[List[UserCoupon], int]:
+        limit: int = 20,
+        with_total: bool = True
+    ) -> Page:
         """分页获取用户优惠券"""
         query = select(UserCoupon).where(UserCoupon.user_id == user_id)
 
         if status is not None:
             query = query.where(UserCoupon.status == status)
 
-        # 获取总数
-        count_query = select(func.count()).select_from(query.subquery())
-        total = (await db.execute(count_query)).scalar()
-
         # 分页
         query = query.order_by(UserCoupon.expire_at.asc(), UserCoupon.created_at.desc())
-        query = query.offset(skip).limit(limit)
-        result = await db.execute(query)
-        items = result.scalars().all()
-
-        return list(items), total
+        return await self.paginate(db, query, skip=skip, limit=limit, with_total=with_total)
 
 
 class CRUDUserCoupon(CRUDBase[UserCoupon, UserCouponCreate, UserCouponUpdate]):
@@ -0,0 +1,335 @@
+"""热点商品Redis库存服务（秒杀/拼团）
+
+热点商品（is_hot / is_group_buy）的库存预加载到Redis计数器，下单时用Lua脚本
+原子扣减，热路径不访问PostgreSQL，避免所有请求在 products 同一行锁上排队。
+
+Key 约定：
+- flash_stock:{product_id}          可售库存计数器
+- flash_stock:{product_id}:delta    已扣减但尚未回写到 products.stock 的数量
+- flash_stock:dirty                 存在待回写 delta 的商品ID集合
+- flash_stock:order:{order_no}      订单在Redis中的预占明细 {product_id: quantity}
+
+不变式：计数器 = products.stock - delta。后台任务（app/tasks/flash_stock_sync.py）
+周期性取走 delta 并写回 products.stock。
+"""
+from typing import Dict, Iterable, List, Mapping, Set, Tuple
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.models.product import Product
+from app.services.inventory_service import inventory
+from app.services.product_service import product as product_service
+
+KEY_PREFIX = "flash_stock:"
+DIRTY_KEY = f"{KEY_PREFIX}dirty"
+
+# KEYS: [预占记录, dirty集合, 计数器1, delta1, 计数器2, delta2, ...]
+# ARGV: [预占TTL, 商品ID1, 数量1, 商品ID2, 数量2, ...]
+# 返回: {1, 未加载的商品ID...} 成功；{0, 库存不足的商品ID} 失败（不做任何扣减）
+RESERVE_SCRIPT = """
+local n = (#KEYS - 2) / 2
+local skipped = {}
+local loaded = {}
+for i = 1, n do
+    local stock = redis.call('GET', KEYS[2 * i + 1])
+    if not stock then
+        table.insert(skipped, ARGV[2 * i])
+    else
+        if tonumber(stock) < tonumber(ARGV[2 * i + 1]) then
+            return {0, ARGV[2 * i]}
+        end
+        table.insert(loaded, i)
+    end
+end
+for _, i in ipairs(loaded) do
+    local qty = tonumber(ARGV[2 * i + 1])
+    redis.call('DECRBY', KEYS[2 * i + 1], qty)
+    redis.call('INCRBY', KEYS[2 * i + 2], qty)
+    redis.call('SADD', KEYS[2], ARGV[2 * i])
+    redis.call('HINCRBY', KEYS[1], ARGV[2 * i], qty)
+end
+if #loaded > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+local result = {1}
+for _, pid in ipairs(skipped) do
+    table.insert(result, pid)
+end
+return result
+"""
+
+# KEYS: [预占记录, dirty集合]  ARGV: [key前缀]
+# 返回: [商品ID1, 数量1, ...] 在Redis中归还成功的明细（商品已卸载的行由调用方走数据库归还）
+RELEASE_SCRIPT = """
+local lines = redis.call('HGETALL', KEYS[1])
+if #lines == 0 then
+    return {}
+end
+redis.call('DEL', KEYS[1])
+local released = {}
+for i = 1, #lines, 2 do
+    local counter = ARGV[1] .. lines[i]
+    if redis.call('EXISTS', counter) == 1 then
+        local qty = tonumber(lines[i + 1])
+        redis.call('INCRBY', counter, qty)
+        redis.call('DECRBY', counter .. ':delta', qty)
+        redis.call('SADD', KEYS[2], lines[i])
+        table.insert(released, lines[i])
+        table.insert(released, qty)
+    end
+end
+return released
+"""
+
+# KEYS: [预占记录]  ARGV: [key前缀]
+# 返回: [商品ID1, 数量1, ...] 计数器仍在的预占明细（只读，不归还）
+RESERVED_SCRIPT = """
+local lines = redis.call('HGETALL', KEYS[1])
+local reserved = {}
+for i = 1, #lines, 2 do
+    if redis.call('EXISTS', ARGV[1] .. lines[i]) == 1 then
+        table.insert(reserved, lines[i])
+        table.insert(reserved, tonumber(lines[i + 1]))
+    end
+end
+return reserved
+"""
+
+# KEYS: [dirty集合, delta]  ARGV: [商品ID]  原子地取走并清零 delta
+DRAIN_SCRIPT = """
+redis.call('SREM', KEYS[1], ARGV[1])
+return tonumber(redis.call('GETSET', KEYS[2], 0) or '0')
+"""
+
+# KEYS: [计数器, delta, dirty集合]  ARGV: [商品ID]  删除计数器并取走剩余 delta
+UNLOAD_SCRIPT = """
+redis.call('DEL', KEYS[1])
+redis.call('SREM', KEYS[3], ARGV[1])
+local delta = tonumber(redis.call('GET', KEYS[2]) or '0')
+redis.call('DEL', KEYS[2])
+return delta
+"""
+
+# KEYS: [计数器, delta]  ARGV: [库存]  仅在未加载时初始化
+LOAD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1])
+redis.call('SET', KEYS[2], 0)
+return 1
+"""
+
+
+class FlashStockReservationError(Exception):
+    """Redis库存不足（未做任何扣减）"""
+
+    def __init__(self, product_id: int):
+        self.product_id = product_id
+        super().__init__(f"商品库存不足: {product_id}")
+
+
+def _counter_key(product_id: int) -> str:
+    return f"{KEY_PREFIX}{product_id}"
+
+
+def _delta_key(product_id: int) -> str:
+    return f"{KEY_PREFIX}{product_id}:delta"
+
+
+def _order_key(order_no: str) -> str:
+    return f"{KEY_PREFIX}order:{order_no}"
+
+
+class FlashStockService:
+    """热点商品Redis库存服务"""
+
+    @property
+    def enabled(self) -> bool:
+        return settings.FLASH_STOCK_ENABLED
+
+    @staticmethod
+    def is_flash_product(product: Product) -> bool:
+        """是否为走Redis库存的热点商品"""
+        return bool(product.is_hot or product.is_group_buy)
+
+    async def load_counters(self, redis: Redis, stocks: Mapping[int, int]) -> List[int]:
+        """
+        初始化库存计数器（已加载的商品保持不变）
+
+        Returns:
+            本次新加载的商品ID
+        """
+        script = redis.register_script(LOAD_SCRIPT)
+        loaded = []
+        for product_id, stock in stocks.items():
+            if await script(keys=[_counter_key(product_id), _delta_key(product_id)], args=[stock]):
+                loaded.append(product_id)
+        return loaded
+
+    async def preload(
+        self,
+        redis: Redis,
+        db: AsyncSession,
+        product_ids: Iterable[int] = ()
+    ) -> List[int]:
+        """
+        从数据库预加载热点商品库存
+
+        Args:
+            product_ids: 指定商品；为空则加载所有上架的热销/拼团商品
+        """
+        query = select(Product.id, Product.stock).where(Product.status == 1)
+        product_ids = list(product_ids)
+        if product_ids:
+            query = query.where(Product.id.in_(product_ids))
+        else:
+            query = query.where(or_(Product.is_hot.is_(True), Product.is_group_buy.is_(True)))
+
+        result = await db.execute(query)
+        loaded = await self.load_counters(redis, dict(result.all()))
+        logger.info(f"热点库存预加载: {loaded}")
+        return loaded
+
+    async def unload(self, redis: Redis, db: AsyncSession, product_id: int):
+        """卸载商品计数器并回写剩余 delta，之后该商品库存回到数据库路径"""
+        script = redis.register_script(UNLOAD_SCRIPT)
+        delta = int(await script(
+            keys=[_counter_key(product_id), _delta_key(product_id), DIRTY_KEY],
+            args=[product_id]
+        ))
+        if not delta:
+            return
+
+        try:
+            stocks = await inventory.adjust(db, {product_id: -delta})
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            # 计数器已删除，delta 放回后由后台同步任务继续回写
+            await self.restore_deltas(redis, {product_id: delta})
+            raise
+
+        await product_service.invalidate_stock(redis, stocks, {product_id: -delta})
+
+    async def get_stock(self, redis: Redis, product_id: int):
+        """获取Redis中的可售库存，未加载返回None"""
+        stock = await redis.get(_counter_key(product_id))
+        return int(stock) if stock is not None else None
+
+    async def reserve(
+        self,
+        redis: Redis,
+        order_no: str,
+        quantities: Mapping[int, int]
+    ) -> Set[int]:
+        """
+        原子预占整单中已加载商品的库存
+
+        Args:
+            order_no: 订单号（预占记录按订单保存，用于取消时归还）
+            quantities: {商品ID: 数量}
+
+        Returns:
+            未加载到Redis的商品ID（调用方需走数据库扣减）
+
+        Raises:
+            FlashStockReservationError: 任一已加载商品库存不足（不做任何扣减）
+        """
+        if not quantities:
+            return set()
+
+        keys = [_order_key(order_no), DIRTY_KEY]
+        args = [settings.FLASH_STOCK_RESERVATION_TTL]
+        for product_id, quantity in quantities.items():
+            keys += [_counter_key(product_id), _delta_key(product_id)]
+            args += [product_id, quantity]
+
+        script = redis.register_script(RESERVE_SCRIPT)
+        result = await script(keys=keys, args=args)
+        if int(result[0]) == 0:
+            raise FlashStockReservationError(int(result[1]))
+        return {int(product_id) for product_id in result[1:]}
+
+    async def release(self, redis: Redis, order_no: str) -> Dict[int, int]:
+        """
+        归还订单在Redis中的预占（幂等，重复调用返回空）
+
+        Returns:
+            {商品ID: 数量} 已在Redis中归还的明细
+        """
+        script = redis.register_script(RELEASE_SCRIPT)
+        result = await script(keys=[_order_key(order_no), DIRTY_KEY], args=[KEY_PREFIX])
+        return {int(result[i]): int(result[i + 1]) for i in range(0, len(result), 2)}
+
+    async def reserved(self, redis: Redis, order_no: str) -> Dict[int, int]:
+        """
+        查看订单在Redis中的预占（不归还），用于先提交数据库事务、提交后再 release
+
+        Returns:
+            {商品ID: 数量} 计数器仍在、可在Redis中归还的明细
+        """
+        script = redis.register_script(RESERVED_SCRIPT)
+        result = await script(keys=[_order_key(order_no)], args=[KEY_PREFIX])
+        return {int(result[i]): int(result[i + 1]) for i in range(0, len(result), 2)}
+
+    async def drain_deltas(self, redis: Redis, product_ids: Iterable[int] = ()) -> Dict[int, int]:
+        """取走待回写的 delta（取走即清零）"""
+        product_ids = list(product_ids) or [int(pid) for pid in await redis.smembers(DIRTY_KEY)]
+        script = redis.register_script(DRAIN_SCRIPT)
+        deltas = {}
+        for product_id in product_ids:
+            delta = int(await script(keys=[DIRTY_KEY, _delta_key(product_id)], args=[product_id]))
+            if delta:
+                deltas[product_id] = delta
+        return deltas
+
+    async def restore_deltas(self, redis: Redis, deltas: Mapping[int, int]):
+        """回写失败时把 delta 放回，等待下次同步"""
+        async with redis.pipeline(transaction=True) as pipe:
+            for product_id, delta in deltas.items():
+                pipe.incrby(_delta_key(product_id), delta)
+                pipe.sadd(DIRTY_KEY, product_id)
+            await pipe.execute()
+
+    async def sync(self, redis: Redis, db: AsyncSession, product_ids: Iterable[int] = ()) -> Dict[int, int]:
+        """
+        把Redis中的扣减回写到 products.stock（一条集合式UPDATE）
+
+        Returns:
+            {商品ID: 回写的扣减量}
+        """
+        deltas = await self.drain_deltas(redis, product_ids)
+        if not deltas:
+            return {}
+
+        adjustments = {pid: -delta for pid, delta in deltas.items()}
+        try:
+            stocks = await inventory.adjust(db, adjustments)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            await self.restore_deltas(redis, deltas)
+            raise
+
+        await product_service.invalidate_stock(redis, stocks, adjustments)
+        return deltas
+
+    @staticmethod
+    def split_lines(lines: Iterable[Tuple[int, int]], released: Mapping[int, int]) -> Dict[int, int]:
+        """从订单明细中扣除已在Redis归还的数量，剩余部分走数据库归还"""
+        remaining = inventory.merge_lines(lines)
+        for product_id, quantity in released.items():
+            left = remaining.get(product_id, 0) - quantity
+            if left > 0:
+                remaining[product_id] = left
+            else:
+                remaining.pop(product_id, None)
+        return remaining
+
+
+# 导出实例
+flash_stock = FlashStockService()
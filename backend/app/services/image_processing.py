@@ -0,0 +1,124 @@
+"""
+图片变体生成（缩略图 / 中图 / 大图，JPEG + WebP）
+
+缩放和编码是 CPU 密集操作，在进程池中执行（IMAGE_PROCESS_WORKERS），不占用事件循环和 MinIO 上传线程。
+变体对象名由原图对象名确定：images/abc.jpg -> images/abc/thumb.jpg、images/abc/thumb.webp ...
+"""
+import asyncio
+import io
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Union
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+# 变体名称 -> 最长边（像素），原图小于该尺寸时不放大
+VARIANTS = {
+    "thumb": 160,
+    "medium": 480,
+    "large": 1080,
+}
+
+# 编码格式 -> 扩展名
+FORMATS = {
+    "jpeg": "jpg",
+    "webp": "webp",
+}
+
+CONTENT_TYPES = {
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def variant_object_name(object_name: str, variant: str, fmt: str) -> str:
+    """变体的对象名"""
+    stem = posixpath.splitext(object_name)[0]
+    return f"{stem}/{variant}.{FORMATS[fmt]}"
+
+
+def make_variants(
+    source: Union[bytes, str],
+    jpeg_quality: int = 85,
+    webp_quality: int = 80
+) -> Dict[str, Dict[str, bytes]]:
+    """
+    生成全部变体（在子进程中执行，参数和返回值需可序列化）
+
+    Args:
+        source: 图片字节，或临时文件路径（子进程自己读文件，图片数据不经过主进程序列化）
+
+    Returns:
+        {变体名称: {格式: 编码后的字节}}
+    """
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as source:
+        # JPEG 解码时直接按 1/2、1/4、1/8 缩小（不小于最大变体尺寸），解码耗时随之下降
+        largest = max(VARIANTS.values())
+        source.draft("RGB", (largest, largest))
+        # 按 EXIF 方向旋转（手机照片），之后的变体不再携带 EXIF
+        image = ImageOps.exif_transpose(source)
+        image.load()
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    variants = {}
+    # 从大到小依次缩放，每次以上一级为输入，减少重采样的像素量
+    for name, size in sorted(VARIANTS.items(), key=lambda item: item[1], reverse=True):
+        if max(image.size) > size:
+            image = _resized(image, size)
+        variants[name] = {
+            "jpeg": _encode(_flatten(image), "JPEG", quality=jpeg_quality, optimize=True, progressive=True),
+            "webp": _encode(image, "WEBP", quality=webp_quality, method=4),
+        }
+    return variants
+
+
+def _resized(image: Image.Image, size: int) -> Image.Image:
+    resized = image.copy()
+    resized.thumbnail((size, size), Image.LANCZOS, reducing_gap=3.0)
+    return resized
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """JPEG 不支持透明通道，铺白底"""
+    if image.mode != "RGBA":
+        return image
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def _encode(image: Image.Image, fmt: str, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """图片处理进程池（首次使用时创建）"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_PROCESS_WORKERS or os.cpu_count())
+    return _executor
+
+
+def shutdown():
+    """关闭进程池（应用退出时调用）"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def generate_variants(source: Union[bytes, str]) -> Dict[str, Dict[str, bytes]]:
+    """在进程池中生成变体（source 为图片字节或文件路径）"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), make_variants, source, settings.IMAGE_JPEG_QUALITY, settings.IMAGE_WEBP_QUALITY
+    )
@@ -0,0 +1,123 @@
+"""库存服务层"""
+from typing import Dict, Iterable, List, Mapping, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update, values, column, Integer
+
+from app.models.product import Product
+
+
+class InsufficientStockError(Exception):
+    """库存不足（整单已回滚）"""
+
+    def __init__(self, product_ids: List[int]):
+        self.product_ids = product_ids
+        super().__init__(f"商品库存不足: {product_ids}")
+
+
+class InventoryService:
+    """库存服务
+
+    整单库存通过一条集合式条件 UPDATE 完成，避免“先查后改”的竞态超卖：
+
+        UPDATE products SET stock = products.stock - lines.qty
+        FROM (VALUES (:id, :qty), ...) AS lines (id, qty)
+        WHERE products.id = lines.id AND products.stock >= lines.qty
+        RETURNING products.id, products.stock
+
+    并发下 PostgreSQL 会在行锁释放后重新校验 WHERE 条件，因此不会扣成负数。
+    本服务只执行语句不提交事务，由调用方统一提交。
+    """
+
+    @staticmethod
+    def merge_lines(lines: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+        """合并同一商品的多行数量 [(product_id, quantity)] -> {product_id: quantity}"""
+        merged: Dict[int, int] = {}
+        for product_id, quantity in lines:
+            if product_id is None:
+                continue
+            merged[product_id] = merged.get(product_id, 0) + quantity
+        return merged
+
+    @staticmethod
+    def _lines(quantities: Mapping[int, int]):
+        """构造 VALUES (id, qty) 派生表（按商品ID排序，尽量保持一致的加锁顺序）"""
+        return values(
+            column("id", Integer),
+            column("qty", Integer),
+            name="lines"
+        ).data(sorted(quantities.items()))
+
+    async def reserve(self, db: AsyncSession, quantities: Mapping[int, int]) -> Dict[int, int]:
+        """
+        整单扣减库存
+
+        任一商品库存不足时回滚整个事务并抛出 InsufficientStockError，
+        因此应在订单写入之前调用。
+
+        Args:
+            db: 数据库会话
+            quantities: {商品ID: 扣减数量}
+
+        Returns:
+            {商品ID: 扣减后库存}
+        """
+        if not quantities:
+            return {}
+
+        lines = self._lines(quantities)
+        result = await db.execute(
+            update(Product)
+            .where(Product.id == lines.c.id, Product.stock >= lines.c.qty)
+            .values(stock=Product.stock - lines.c.qty)
+            .returning(Product.id, Product.stock)
+            .execution_options(synchronize_session="fetch")
+        )
+        remaining = {product_id: stock for product_id, stock in result.all()}
+
+        failed = [product_id for product_id in quantities if product_id not in remaining]
+        if failed:
+            await db.rollback()
+            raise InsufficientStockError(sorted(failed))
+
+        return remaining
+
+    async def release(self, db: AsyncSession, quantities: Mapping[int, int]) -> Dict[int, int]:
+        """
+        整单恢复库存（取消/退款）
+
+        Args:
+            db: 数据库会话
+            quantities: {商品ID: 恢复数量}
+
+        Returns:
+            {商品ID: 恢复后库存}，已删除的商品不会出现在结果中
+        """
+        return await self.adjust(db, quantities)
+
+    async def adjust(self, db: AsyncSession, deltas: Mapping[int, int]) -> Dict[int, int]:
+        """
+        无条件调整库存 stock = stock + delta（delta 可为负，用于Redis库存回写）
+
+        Args:
+            db: 数据库会话
+            deltas: {商品ID: 调整量}
+
+        Returns:
+            {商品ID: 调整后库存}
+        """
+        if not deltas:
+            return {}
+
+        lines = self._lines(deltas)
+        result = await db.execute(
+            update(Product)
+            .where(Product.id == lines.c.id)
+            .values(stock=Product.stock + lines.c.qty)
+            .returning(Product.id, Product.stock)
+            .execution_options(synchronize_session="fetch")
+        )
+        return {product_id: stock for product_id, stock in result.all()}
+
+
+# 导出实例
+inventory = InventoryService()
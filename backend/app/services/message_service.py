@@ -1,13 +1,19 @@
 """消息服务层"""
 import json
-from typing import Optional, List
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, List
 from datetime import datetime
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, desc
+from sqlalchemy import select, update, desc, func, insert
 
-from app.models.message import TemplateMessage, MessageLog, InternalMessage, SmsLog
+from app.models.message import TemplateMessage, MessageLog, InternalMessage
 from app.models.user import User
-from app.core.crud import CRUDBase
+from app.core.config import settings
+from app.core.crud import CRUDBase, Page, CursorPage
+from app.core.logger import logger
+from app.core.redis import pipeline
+from app.services.notification_service import notification_queue
 from app.schemas.message import (
     TemplateMessageCreate, TemplateMessageUpdate,
     InternalMessageCreate
@@ -45,40 +51,46 @@ class CRUDInternalMessage(CRUDBase):
         db: AsyncSession,
         user_id: int,
         skip: int = 0,
-        limit: int = 20
-    ) -> tuple[List[InternalMessage], int]:
+        limit: int = 20,
+        with_total: bool = True
+    ) -> Page:
         """获取用户站内消息（分页）"""
         query = select(InternalMessage).where(InternalMessage.user_id == user_id)
 
-        # 获取总数
-        count_query = select(InternalMessage.id).where(InternalMessage.user_id == user_id)
-        total = (await db.execute(select(count_query.subquery().count()))).scalar()
-
         # 分页并按时间倒序
         query = query.order_by(desc(InternalMessage.created_at))
-        query = query.offset(skip).limit(limit)
-        result = await db.execute(query)
-        items = result.scalars().all()
-
-        return list(items), total
+        return await self.paginate(db, query, skip=skip, limit=limit, with_total=with_total)
 
     async def get_unread_count(self, db: AsyncSession, user_id: int) -> int:
-        """获取未读消息数量"""
+        """获取未读消息数量（走 (user_id, is_read) 索引的 COUNT）"""
         result = await db.execute(
-            select(InternalMessage.id).where(
+            select(func.count()).select_from(InternalMessage).where(
                 InternalMessage.user_id == user_id,
                 InternalMessage.is_read == False
             )
         )
-        return len(result.all())
+        return result.scalar_one()
+
+    async def get_unread_counts(self, db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, int]:
+        """批量获取未读消息数量（一次 GROUP BY，没有未读消息的用户不出现在结果中）"""
+        user_ids = set(user_ids)
+        if not user_ids:
+            return {}
+        result = await db.execute(
+            select(InternalMessage.user_id, func.count())
+            .where(InternalMessage.user_id.in_(user_ids), InternalMessage.is_read == False)
+            .group_by(InternalMessage.user_id)
+        )
+        return {user_id: count for user_id, count in result.all()}
 
     async def mark_as_read(
         self,
         db: AsyncSession,
         message_id: int,
-        user_id: int
+        user_id: int,
+        redis: Optional[Redis] = None
     ) -> Optional[InternalMessage]:
-        """标记消息为已读"""
+        """标记消息为已读（传入 redis 时同步扣减未读计数）"""
         result = await db.execute(
             select(InternalMessage).where(
                 InternalMessage.id == message_id,
@@ -93,11 +105,12 @@ class CRUDInternalMessage(CRUDBase):
             db.add(message)
             await db.commit()
             await db.refresh(message)
+            await unread_counter.incr(redis, user_id, -1)
 
         return message
 
-    async def mark_all_read(self, db: AsyncSession, user_id: int) -> int:
-        """标记所有消息为已读"""
+    async def mark_all_read(self, db: AsyncSession, user_id: int, redis: Optional[Redis] = None) -> int:
+        """标记所有消息为已读（传入 redis 时同步扣减未读计数）"""
         now = datetime.utcnow()
         result = await db.execute(
             update(InternalMessage).where(
@@ -109,9 +122,183 @@ class CRUDInternalMessage(CRUDBase):
             )
         )
         await db.commit()
+        # 按实际更新行数扣减，而不是直接置0，避免覆盖并发到达的新消息
+        await unread_counter.incr(redis, user_id, -result.rowcount)
         return result.rowcount
 
 
+# KEYS: [计数器]  ARGV: [增量, TTL]
+# 计数器存在时才累加（不存在时由下次读取从数据库统计），结果不小于0
+INCR_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if value < 0 then
+    redis.call('SET', KEYS[1], 0)
+    value = 0
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return value
+"""
+
+# KEYS: [计数器]  ARGV: [对账时读到的值, 数据库统计值, TTL]
+# 对账期间计数器被并发修改过则放弃本次修正（下一轮再对）
+RECONCILE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class UnreadCounter:
+    """站内消息未读计数（Redis 计数器）
+
+    Key 约定：msg:unread:{user_id}
+
+    读取时计数器不存在则用一条 COUNT 从数据库统计并回填（SET NX），
+    发送/已读时仅在计数器存在时增减；后台任务（app/tasks/unread_reconcile.py）
+    周期性与数据库对账，修正并发窗口或未传 redis 的写入造成的偏差。
+    Redis 不可用时降级为数据库 COUNT。
+    """
+
+    key_prefix = "msg:unread:"
+
+    def key(self, user_id: int) -> str:
+        return f"{self.key_prefix}{user_id}"
+
+    async def get(self, redis: Optional[Redis], db: AsyncSession, user_id: int) -> int:
+        """获取未读数（命中时 O(1)，不访问数据库）"""
+        if redis is not None:
+            try:
+                value = await redis.get(self.key(user_id))
+                if value is not None:
+                    return int(value)
+            except RedisError as e:
+                logger.warning(f"未读计数读取失败 user={user_id}: {e}")
+                redis = None
+
+        count = await internal_message.get_unread_count(db, user_id)
+        if redis is not None:
+            try:
+                await redis.set(self.key(user_id), count, ex=settings.MESSAGE_UNREAD_TTL, nx=True)
+            except RedisError as e:
+                logger.warning(f"未读计数回填失败 user={user_id}: {e}")
+        return count
+
+    async def incr(self, redis: Optional[Redis], user_id: int, amount: int = 1):
+        """增减未读数（计数器不存在时忽略）"""
+        if redis is None or not amount:
+            return
+        try:
+            await redis.eval(INCR_SCRIPT, 1, self.key(user_id), amount, settings.MESSAGE_UNREAD_TTL)
+        except RedisError as e:
+            # 计数器可能已偏离，删除后由下次读取重新统计
+            logger.warning(f"未读计数更新失败 user={user_id}: {e}")
+            await self.invalidate(redis, [user_id])
+
+    async def incr_many(self, redis: Optional[Redis], user_ids: Iterable[int], amount: int = 1):
+        """批量增减未读数（一次往返，计数器不存在的用户忽略）"""
+        user_ids = list(user_ids)
+        if redis is None or not user_ids or not amount:
+            return
+        try:
+            async with pipeline(redis) as pipe:
+                for user_id in user_ids:
+                    pipe.eval(INCR_SCRIPT, 1, self.key(user_id), amount, settings.MESSAGE_UNREAD_TTL)
+        except RedisError as e:
+            logger.warning(f"未读计数批量更新失败: {e}")
+            await self.invalidate(redis, user_ids)
+
+    async def invalidate(self, redis: Optional[Redis], user_ids: Iterable[int]):
+        """删除计数器，下次读取时从数据库重新统计"""
+        keys = [self.key(user_id) for user_id in user_ids]
+        if redis is None or not keys:
+            return
+        try:
+            await redis.delete(*keys)
+        except RedisError as e:
+            logger.warning(f"未读计数删除失败: {e}")
+
+    async def reconcile(self, redis: Redis, db: AsyncSession, batch_size: int = 500) -> int:
+        """
+        与数据库对账：SCAN 现有计数器，按批 GROUP BY 统计并修正偏差
+
+        Returns:
+            修正的计数器数量
+        """
+        corrected = 0
+        batch: List[str] = []
+
+        async def flush() -> int:
+            values = await redis.mget(batch)
+            user_ids = [int(key[len(self.key_prefix):]) for key in batch]
+            counts = await internal_message.get_unread_counts(db, user_ids)
+            fixed = 0
+            for key, user_id, value in zip(batch, user_ids, values):
+                expected = counts.get(user_id, 0)
+                if value is None or int(value) == expected:
+                    continue
+                fixed += await redis.eval(
+                    RECONCILE_SCRIPT, 1, key, value, expected, settings.MESSAGE_UNREAD_TTL
+                )
+            batch.clear()
+            return fixed
+
+        async for key in redis.scan_iter(match=f"{self.key_prefix}*", count=batch_size):
+            if isinstance(key, bytes):
+                key = key.decode()
+            batch.append(key)
+            if len(batch) >= batch_size:
+                corrected += await flush()
+        if batch:
+            corrected += await flush()
+        return corrected
+
+
+class CRUDMessageLog(CRUDBase[MessageLog, dict, dict]):
+    """消息发送记录CRUD"""
+
+    @staticmethod
+    def _logs_query(user_id: Optional[int], message_type: Optional[int]):
+        query = select(MessageLog)
+        if user_id:
+            query = query.where(MessageLog.user_id == user_id)
+        if message_type:
+            query = query.where(MessageLog.message_type == message_type)
+        return query
+
+    async def get_logs(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: Optional[int] = None,
+        message_type: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 20
+    ) -> Page:
+        """获取消息发送记录（按时间倒序）"""
+        query = self._logs_query(user_id, message_type).order_by(
+            desc(MessageLog.created_at), desc(MessageLog.id)
+        )
+        return await self.paginate(db, query, skip=skip, limit=limit)
+
+    async def get_logs_cursor(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: Optional[int] = None,
+        message_type: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> CursorPage:
+        """获取消息发送记录（游标分页，按时间倒序）"""
+        query = self._logs_query(user_id, message_type)
+        return await self.paginate_cursor(db, query, cursor=cursor, limit=limit)
+
+
 class MessageService:
     """消息服务"""
 
@@ -124,7 +311,7 @@ class MessageService:
         data: Optional[dict] = None
     ) -> bool:
         """
-        发送模板消息
+        发送模板消息（写入发送队列，由后台 worker 调用微信接口）
 
         Args:
             db: 数据库会话
@@ -134,12 +321,11 @@ class MessageService:
             data: 模板数据
 
         Returns:
-            bool: 是否发送成功
+            bool: 是否成功加入发送队列
         """
-        # 获取用户openid
-        user_result = await db.execute(select(User).where(User.id == user_id))
-        user = user_result.scalar_one_or_none()
-        if not user:
+        # 检查用户
+        user_result = await db.execute(select(User.id).where(User.id == user_id))
+        if user_result.scalar_one_or_none() is None:
             return False
 
         # 获取模板消息
@@ -147,31 +333,15 @@ class MessageService:
         if not template:
             return False
 
-        # 创建发送记录
-        log = MessageLog(
+        await notification_queue.enqueue_template(
+            db,
             user_id=user_id,
-            message_type=1,
             template_id=template.template_id,
             content=template.content,
             data=json.dumps(data) if data else None,
             scene_type=scene_type
         )
-        db.add(log)
-
-        # TODO: 实际调用微信模板消息API
-        # 这里是模拟实现
-        send_success = True
-        error_msg = None
-
-        # 更新发送状态
-        log.send_status = 1 if send_success else 2
-        log.error_msg = error_msg
-        log.send_time = datetime.utcnow()
-
-        await db.commit()
-        await db.refresh(log)
-
-        return send_success
+        return True
 
     async def send_internal_message(
         self,
@@ -181,7 +351,8 @@ class MessageService:
         content: str,
         message_type: int = 1,
         scene_type: Optional[int] = None,
-        scene_id: Optional[int] = None
+        scene_id: Optional[int] = None,
+        redis: Optional[Redis] = None
     ) -> InternalMessage:
         """
         发送站内消息
@@ -194,6 +365,7 @@ class MessageService:
             message_type: 消息类型
             scene_type: 场景类型
             scene_id: 场景ID
+            redis: 传入时同步累加未读计数
 
         Returns:
             InternalMessage: 创建的消息
@@ -209,9 +381,124 @@ class MessageService:
         db.add(message)
         await db.commit()
         await db.refresh(message)
+        await unread_counter.incr(redis, user_id)
 
         return message
 
+    async def broadcast_internal_message(
+        self,
+        db: AsyncSession,
+        title: str,
+        content: str,
+        message_type: int = 1,
+        *,
+        user_ids: Optional[Iterable[int]] = None,
+        scene_type: Optional[int] = None,
+        scene_id: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        redis: Optional[Redis] = None,
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> int:
+        """
+        群发站内消息
+
+        接收人按批流式读取，每批一次批量写入（PostgreSQL 用 COPY，其他数据库用
+        多行 INSERT）并提交一次，而不是每个用户一次 INSERT + COMMIT。
+
+        Args:
+            db: 数据库会话
+            title: 消息标题
+            content: 消息内容
+            message_type: 消息类型
+            user_ids: 接收用户ID，为空时发给所有正常状态的用户
+            scene_type: 场景类型
+            scene_id: 场景ID
+            chunk_size: 每批数量，默认 MESSAGE_BROADCAST_CHUNK_SIZE
+            redis: 传入时同步累加未读计数
+            on_progress: 每批提交后回调，参数为已发送数量
+
+        Returns:
+            int: 发送的消息数
+        """
+        chunk_size = chunk_size or settings.MESSAGE_BROADCAST_CHUNK_SIZE
+        sent = 0
+        async for chunk in self._recipient_chunks(db, user_ids, chunk_size):
+            now = datetime.utcnow()
+            rows = [
+                {
+                    "user_id": user_id,
+                    "title": title,
+                    "content": content,
+                    "message_type": message_type,
+                    "is_read": False,
+                    "scene_type": scene_type,
+                    "scene_id": scene_id,
+                    "created_at": now,
+                    "updated_at": now
+                }
+                for user_id in chunk
+            ]
+            await self._bulk_insert_messages(db, rows)
+            await db.commit()
+            await unread_counter.incr_many(redis, chunk)
+
+            sent += len(chunk)
+            if on_progress is not None:
+                await on_progress(sent)
+        return sent
+
+    @staticmethod
+    async def count_recipients(db: AsyncSession, user_ids: Optional[Iterable[int]] = None) -> int:
+        """群发接收人数"""
+        if user_ids is not None:
+            return len(set(user_ids))
+        result = await db.execute(select(func.count()).select_from(User).where(User.status == 1))
+        return result.scalar_one()
+
+    @staticmethod
+    async def _recipient_chunks(
+        db: AsyncSession,
+        user_ids: Optional[Iterable[int]],
+        chunk_size: int
+    ) -> AsyncIterator[List[int]]:
+        """按批产出接收人ID（未指定时按主键游标遍历正常状态的用户）"""
+        if user_ids is not None:
+            ids = sorted(set(user_ids))
+            for start in range(0, len(ids), chunk_size):
+                yield ids[start:start + chunk_size]
+            return
+
+        last_id = 0
+        while True:
+            result = await db.execute(
+                select(User.id)
+                .where(User.status == 1, User.id > last_id)
+                .order_by(User.id)
+                .limit(chunk_size)
+            )
+            ids = result.scalars().all()
+            if not ids:
+                return
+            yield list(ids)
+            last_id = ids[-1]
+
+    @staticmethod
+    async def _bulk_insert_messages(db: AsyncSession, rows: List[dict]):
+        """批量写入站内消息（在会话当前事务内）"""
+        if not rows:
+            return
+        if db.get_bind().dialect.driver == "asyncpg":
+            columns = list(rows[0])
+            conn = await db.connection()
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                InternalMessage.__tablename__,
+                records=[tuple(row[column] for column in columns) for row in rows],
+                columns=columns
+            )
+            return
+        await db.execute(insert(InternalMessage), rows)
+
     async def send_sms(
         self,
         db: AsyncSession,
@@ -221,7 +508,7 @@ class MessageService:
         params: Optional[dict] = None
     ) -> bool:
         """
-        发送短信
+        发送短信（写入发送队列，由后台 worker 调用短信接口）
 
         Args:
             db: 数据库会话
@@ -231,37 +518,20 @@ class MessageService:
             params: 模板参数
 
         Returns:
-            bool: 是否发送成功
+            bool: 是否成功加入发送队列
         """
-        # 创建发送记录
-        log = SmsLog(
-            phone=phone,
-            template_code=template_code,
-            content=content
+        await notification_queue.enqueue_sms(
+            db, phone=phone, template_code=template_code, content=content
         )
-        db.add(log)
-
-        # TODO: 实际调用短信服务API（如阿里云短信、腾讯云短信）
-        # 这里是模拟实现
-        send_success = True
-        error_msg = None
-
-        # 更新发送状态
-        log.send_status = 1 if send_success else 2
-        log.error_msg = error_msg
-        log.send_time = datetime.utcnow()
-
-        await db.commit()
-        await db.refresh(log)
-
-        return send_success
+        return True
 
     async def send_order_message(
         self,
         db: AsyncSession,
         user_id: int,
         order_id: int,
-        scene_type: int
+        scene_type: int,
+        redis: Optional[Redis] = None
     ):
         """
         发送订单相关消息
@@ -271,6 +541,7 @@ class MessageService:
             user_id: 用户ID
             order_id: 订单ID
             scene_type: 场景类型 (2-支付成功 3-订单发货 4-订单完成)
+            redis: 传入时同步累加未读计数
         """
         # 获取订单信息
         from app.models.order import Order
@@ -297,7 +568,8 @@ class MessageService:
             scene_text["content"],
             message_type=2,
             scene_type=scene_type,
-            scene_id=order_id
+            scene_id=order_id,
+            redis=redis
         )
 
         # 发送模板消息
@@ -310,4 +582,6 @@ class MessageService:
 # 导出实例
 template_message = CRUDTemplateMessage(TemplateMessage)
 internal_message = CRUDInternalMessage(InternalMessage)
+message_log = CRUDMessageLog(MessageLog)
 message_service = MessageService()
+unread_counter = UnreadCounter()
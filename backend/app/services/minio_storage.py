@@ -1,18 +1,45 @@
 """
 MinIO对象存储服务
+
+Minio SDK 是同步阻塞的，所有网络调用放到有上限的线程池中执行（MINIO_UPLOAD_THREADS），
+不阻塞事件循环。上传时直接从 UploadFile 的临时文件分片读取（超过 MINIO_PART_SIZE 走分片上传），
+不把整个文件读进内存。
+
+上传按内容寻址：对象名为 {目录}/{sha256}{扩展名}，上传前在线程池中分块计算临时文件的 SHA-256，
+对象已存在（stat_object）时不再传输，直接返回已有URL；storage_objects.ref_count 记录上传次数，
+delete_file 每次减 1，减到 0 时才删除对象。
+注意 ref_count 是上传次数而不是实际引用数：商品等业务替换、删除图片时不调用 delete_file
+（同一对象可能被多处引用），计数只增不减，对象不会被自动回收。
+
+客户端延迟创建：导入模块和创建实例时不发起任何网络请求，首次使用时才创建客户端并检查 bucket
+（结果缓存在进程内），新 worker 启动不依赖 MinIO 往返。
 """
 from minio import Minio
 from minio.error import S3Error
 from fastapi import UploadFile, HTTPException
-from datetime import timedelta
-from typing import Optional, List
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Optional, List, BinaryIO, Dict, Tuple
+import asyncio
+import hashlib
+import posixpath
 import os
 import io
 import json
+import shutil
+import tempfile
+
+from sqlalchemy import update, delete
+from sqlalchemy.dialects.postgresql import insert
 
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.core.logger import logger
+from app.models.storage import StorageObject
+from app.services import image_processing
+
+HASH_CHUNK_SIZE = 1024 * 1024
 
 
 class MinIOStorage:
@@ -27,7 +54,156 @@ class MinIOStorage:
         self.internal_endpoint = settings.MINIO_INTERNAL_ENDPOINT
 
         self._client: Optional[Minio] = None
-        self._init_client()
+        self._bucket_ready = False
+        self._bucket_lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.MINIO_UPLOAD_THREADS,
+            thread_name_prefix="minio"
+        )
+
+    @property
+    def client(self) -> Minio:
+        """MinIO客户端（首次访问时创建，不发起网络请求）"""
+        if self._client is None:
+            self._init_client()
+        return self._client
+
+    async def _ensure_ready(self):
+        """首次使用前确保bucket存在（每个进程只检查一次）"""
+        if self._bucket_ready:
+            return
+        async with self._bucket_lock:
+            if not self._bucket_ready:
+                await self._run(self._ensure_bucket)
+                self._bucket_ready = True
+
+    async def _run(self, func, *args, **kwargs):
+        """在线程池中执行阻塞的 SDK 调用"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def _put_stream(self, object_name: str, stream: BinaryIO, length: int, content_type: str):
+        """
+        上传文件流（在线程池中调用）
+
+        超过 MINIO_PART_SIZE 时 SDK 自动分片上传；分片串行上传，内存中最多保留一个分片。
+        """
+        self.client.put_object(
+            bucket_name=self.bucket_name,
+            object_name=object_name,
+            data=stream,
+            length=length,
+            content_type=content_type,
+            part_size=settings.MINIO_PART_SIZE,
+            num_parallel_uploads=1
+        )
+
+    @staticmethod
+    def _hash_stream(stream: BinaryIO) -> Tuple[str, int]:
+        """分块计算 SHA-256 和字节数（在线程池中调用），完成后回到文件开头"""
+        digest = hashlib.sha256()
+        size = 0
+        stream.seek(0)
+        for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+        stream.seek(0)
+        return digest.hexdigest(), size
+
+    def _object_exists(self, object_name: str) -> bool:
+        """对象是否存在（在线程池中调用）"""
+        try:
+            self.client.stat_object(self.bucket_name, object_name)
+            return True
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                return False
+            raise
+
+    @staticmethod
+    async def _add_reference(object_name: str, sha256: str, size: int, content_type: str):
+        """上传计数 +1（不存在则创建记录）"""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                insert(StorageObject)
+                .values(
+                    object_name=object_name, sha256=sha256, size=size, content_type=content_type,
+                    ref_count=1, created_at=now, updated_at=now
+                )
+                .on_conflict_do_update(
+                    index_elements=[StorageObject.object_name],
+                    set_={"ref_count": StorageObject.ref_count + 1, "updated_at": now}
+                )
+            )
+            await db.commit()
+
+    @staticmethod
+    async def _drop_reference(object_name: str):
+        """撤销一次引用（上传失败时调用），引用数为 0 的记录一并删除"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(StorageObject)
+                .where(StorageObject.object_name == object_name)
+                .values(ref_count=StorageObject.ref_count - 1, updated_at=datetime.utcnow())
+            )
+            await db.execute(
+                delete(StorageObject)
+                .where(StorageObject.object_name == object_name, StorageObject.ref_count <= 0)
+            )
+            await db.commit()
+
+    async def _store(self, file: UploadFile, folder: str) -> Tuple[str, bool]:
+        """
+        按内容寻址保存上传文件
+
+        先登记引用（与 delete_file 的行锁互斥，避免删除最后一个引用的同时有相同内容上传），
+        再检查对象是否存在，不存在才上传。
+
+        Returns:
+            (对象名, 是否新上传)
+        """
+        stream = file.file
+        sha256, size = await self._run(self._hash_stream, stream)
+        ext = os.path.splitext(file.filename)[1].lower() if file.filename else ''
+        object_name = f"{folder}/{sha256}{ext}" if folder else f"{sha256}{ext}"
+        content_type = file.content_type or "application/octet-stream"
+
+        await self._ensure_ready()
+        await self._add_reference(object_name, sha256, size, content_type)
+        try:
+            if await self._run(self._object_exists, object_name):
+                logger.info(f"文件已存在，跳过上传: {object_name}")
+                return object_name, False
+            await self._run(self._put_stream, object_name, stream, size, content_type)
+        except BaseException:
+            await self._drop_reference(object_name)
+            raise
+        return object_name, True
+
+    def _object_url(self, object_name: str) -> str:
+        """对象的外部访问URL"""
+        return f"http://{self.endpoint}/{self.bucket_name}/{object_name}"
+
+    def object_name_from_url(self, url: str) -> Optional[str]:
+        """从访问URL解析对象名，不是本 bucket 的URL返回 None"""
+        prefix = self._object_url("")
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+    def variant_urls(self, object_name: str) -> Dict[str, Dict[str, str]]:
+        """图片变体的访问URL {变体名称: {格式: URL}}"""
+        return {
+            variant: {
+                fmt: self._object_url(image_processing.variant_object_name(object_name, variant, fmt))
+                for fmt in image_processing.FORMATS
+            }
+            for variant in image_processing.VARIANTS
+        }
+
+    def shutdown(self):
+        """关闭线程池和图片处理进程池（应用退出时调用）"""
+        self._executor.shutdown(wait=False)
+        image_processing.shutdown()
 
     def _init_client(self):
         """初始化MinIO客户端"""
@@ -43,9 +219,6 @@ class MinIOStorage:
                 secure=self.secure
             )
 
-            # 确保bucket存在
-            self._ensure_bucket()
-
             logger.info(f"MinIO客户端初始化成功: {endpoint}")
         except Exception as e:
             logger.error(f"MinIO客户端初始化失败: {str(e)}")
@@ -54,8 +227,8 @@ class MinIOStorage:
     def _ensure_bucket(self):
         """确保bucket存在"""
         try:
-            if not self._client.bucket_exists(self.bucket_name):
-                self._client.make_bucket(self.bucket_name)
+            if not self.client.bucket_exists(self.bucket_name):
+                self.client.make_bucket(self.bucket_name)
                 # 设置bucket为公共读取
                 policy = {
                     "Version": "2012-10-17",
@@ -68,7 +241,7 @@ class MinIOStorage:
                         }
                     ]
                 }
-                self._client.set_bucket_policy(self.bucket_name, json.dumps(policy))
+                self.client.set_bucket_policy(self.bucket_name, json.dumps(policy))
                 logger.info(f"创建bucket: {self.bucket_name}")
         except Exception as e:
             logger.error(f"创建bucket失败: {str(e)}")
@@ -83,6 +256,9 @@ class MinIOStorage:
         """
         上传文件到MinIO
 
+        未指定文件名时按内容寻址（相同内容返回同一URL，不重复传输，并登记引用）；
+        指定文件名时按原样覆盖上传，不登记引用。
+
         Args:
             file: 上传的文件
             folder: 文件夹路径
@@ -91,33 +267,37 @@ class MinIOStorage:
         Returns:
             文件访问URL
         """
+        return self._object_url((await self._upload(file, folder, filename))[0])
+
+    async def _upload(self, file: UploadFile, folder: str = "", filename: Optional[str] = None) -> Tuple[str, bool]:
+        """上传文件，返回 (对象名, 是否新上传)"""
         try:
-            # 生成文件名
             if not filename:
-                ext = os.path.splitext(file.filename)[1] if file.filename else ''
-                filename = f"{uuid.uuid4().hex}{ext}"
+                object_name, created = await self._store(file, folder)
+                if created:
+                    logger.info(f"文件上传成功: {object_name}")
+                return object_name, created
 
             # 构建对象名称
             object_name = f"{folder}/{filename}" if folder else filename
 
-            # 读取文件内容（Minio SDK 需要 file-like 对象）
-            file_content = await file.read()
-            file_size = len(file_content)
-            data_stream = io.BytesIO(file_content)
+            # 直接读取 UploadFile 的临时文件（小文件在内存，大文件已落盘），不整体读入
+            stream = file.file
+            stream.seek(0, os.SEEK_END)
+            file_size = stream.tell()
+            stream.seek(0)
 
             # 上传文件
-            self._client.put_object(
-                bucket_name=self.bucket_name,
-                object_name=object_name,
-                data=data_stream,
-                length=file_size,
-                content_type=file.content_type or "application/octet-stream"
+            await self._ensure_ready()
+            await self._run(
+                self._put_stream,
+                object_name,
+                stream,
+                file_size,
+                file.content_type or "application/octet-stream"
             )
-
-            # 返回访问URL（外部访问）
-            file_url = f"http://{self.endpoint}/{self.bucket_name}/{object_name}"
             logger.info(f"文件上传成功: {object_name}")
-            return file_url
+            return object_name, True
 
         except S3Error as e:
             logger.error(f"MinIO上传失败: {str(e)}")
@@ -126,7 +306,7 @@ class MinIOStorage:
             logger.error(f"上传文件失败: {str(e)}")
             raise HTTPException(status_code=500, detail=f"文件上传失败: {str(e)}")
 
-    def upload_bytes(
+    async def upload_bytes(
         self,
         data: bytes,
         filename: str,
@@ -149,19 +329,12 @@ class MinIOStorage:
             # 构建对象名称
             object_name = f"{folder}/{filename}" if folder else filename
 
-            data_stream = io.BytesIO(data)
-
             # 上传数据
-            self._client.put_object(
-                bucket_name=self.bucket_name,
-                object_name=object_name,
-                data=data_stream,
-                length=len(data),
-                content_type=content_type
-            )
+            await self._ensure_ready()
+            await self._run(self._put_stream, object_name, io.BytesIO(data), len(data), content_type)
 
             # 返回访问URL
-            file_url = f"http://{self.endpoint}/{self.bucket_name}/{object_name}"
+            file_url = self._object_url(object_name)
             logger.info(f"数据上传成功: {object_name}")
             return file_url
 
@@ -172,10 +345,13 @@ class MinIOStorage:
             logger.error(f"上传数据失败: {str(e)}")
             raise HTTPException(status_code=500, detail=f"上传数据失败: {str(e)}")
 
-    def delete_file(self, object_name: str) -> bool:
+    async def delete_file(self, object_name: str) -> bool:
         """
         删除文件
 
+        按内容寻址上传的对象上传计数减 1，减到 0 时才删除对象（及其图片变体）；
+        未登记计数的对象直接删除。调用方须保证每次调用对应一次不再使用的上传。
+
         Args:
             object_name: 对象名称（不包含bucket前缀）
 
@@ -183,14 +359,39 @@ class MinIOStorage:
             是否删除成功
         """
         try:
-            self._client.remove_object(self.bucket_name, object_name)
+            await self._ensure_ready()
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    update(StorageObject)
+                    .where(StorageObject.object_name == object_name)
+                    .values(ref_count=StorageObject.ref_count - 1, updated_at=datetime.utcnow())
+                    .returning(StorageObject.ref_count)
+                )
+                remaining = result.scalar_one_or_none()
+                if remaining is not None and remaining > 0:
+                    await db.commit()
+                    logger.info(f"文件仍有 {remaining} 个引用，保留对象: {object_name}")
+                    return True
+                if remaining is not None:
+                    await db.execute(delete(StorageObject).where(StorageObject.object_name == object_name))
+
+                # 持有行锁时删除对象：相同内容的并发上传会等本事务提交后重新上传，不会拿到已删除的对象
+                await self._run(self._remove_with_variants, object_name)
+                await db.commit()
             logger.info(f"文件删除成功: {object_name}")
             return True
         except S3Error as e:
             logger.error(f"MinIO删除失败: {str(e)}")
             return False
 
-    def get_file_url(self, object_name: str, expires: Optional[int] = None) -> str:
+    def _remove_with_variants(self, object_name: str):
+        """删除对象及其图片变体（在线程池中调用）"""
+        self.client.remove_object(self.bucket_name, object_name)
+        prefix = posixpath.splitext(object_name)[0] + "/"
+        for obj in self.client.list_objects(self.bucket_name, prefix=prefix, recursive=True):
+            self.client.remove_object(self.bucket_name, obj.object_name)
+
+    async def get_file_url(self, object_name: str, expires: Optional[int] = None) -> str:
         """
         获取文件访问URL
 
@@ -203,22 +404,24 @@ class MinIOStorage:
         """
         try:
             if expires:
-                # 生成预签名URL
-                url = self._client.presigned_get_object(
+                # 生成预签名URL（首次需查询 bucket 所在区域，会发起网络请求）
+                await self._ensure_ready()
+                url = await self._run(
+                    self.client.presigned_get_object,
                     bucket_name=self.bucket_name,
                     object_name=object_name,
                     expires=timedelta(seconds=expires)
                 )
             else:
                 # 返回永久URL
-                url = f"http://{self.endpoint}/{self.bucket_name}/{object_name}"
+                url = self._object_url(object_name)
 
             return url
         except S3Error as e:
             logger.error(f"获取文件URL失败: {str(e)}")
             raise
 
-    def list_files(self, prefix: str = "", recursive: bool = False) -> List[str]:
+    async def list_files(self, prefix: str = "", recursive: bool = False) -> List[str]:
         """
         列出文件
 
@@ -230,12 +433,17 @@ class MinIOStorage:
             文件列表
         """
         try:
-            objects = self._client.list_objects(
-                bucket_name=self.bucket_name,
-                prefix=prefix,
-                recursive=recursive
-            )
-            return [obj.object_name for obj in objects]
+            # list_objects 返回惰性迭代器，分页请求在遍历时发生，需整体放到线程池
+            def _list():
+                objects = self.client.list_objects(
+                    bucket_name=self.bucket_name,
+                    prefix=prefix,
+                    recursive=recursive
+                )
+                return [obj.object_name for obj in objects]
+
+            await self._ensure_ready()
+            return await self._run(_list)
         except S3Error as e:
             logger.error(f"列出文件失败: {str(e)}")
             raise
@@ -243,24 +451,173 @@ class MinIOStorage:
     async def upload_multiple_files(
         self,
         files: List[UploadFile],
-        folder: str = ""
+        folder: str = "",
+        concurrency: Optional[int] = None
     ) -> List[str]:
         """
-        批量上传文件
+        批量上传文件（并发上传）
 
         Args:
             files: 文件列表
             folder: 文件夹路径
+            concurrency: 同时上传的文件数，默认 MINIO_UPLOAD_CONCURRENCY
 
         Returns:
-            文件URL列表
+            文件URL列表（与 files 顺序一致）
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.MINIO_UPLOAD_CONCURRENCY)
+
+        async def _upload(file: UploadFile) -> str:
+            async with semaphore:
+                return await self.upload_file(file, folder)
+
+        return list(await asyncio.gather(*(_upload(file) for file in files)))
+
+    async def upload_image(self, file: UploadFile, folder: str = "") -> Dict:
+        """
+        上传图片并生成变体（缩略图/中图/大图，JPEG + WebP）
+
+        超过 IMAGE_MAX_UPLOAD_SIZE 直接拒绝（413）。原图上传失败抛出 HTTPException；
+        变体生成失败（无法识别的图片等）只记录日志，variants 为 None。
+        图片数据不整体读入事件循环：上传的临时文件在线程池中分块复制为命名临时文件，由图片处理进程按路径读取。
+
+        Returns:
+            {"url": 原图URL, "variants": {变体名称: {格式: URL}} 或 None}
+        """
+        size = file.size
+        if size is None:
+            size = await self._run(self._stream_size, file.file)
+        if size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"图片不能超过 {settings.IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)}MB"
+            )
+
+        object_name, created = await self._upload(file, folder)
+        url = self._object_url(object_name)
+
+        if not settings.IMAGE_VARIANTS_ENABLED:
+            return {"url": url, "variants": None}
+        if created:
+            variants = await self.create_variants(object_name, file.file)
+        else:
+            # 相同内容已上传过，变体通常也已存在，只在缺少标记对象时才读取上传的文件
+            variants = await self.ensure_variants(url, file.file)
+        return {"url": url, "variants": variants}
+
+    @staticmethod
+    def _stream_size(stream: BinaryIO) -> int:
+        """文件流字节数（在线程池中调用），完成后回到文件开头"""
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(0)
+        return size
+
+    @staticmethod
+    def _spool_to_file(stream: BinaryIO) -> str:
+        """把上传的临时文件分块复制为命名临时文件（在线程池中调用），返回路径，由调用方删除"""
+        stream.seek(0)
+        with tempfile.NamedTemporaryFile(prefix="upload-", delete=False) as target:
+            shutil.copyfileobj(stream, target, HASH_CHUNK_SIZE)
+        stream.seek(0)
+        return target.name
+
+    def _download_to_file(self, object_name: str) -> str:
+        """下载原图到命名临时文件（在线程池中调用），返回路径，由调用方删除"""
+        with tempfile.NamedTemporaryFile(prefix="download-", delete=False) as target:
+            path = target.name
+        try:
+            self.client.fget_object(self.bucket_name, object_name, path)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path
+
+    async def create_variants(self, object_name: str, stream: BinaryIO) -> Optional[Dict[str, Dict[str, str]]]:
+        """从文件流生成并上传图片变体，失败返回 None"""
+        try:
+            path = await self._run(self._spool_to_file, stream)
+        except Exception as e:
+            logger.warning(f"读取上传文件失败 {object_name}: {str(e)}")
+            return None
+        try:
+            return await self._create_variants_from_file(object_name, path)
+        finally:
+            os.unlink(path)
+
+    async def _create_variants_from_file(self, object_name: str, path: str) -> Optional[Dict[str, Dict[str, str]]]:
+        """图片处理进程按路径读取原图，生成并上传变体，失败返回 None"""
+        try:
+            variants = await image_processing.generate_variants(path)
+            objects = [
+                (image_processing.variant_object_name(object_name, variant, fmt), content, fmt)
+                for variant, encoded in variants.items()
+                for fmt, content in encoded.items()
+            ]
+            marker = self._variant_marker(object_name)
+            objects.sort(key=lambda item: item[0] == marker)
+
+            def put(item):
+                name, content, fmt = item
+                return self._run(
+                    self._put_stream, name, io.BytesIO(content), len(content), image_processing.CONTENT_TYPES[fmt]
+                )
+
+            # 标记对象（ensure_variants 据此判断是否已生成）在其余变体全部上传成功后再上传
+            await self._ensure_ready()
+            await asyncio.gather(*(put(item) for item in objects[:-1]))
+            await put(objects[-1])
+        except Exception as e:
+            logger.warning(f"生成图片变体失败 {object_name}: {str(e)}")
+            return None
+        return self.variant_urls(object_name)
+
+    @staticmethod
+    def _variant_marker(object_name: str) -> str:
+        """最后上传的变体对象，存在即表示全部变体已生成"""
+        variant = list(image_processing.VARIANTS)[-1]
+        fmt = list(image_processing.FORMATS)[-1]
+        return image_processing.variant_object_name(object_name, variant, fmt)
+
+    async def ensure_variants(
+        self,
+        image_url: str,
+        stream: Optional[BinaryIO] = None
+    ) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        确保图片已有变体（变体对象名固定，已存在则直接返回URL，否则从 stream 或下载的原图生成）
+
+        不是本 bucket 的图片或处理失败返回 None。
         """
-        urls = []
-        for file in files:
-            url = await self.upload_file(file, folder)
-            urls.append(url)
-        return urls
+        object_name = self.object_name_from_url(image_url)
+        if not object_name or not settings.IMAGE_VARIANTS_ENABLED:
+            return None
+
+        try:
+            await self._ensure_ready()
+            await self._run(self.client.stat_object, self.bucket_name, self._variant_marker(object_name))
+            return self.variant_urls(object_name)
+        except S3Error as e:
+            if e.code != "NoSuchKey":
+                logger.warning(f"检查图片变体失败 {object_name}: {str(e)}")
+                return None
+        except Exception as e:
+            logger.warning(f"检查图片变体失败 {object_name}: {str(e)}")
+            return None
+
+        if stream is not None:
+            return await self.create_variants(object_name, stream)
+
+        try:
+            path = await self._run(self._download_to_file, object_name)
+        except Exception as e:
+            logger.warning(f"下载原图失败 {object_name}: {str(e)}")
+            return None
+        try:
+            return await self._create_variants_from_file(object_name, path)
+        finally:
+            os.unlink(path)
 
 
-# 创建全局实例
+# 创建全局实例（不连接MinIO，首次使用时初始化）
 minio_storage = MinIOStorage()
@@ -0,0 +1,254 @@
+"""消息发送队列（模板消息/短信）
+
+下单、支付等请求只写入一条待发送记录（message_logs / sms_logs，send_status=0），
+不在请求内调用第三方接口；后台 worker（app/tasks/notification_worker.py）批量领取并发送。
+
+- 领取：UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING，
+  多个 worker 进程互不阻塞、不会重复领取；领取时把 next_retry_at 推后一个租期，
+  worker 异常退出后任务在租期结束时重新可见。
+- 结果：整批一次提交，成功的一条 UPDATE，失败的一条 UPDATE ... FROM (VALUES ...)；
+  失败按指数退避重试，超过 NOTIFICATION_MAX_RETRIES 次后标记为发送失败。
+"""
+import asyncio
+import random
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import select, update, values, column, cast, Integer, DateTime, Text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.models.message import MessageLog, SmsLog
+from app.models.user import User
+
+KIND_TEMPLATE = "template"
+KIND_SMS = "sms"
+
+
+class NotificationSendError(Exception):
+    """第三方发送失败（会按退避策略重试）"""
+    pass
+
+
+@dataclass
+class NotificationJob:
+    """已领取的发送任务"""
+    kind: str
+    id: int
+    retry_count: int
+    target: Optional[str]  # 模板消息为 openid，短信为手机号
+    template: Optional[str]  # 模板消息为微信模板ID，短信为短信模板代码
+    content: Optional[str]
+    data: Optional[str] = None  # 模板数据(JSON)
+
+
+@dataclass
+class SendResult:
+    """发送结果，error 为 None 表示成功"""
+    job: NotificationJob
+    error: Optional[str] = None
+
+
+class NotificationSender(ABC):
+    """发送通道，失败时抛出 NotificationSendError"""
+
+    @abstractmethod
+    async def send(self, job: NotificationJob):
+        ...
+
+
+class StubSender(NotificationSender):
+    """本地模拟通道（开发/压测用），可配置延迟和失败率"""
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.attempts = 0
+        self.sent: Counter = Counter()  # (kind, id) -> 成功次数
+        self._rng = random.Random(seed)
+
+    async def send(self, job: NotificationJob):
+        self.attempts += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._rng.random() < self.failure_rate:
+            raise NotificationSendError("模拟发送失败")
+        self.sent[(job.kind, job.id)] += 1
+        logger.debug(f"[stub] 发送{job.kind} #{job.id} -> {job.target}")
+
+
+SENDERS = {
+    "stub": StubSender,
+}
+
+
+def get_sender(name: Optional[str] = None) -> NotificationSender:
+    """按配置创建发送通道"""
+    name = name or settings.NOTIFICATION_SENDER
+    if name not in SENDERS:
+        raise ValueError(f"未知的消息发送通道: {name}")
+    return SENDERS[name]()
+
+
+def retry_delay(retry_count: int) -> float:
+    """第 retry_count 次重试前的等待时间（秒）"""
+    delay = settings.NOTIFICATION_RETRY_BACKOFF * 2 ** (retry_count - 1)
+    return min(delay, settings.NOTIFICATION_RETRY_BACKOFF_MAX)
+
+
+class NotificationQueue:
+    """消息发送队列"""
+
+    async def enqueue_template(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        template_id: str,
+        content: Optional[str] = None,
+        data: Optional[str] = None,
+        scene_type: Optional[int] = None
+    ) -> MessageLog:
+        """模板消息入队"""
+        log = MessageLog(
+            user_id=user_id,
+            message_type=1,
+            template_id=template_id,
+            content=content,
+            data=data,
+            scene_type=scene_type,
+            send_status=0,
+            next_retry_at=datetime.utcnow()
+        )
+        db.add(log)
+        await db.commit()
+        await db.refresh(log)
+        return log
+
+    async def enqueue_sms(
+        self,
+        db: AsyncSession,
+        *,
+        phone: str,
+        template_code: str,
+        content: str
+    ) -> SmsLog:
+        """短信入队"""
+        log = SmsLog(
+            phone=phone,
+            template_code=template_code,
+            content=content,
+            send_status=0,
+            next_retry_at=datetime.utcnow()
+        )
+        db.add(log)
+        await db.commit()
+        await db.refresh(log)
+        return log
+
+    async def claim(self, db: AsyncSession, limit: int) -> List[NotificationJob]:
+        """领取最多 limit 个到期任务（模板消息优先，其余名额给短信）"""
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=settings.NOTIFICATION_LEASE_SECONDS)
+
+        rows = await self._claim(db, MessageLog, limit, now, lease_until, (
+            MessageLog.id, MessageLog.retry_count, MessageLog.user_id,
+            MessageLog.template_id, MessageLog.content, MessageLog.data
+        ))
+        openids = await self._openids(db, {row.user_id for row in rows})
+        jobs = [
+            NotificationJob(KIND_TEMPLATE, row.id, row.retry_count, openids.get(row.user_id),
+                            row.template_id, row.content, row.data)
+            for row in rows
+        ]
+
+        if len(jobs) < limit:
+            rows = await self._claim(db, SmsLog, limit - len(jobs), now, lease_until, (
+                SmsLog.id, SmsLog.retry_count, SmsLog.phone, SmsLog.template_code, SmsLog.content
+            ))
+            jobs += [
+                NotificationJob(KIND_SMS, row.id, row.retry_count, row.phone, row.template_code, row.content)
+                for row in rows
+            ]
+
+        await db.commit()
+        return jobs
+
+    @staticmethod
+    async def _claim(db: AsyncSession, model, limit: int, now: datetime, lease_until: datetime, columns):
+        due = (
+            select(model.id)
+            .where(model.send_status == 0, model.next_retry_at <= now)
+            .order_by(model.next_retry_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            update(model)
+            .where(model.id.in_(due.scalar_subquery()))
+            .values(next_retry_at=lease_until)
+            .returning(*columns)
+            .execution_options(synchronize_session=False)
+        )
+        return result.all()
+
+    @staticmethod
+    async def _openids(db: AsyncSession, user_ids) -> Dict[int, str]:
+        if not user_ids:
+            return {}
+        result = await db.execute(select(User.id, User.openid).where(User.id.in_(user_ids)))
+        return dict(result.all())
+
+    async def complete(self, db: AsyncSession, results: Sequence[SendResult]):
+        """批量写回发送结果（一次提交）"""
+        now = datetime.utcnow()
+        for kind, model in ((KIND_TEMPLATE, MessageLog), (KIND_SMS, SmsLog)):
+            sent = [r.job.id for r in results if r.job.kind == kind and r.error is None]
+            if sent:
+                await db.execute(
+                    update(model)
+                    .where(model.id.in_(sent))
+                    .values(send_status=1, send_time=now, error_msg=None, next_retry_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+
+            failed = []
+            for r in results:
+                if r.job.kind != kind or r.error is None:
+                    continue
+                retries = r.job.retry_count + 1
+                if retries > settings.NOTIFICATION_MAX_RETRIES:
+                    failed.append((r.job.id, 2, retries, None, r.error))
+                else:
+                    failed.append((r.job.id, 0, retries, now + timedelta(seconds=retry_delay(retries)), r.error))
+            if failed:
+                lines = values(
+                    column("id", Integer),
+                    column("send_status", Integer),
+                    column("retry_count", Integer),
+                    column("next_retry_at", DateTime),
+                    column("error_msg", Text),
+                    name="results"
+                ).data(failed)
+                await db.execute(
+                    update(model)
+                    .where(model.id == lines.c.id)
+                    .values(
+                        send_status=lines.c.send_status,
+                        retry_count=lines.c.retry_count,
+                        # 整批都是最终失败时该列全为 NULL，需显式转换类型
+                        next_retry_at=cast(lines.c.next_retry_at, DateTime),
+                        error_msg=lines.c.error_msg,
+                        send_time=now
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+        await db.commit()
+
+
+# 导出实例
+notification_queue = NotificationQueue()
@@ -0,0 +1,161 @@
+"""订单号生成服务
+
+Snowflake 风格：时间 + 机器号 + 序列号，按十进制拼接，保留以下单时间开头的可读格式（24位）：
+
+    yyyyMMddHHmmss + 毫秒(3) + 机器号(4) + 序列号(3)
+
+- 进程内严格递增：同一毫秒内序列号递增，用尽后借用下一毫秒；时钟回拨时沿用上次的毫秒继续递增
+- 跨进程/节点唯一：机器号（0-1023）在Redis中租用（order_no:worker:{id}，SET NX EX），
+  每 1/3 租约续租一次，退出时释放；续租之外生成订单号不访问Redis和数据库
+- 同一时区内按字符串排序即按时间排序
+"""
+import asyncio
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.logger import logger
+
+KEY_PREFIX = "order_no:worker:"
+MAX_WORKERS = 1024
+MAX_SEQUENCE = 999
+
+# KEYS: []  ARGV: [key前缀, 机器号总数, 起始机器号, 持有者标识, 租约秒数]
+# 返回: 租到的机器号，-1 表示全部被占用
+ACQUIRE_SCRIPT = """
+local n = tonumber(ARGV[2])
+local start = tonumber(ARGV[3])
+for i = 0, n - 1 do
+    local id = (start + i) % n
+    if redis.call('SET', ARGV[1] .. id, ARGV[4], 'NX', 'EX', ARGV[5]) then
+        return id
+    end
+end
+return -1
+"""
+
+# KEYS: [租约key]  ARGV: [持有者标识, 租约秒数]
+# 返回: 1 续租成功，0 租约已不属于本进程
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS: [租约key]  ARGV: [持有者标识]
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class OrderNoGenerator:
+    """订单号生成器（每个进程一个实例）"""
+
+    def __init__(self):
+        self._token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self._lock = asyncio.Lock()
+        self._worker_id: Optional[int] = None
+        self._renew_at = 0.0
+        self._expires_at = 0.0
+        self._last_ms = 0
+        self._sequence = 0
+        self._prefix_second = -1
+        self._prefix = ""
+
+    @property
+    def worker_id(self) -> Optional[int]:
+        return self._worker_id
+
+    async def generate(self, redis: Optional[Redis]) -> str:
+        """生成订单号（需要时先申请/续租机器号）"""
+        if self._worker_id is None or time.monotonic() >= self._renew_at:
+            await self._ensure_lease(redis)
+        return self.next_id()
+
+    def next_id(self) -> str:
+        """用当前机器号生成订单号（纯内存计算）"""
+        now = time.time_ns() // 1_000_000
+        if now > self._last_ms:
+            self._last_ms = now
+            self._sequence = 0
+        else:
+            self._sequence += 1
+            if self._sequence > MAX_SEQUENCE:
+                self._last_ms += 1
+                self._sequence = 0
+
+        second, millis = divmod(self._last_ms, 1000)
+        if second != self._prefix_second:
+            self._prefix_second = second
+            self._prefix = time.strftime("%Y%m%d%H%M%S", time.localtime(second))
+        return f"{self._prefix}{millis:03d}{self._worker_id:04d}{self._sequence:03d}"
+
+    async def _ensure_lease(self, redis: Optional[Redis]):
+        async with self._lock:
+            now = time.monotonic()
+            if self._worker_id is not None and now < self._renew_at:
+                return
+            if settings.ORDER_NO_WORKER_ID >= 0:
+                self._worker_id = settings.ORDER_NO_WORKER_ID
+                self._renew_at = float("inf")
+                return
+
+            ttl = settings.ORDER_NO_WORKER_TTL
+            if self._worker_id is not None:
+                try:
+                    renewed = await redis.eval(
+                        RENEW_SCRIPT, 1, f"{KEY_PREFIX}{self._worker_id}", self._token, ttl
+                    )
+                except RedisError as e:
+                    # 租约到期前继续使用当前机器号，稍后重试
+                    if now < self._expires_at:
+                        logger.warning(f"订单号机器号续租失败，稍后重试: {str(e)}")
+                        self._renew_at = now + 1
+                        return
+                    raise
+                if renewed:
+                    self._set_lease(now, ttl)
+                    return
+                logger.warning(f"订单号机器号 {self._worker_id} 的租约已失效，重新申请")
+                self._worker_id = None
+
+            worker_id = await redis.eval(
+                ACQUIRE_SCRIPT, 0, KEY_PREFIX, MAX_WORKERS, random.randrange(MAX_WORKERS), self._token, ttl
+            )
+            if worker_id < 0:
+                raise RuntimeError("没有可用的订单号机器号")
+            self._worker_id = int(worker_id)
+            self._set_lease(now, ttl)
+            logger.info(f"订单号机器号: {self._worker_id}")
+
+    def _set_lease(self, now: float, ttl: int):
+        # 以发起请求的时间计算到期，偏保守
+        self._renew_at = now + ttl / 3
+        self._expires_at = now + ttl
+
+    async def release(self, redis: Optional[Redis]):
+        """释放租用的机器号（进程退出时调用）"""
+        async with self._lock:
+            if self._worker_id is None or settings.ORDER_NO_WORKER_ID >= 0:
+                return
+            try:
+                await redis.eval(RELEASE_SCRIPT, 1, f"{KEY_PREFIX}{self._worker_id}", self._token)
+            except RedisError as e:
+                logger.warning(f"释放订单号机器号失败: {str(e)}")
+            self._worker_id = None
+            self._renew_at = 0.0
+
+
+# 导出实例
+order_no_generator = OrderNoGenerator()
@@ -1,12 +1,52 @@
 """订单服务层"""
+import asyncio
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Dict, Iterable
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.orm import selectinload
 
 from app.models.order import Order, OrderItem, OrderLog
 from app.core.crud import CRUDBase
 from app.schemas.order import OrderCreate, OrderUpdate
+from app.services.inventory_service import inventory
+from app.services.flash_stock_service import flash_stock
+from app.services.product_service import product as product_service
+
+# 订单状态机：当前状态 -> 允许变更到的状态
+ORDER_TRANSITIONS = {
+    "pending": ("cancelled",),
+    "paid": ("preparing", "cancelled", "refunding", "refunded"),
+    "preparing": ("ready", "refunding", "refunded"),
+    "ready": ("delivering", "refunding", "refunded"),
+    "delivering": ("completed", "refunding", "refunded"),
+    "completed": ("refunding", "refunded"),
+    "refunding": ("refunded",),
+    "refunded": (),
+    "cancelled": (),
+}
+
+# 允许批量变更的目标状态（履约流程）；取消/退款涉及支付和库存，需逐单处理
+BULK_TARGET_STATUSES = ("preparing", "ready", "delivering", "completed")
+
+
+def can_transition(current: str, target: str) -> bool:
+    """状态是否允许从 current 变更为 target"""
+    return target in ORDER_TRANSITIONS.get(current, ())
+
+
+def source_statuses(target: str) -> List[str]:
+    """可以变更为 target 的状态"""
+    return [status for status, targets in ORDER_TRANSITIONS.items() if target in targets]
+
+
+@dataclass
+class BulkTransitionResult:
+    """批量变更结果"""
+    updated: List[int] = field(default_factory=list)  # 变更成功的订单ID（按请求顺序）
+    failed: Dict[int, str] = field(default_factory=dict)  # 订单ID -> 失败原因
 
 
 class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
@@ -14,13 +54,28 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         """根据订单号获取订单"""
         return await self.get_by_field(db, field_name="order_no", field_value=order_no)
 
+    async def get_with_details(self, db: AsyncSession, order_id: int) -> Optional[Order]:
+        """获取订单（预加载商品明细和日志）
+
+        selectinload 每个集合一条 IN 查询，共3条SQL，替代
+        订单 + 明细(COUNT+分页) + 日志(COUNT+分页) 的5次往返。
+        """
+        result = await db.execute(
+            select(Order)
+            .where(Order.id == order_id)
+            .options(selectinload(Order.items), selectinload(Order.logs))
+        )
+        return result.scalar_one_or_none()
+
     async def get_user_orders(
         self,
         db: AsyncSession,
         user_id: int,
         status: Optional[Union[str, List[str]]] = None,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        with_total: bool = True,
+        include_items: bool = False
     ):
         """获取用户订单列表
 
@@ -28,35 +83,35 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         - status=None：不筛选
         - status="pending"：单状态
         - status=["paid","preparing"]：多状态（IN 查询）
+
+        include_items=True 时用一条 IN 查询批量预加载整页订单的商品明细
         """
+        options = [selectinload(self.model.items)] if include_items else []
+
         # 多状态：走手写查询（CRUDBase.get_multi 只支持等值过滤）
         if isinstance(status, list):
-            query = select(self.model).where(self.model.user_id == user_id)
+            query = select(self.model).where(self.model.user_id == user_id).options(*options)
             if status:
                 query = query.where(self.model.status.in_(status))
-
-            count_query = select(func.count()).select_from(query.subquery())
-            total = (await db.execute(count_query)).scalar() or 0
-
-            query = query.offset(skip).limit(limit)
-            result = await db.execute(query)
-            items = result.scalars().all()
-            return list(items), int(total)
+            return await self.paginate(db, query, skip=skip, limit=limit, with_total=with_total)
 
         # 单状态/不筛选：沿用通用 CRUD
         filters = {"user_id": user_id}
         if status:
             filters["status"] = status
-        return await self.get_multi(db, skip=skip, limit=limit, **filters)
+        return await self.get_multi(
+            db, skip=skip, limit=limit, with_total=with_total, options=options, **filters
+        )
 
     async def create_order(
         self,
         db: AsyncSession,
         user_id: int,
         order_data: dict,
-        items_data: list
+        items_data: list,
+        commit: bool = True
     ) -> Order:
-        """创建订单（含商品明细）"""
+        """创建订单（含商品明细，commit=False 时随调用方事务提交）"""
         # 创建订单
         order = Order(**order_data)
         db.add(order)
@@ -77,8 +132,9 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         )
         db.add(log)
 
-        await db.commit()
-        await db.refresh(order)
+        if commit:
+            await db.commit()
+            await db.refresh(order)
         return order
 
     async def update_order_status(
@@ -87,9 +143,10 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         order: Order,
         new_status: str,
         operator: Optional[str] = None,
-        remark: Optional[str] = None
+        remark: Optional[str] = None,
+        commit: bool = True
     ) -> Order:
-        """更新订单状态"""
+        """更新订单状态（commit=False 时随调用方事务提交）"""
         old_status = order.status
         order.status = new_status
 
@@ -110,10 +167,256 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         )
         db.add(log)
 
-        await db.commit()
-        await db.refresh(order)
+        if commit:
+            await db.commit()
+            await db.refresh(order)
         return order
 
+    async def mark_paid(
+        self,
+        db: AsyncSession,
+        order_id: int,
+        operator: Optional[str] = None,
+        remark: Optional[str] = None
+    ) -> bool:
+        """
+        待支付 -> 已支付（随调用方事务提交）
+
+        条件 UPDATE ... WHERE status = 'pending'：与超时取消（expire_unpaid）争抢同一行锁，
+        取消先提交时这里更新 0 行，不会把已取消、已归还库存的订单改为已支付。
+
+        Returns:
+            是否更新成功；False 表示订单已不是待支付状态
+        """
+        paid = (await db.execute(
+            update(Order)
+            .where(Order.id == order_id, Order.status == "pending")
+            .values(status="paid", updated_at=datetime.utcnow())
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
+        )).scalar_one_or_none()
+        if paid is None:
+            return False
+
+        db.add(OrderLog(
+            order_id=order_id,
+            status="paid",
+            operator=operator,
+            remark=remark or "订单状态从 pending 变更为 paid"
+        ))
+        return True
+
+    async def mark_cancelled(
+        self,
+        db: AsyncSession,
+        order_id: int,
+        operator: Optional[str] = None,
+        remark: Optional[str] = None
+    ) -> bool:
+        """
+        待支付/已支付 -> 已取消（随调用方事务提交）
+
+        条件 UPDATE ... WHERE status IN ('pending', 'paid')：与超时取消（expire_unpaid）争抢同一行锁，
+        只有一方能取消成功，库存只归还一次。
+
+        Returns:
+            是否更新成功；False 表示订单当前状态不允许取消
+        """
+        now = datetime.utcnow()
+        row = (await db.execute(
+            update(Order)
+            .where(Order.id == order_id, Order.status.in_(source_statuses("cancelled")))
+            .values(status="cancelled", cancelled_at=func.coalesce(Order.cancelled_at, now), updated_at=now)
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
+        )).first()
+        if row is None:
+            return False
+
+        db.add(OrderLog(
+            order_id=order_id,
+            status="cancelled",
+            operator=operator,
+            remark=remark or "订单已取消"
+        ))
+        return True
+
+    async def bulk_transition(
+        self,
+        db: AsyncSession,
+        order_ids: Iterable[int],
+        target: str,
+        operator: Optional[str] = None,
+        remark: Optional[str] = None
+    ) -> BulkTransitionResult:
+        """
+        批量变更订单状态（一个事务）
+
+        一条 UPDATE ... FROM (SELECT ... FOR UPDATE) RETURNING 变更所有当前状态允许变更的订单，
+        一条多行 INSERT 写入订单日志；其余订单逐个给出失败原因（不存在 / 状态不允许）。
+        """
+        ids = list(dict.fromkeys(order_ids))
+        result = BulkTransitionResult()
+        if not ids:
+            return result
+
+        now = datetime.utcnow()
+        values = {"status": target, "updated_at": now}
+        if target == "cancelled":
+            values["cancelled_at"] = func.coalesce(Order.cancelled_at, now)
+        elif target == "completed":
+            values["completed_at"] = func.coalesce(Order.completed_at, now)
+
+        # 子查询加行锁并取出变更前的状态（RETURNING 只能返回变更后的值）
+        previous = (
+            select(Order.id, Order.status)
+            .where(Order.id.in_(ids), Order.status.in_(source_statuses(target)))
+            .with_for_update()
+            .subquery()
+        )
+        rows = (await db.execute(
+            update(Order)
+            .where(Order.id == previous.c.id)
+            .values(**values)
+            .returning(Order.id, previous.c.status)
+            .execution_options(synchronize_session=False)
+        )).all()
+
+        if rows:
+            await db.execute(insert(OrderLog), [
+                {
+                    "order_id": order_id,
+                    "status": target,
+                    "operator": operator,
+                    "remark": remark or f"订单状态从 {old_status} 变更为 {target}",
+                    "created_at": now,
+                    "updated_at": now
+                }
+                for order_id, old_status in rows
+            ])
+
+        updated = {order_id for order_id, _ in rows}
+        result.updated = [order_id for order_id in ids if order_id in updated]
+        missing = [order_id for order_id in ids if order_id not in updated]
+        if missing:
+            current = dict((await db.execute(
+                select(Order.id, Order.status).where(Order.id.in_(missing))
+            )).all())
+            for order_id in missing:
+                status = current.get(order_id)
+                if status is None:
+                    result.failed[order_id] = "订单不存在"
+                elif status == target:
+                    result.failed[order_id] = f"订单已是 {target} 状态"
+                else:
+                    result.failed[order_id] = f"状态不允许从 {status} 变更为 {target}"
+
+        await db.commit()
+        return result
+
+    async def expire_unpaid(
+        self,
+        db: AsyncSession,
+        redis: Optional[Redis],
+        cutoff: datetime,
+        limit: int
+    ) -> List[int]:
+        """
+        取消一批超时未支付订单并归还库存（一个事务）
+
+        UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) 领取 created_at 早于 cutoff 的待支付订单
+        （走 idx_orders_status_created_id），多个副本同时运行时各自领取不同订单、互不等待；
+        同一事务内多行写入日志，按商品汇总明细后一条集合式 UPDATE 归还库存。
+        热点商品在Redis中的预占先只读查看，事务提交后再归还，提交失败时Redis不变、下一轮重试。
+
+        Returns:
+            本批取消的订单ID
+        """
+        now = datetime.utcnow()
+        due = (
+            select(Order.id)
+            .where(Order.status == "pending", Order.created_at < cutoff)
+            .order_by(Order.created_at, Order.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        rows = (await db.execute(
+            update(Order)
+            .where(Order.id.in_(due.scalar_subquery()))
+            .values(status="cancelled", cancelled_at=now, cancel_reason="超时未支付", updated_at=now)
+            .returning(Order.id, Order.order_no)
+            .execution_options(synchronize_session=False)
+        )).all()
+        if not rows:
+            return []
+
+        order_ids = [order_id for order_id, _ in rows]
+        await db.execute(insert(OrderLog), [
+            {
+                "order_id": order_id,
+                "status": "cancelled",
+                "operator": "系统",
+                "remark": "超时未支付，自动取消",
+                "created_at": now,
+                "updated_at": now
+            }
+            for order_id in order_ids
+        ])
+
+        # 热点商品在Redis中的预占提交后归还，其余按商品汇总后走数据库
+        lines = (await db.execute(
+            select(OrderItem.product_id, func.sum(OrderItem.quantity))
+            .where(OrderItem.order_id.in_(order_ids))
+            .group_by(OrderItem.product_id)
+        )).all()
+        reserved = {}
+        if flash_stock.enabled:
+            reserved = inventory.merge_lines(
+                line
+                for order_reserved in await asyncio.gather(*(
+                    flash_stock.reserved(redis, order_no) for _, order_no in rows
+                ))
+                for line in order_reserved.items()
+            )
+        quantities = flash_stock.split_lines(lines, reserved)
+        stocks = await inventory.release(db, quantities)
+        await db.commit()
+
+        await product_service.invalidate_stock(redis, stocks, quantities)
+        if reserved:
+            await self.release_flash_stock(db, redis, [order_no for _, order_no in rows], reserved)
+        return order_ids
+
+    async def release_flash_stock(
+        self,
+        db: AsyncSession,
+        redis: Optional[Redis],
+        order_nos: List[str],
+        reserved: Dict[int, int]
+    ):
+        """
+        取消/退款提交后归还Redis预占（reserved 为事务内 flash_stock.reserved 查看到的明细）
+
+        查看之后被卸载的商品（计数器已删除）补走数据库归还。
+        """
+        released = inventory.merge_lines(
+            line
+            for order_released in await asyncio.gather(*(
+                flash_stock.release(redis, order_no) for order_no in order_nos
+            ))
+            for line in order_released.items()
+        )
+        leftover = {
+            product_id: quantity - released.get(product_id, 0)
+            for product_id, quantity in reserved.items()
+            if quantity > released.get(product_id, 0)
+        }
+        if not leftover:
+            return
+        stocks = await inventory.release(db, leftover)
+        await db.commit()
+        await product_service.invalidate_stock(redis, stocks, leftover)
+
 
 class CRUDOrderItem(CRUDBase[OrderItem, dict, dict]):
     async def get_order_items(self, db: AsyncSession, order_id: int):
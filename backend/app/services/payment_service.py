@@ -24,9 +24,10 @@ class CRUDPayment(CRUDBase[Payment, PaymentCreate, PaymentUpdate]):
         db: AsyncSession,
         order_id: int,
         prepay_id: str,
-        amount: float
+        amount: float,
+        commit: bool = True
     ) -> Payment:
-        """创建支付记录"""
+        """创建支付记录（commit=False 时只 flush 以取得主键）"""
         payment = Payment(
             order_id=order_id,
             prepay_id=prepay_id,
@@ -34,6 +35,9 @@ class CRUDPayment(CRUDBase[Payment, PaymentCreate, PaymentUpdate]):
             status="pending"
         )
         db.add(payment)
+        if not commit:
+            await db.flush()
+            return payment
         await db.commit()
         await db.refresh(payment)
         return payment
@@ -42,15 +46,17 @@ class CRUDPayment(CRUDBase[Payment, PaymentCreate, PaymentUpdate]):
         self,
         db: AsyncSession,
         payment: Payment,
-        transaction_id: str
+        transaction_id: str,
+        commit: bool = True
     ) -> Payment:
         """处理支付成功"""
         payment.transaction_id = transaction_id
         payment.status = "paid"
         payment.paid_at = datetime.utcnow()
         db.add(payment)
-        await db.commit()
-        await db.refresh(payment)
+        if commit:
+            await db.commit()
+            await db.refresh(payment)
         return payment
 
     async def request_refund(
@@ -58,7 +64,8 @@ class CRUDPayment(CRUDBase[Payment, PaymentCreate, PaymentUpdate]):
         db: AsyncSession,
         payment: Payment,
         refund_amount: float,
-        refund_reason: str
+        refund_reason: str,
+        commit: bool = True
     ) -> Payment:
         """发起退款申请（进入 refunding）
 
@@ -69,17 +76,19 @@ class CRUDPayment(CRUDBase[Payment, PaymentCreate, PaymentUpdate]):
         payment.refund_amount = refund_amount
         payment.refund_reason = refund_reason
         db.add(payment)
-        await db.commit()
-        await db.refresh(payment)
+        if commit:
+            await db.commit()
+            await db.refresh(payment)
         return payment
 
-    async def confirm_refund(self, db: AsyncSession, payment: Payment) -> Payment:
+    async def confirm_refund(self, db: AsyncSession, payment: Payment, commit: bool = True) -> Payment:
         """确认退款成功（进入 refunded）"""
         payment.status = "refunded"
         payment.refunded_at = datetime.utcnow()
         db.add(payment)
-        await db.commit()
-        await db.refresh(payment)
+        if commit:
+            await db.commit()
+            await db.refresh(payment)
         return payment
 
 
@@ -1,14 +1,33 @@
 """积分服务层"""
-from typing import Optional, List
+from dataclasses import dataclass
+from typing import Optional, List, Sequence
 from datetime import datetime, timedelta
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc, func
+from sqlalchemy import (
+    select, and_, or_, desc, func, cast, literal, text, bindparam, Date, DateTime, Integer, String
+)
+from sqlalchemy.dialects.postgresql import insert
 
 from app.models.config import PointRule
-from app.models.user import User, PointsRecord, SignInRecord
-from app.core.crud import CRUDBase
+from app.models.user import User, PointsRecord, SignInRecord, UserPointsSummary
+from app.core.cache import VersionedCache
+from app.core.crud import CRUDBase, Page, CursorPage
 from app.schemas.points import PointRuleCreate, PointRuleUpdate
 
+# 规则极少修改，签到等高频接口从缓存读取积分数
+point_rule_cache = VersionedCache("point_rule")
+
+
+@dataclass
+class SignInResult:
+    """签到结果"""
+    record_id: int
+    sign_date: str
+    points: int  # 本次获得积分
+    total_points: int  # 签到后的总积分
+    consecutive_days: int  # 截至本次的连续签到天数
+
 
 class CRUDPointRule(CRUDBase[PointRule, PointRuleCreate, PointRuleUpdate]):
     """积分规则CRUD"""
@@ -22,6 +41,24 @@ class CRUDPointRule(CRUDBase[PointRule, PointRuleCreate, PointRuleUpdate]):
         result = await db.execute(select(PointRule).order_by(PointRule.rule_type))
         return result.scalars().all()
 
+    async def get_rule_points_cached(
+        self,
+        db: AsyncSession,
+        redis: Optional[Redis],
+        rule_type: int
+    ) -> Optional[int]:
+        """获取规则的积分数（读缓存），规则不存在返回 None（同样会被缓存）"""
+
+        async def load():
+            rule = await self.get_rule_by_type(db, rule_type)
+            return rule.points if rule else None
+
+        return await point_rule_cache.get_or_load(redis, str(rule_type), load)
+
+    async def invalidate_cache(self, redis: Optional[Redis]):
+        """规则创建/修改/删除后失效缓存"""
+        await point_rule_cache.invalidate(redis)
+
 
 class CRUDPointsRecord(CRUDBase):
     """积分记录CRUD"""
@@ -33,8 +70,9 @@ class CRUDPointsRecord(CRUDBase):
         *,
         change_type: Optional[int] = None,
         skip: int = 0,
-        limit: int = 20
-    ) -> tuple[List[PointsRecord], int]:
+        limit: int = 20,
+        with_total: bool = True
+    ) -> Page:
         """
         获取用户积分记录
         change_type: 1-获得 2-消耗
@@ -44,91 +82,30 @@ class CRUDPointsRecord(CRUDBase):
         if change_type is not None:
             query = query.where(PointsRecord.change_type == change_type)
 
-        # 获取总数
-        count_query = select(func.count()).select_from(query.subquery())
-        total = (await db.execute(count_query)).scalar()
-
         # 分页并按时间倒序
-        query = query.order_by(desc(PointsRecord.created_at))
-        query = query.offset(skip).limit(limit)
-        result = await db.execute(query)
-        items = result.scalars().all()
+        query = query.order_by(desc(PointsRecord.created_at), desc(PointsRecord.id))
+        return await self.paginate(db, query, skip=skip, limit=limit, with_total=with_total)
 
-        return list(items), total
-
-    async def get_user_summary(self, db: AsyncSession, user_id: int) -> dict:
-        """获取用户积分汇总"""
-        # 获得积分
-        earned_result = await db.execute(
-            select(func.sum(PointsRecord.points)).where(
-                and_(
-                    PointsRecord.user_id == user_id,
-                    PointsRecord.change_type == 1
-                )
-            )
-        )
-        earned = earned_result.scalar() or 0
-
-        # 消耗积分
-        spent_result = await db.execute(
-            select(func.sum(PointsRecord.points)).where(
-                and_(
-                    PointsRecord.user_id == user_id,
-                    PointsRecord.change_type == 2
-                )
-            )
-        )
-        spent = spent_result.scalar() or 0
-
-        # 签到次数
-        sign_count_result = await db.execute(
-            select(func.count()).where(SignInRecord.user_id == user_id)
-        )
-        sign_count = sign_count_result.scalar() or 0
-
-        # 当前连续签到天数
-        consecutive_days = await self._get_consecutive_days(db, user_id)
-
-        return {
-            "total_points": earned - spent,
-            "earned_points": earned,
-            "spent_points": spent,
-            "sign_count": sign_count,
-            "consecutive_days": consecutive_days
-        }
-
-    async def _get_consecutive_days(self, db: AsyncSession, user_id: int) -> int:
-        """计算连续签到天数"""
-        result = await db.execute(
-            select(SignInRecord.sign_date)
-            .where(SignInRecord.user_id == user_id)
-            .order_by(desc(SignInRecord.sign_date))
-        )
-        dates = result.scalars().all()
-
-        if not dates:
-            return 0
-
-        consecutive = 1
-        today = datetime.now().strftime("%Y-%m-%d")
+    async def get_user_records_cursor(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        *,
+        change_type: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> CursorPage:
+        """获取用户积分记录（游标分页，按时间倒序）"""
+        query = select(PointsRecord).where(PointsRecord.user_id == user_id)
 
-        # 检查最后签到日期
-        if dates[0] != today:
-            # 如果今天没签到，检查昨天
-            yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-            if dates[0] != yesterday:
-                return 0
+        if change_type is not None:
+            query = query.where(PointsRecord.change_type == change_type)
 
-        # 计算连续天数
-        for i in range(1, len(dates)):
-            current_date = datetime.strptime(dates[i-1], "%Y-%m-%d")
-            prev_date = datetime.strptime(dates[i], "%Y-%m-%d")
-            if (current_date - prev_date).days == 1:
-                consecutive += 1
-            else:
-                break
+        return await self.paginate_cursor(db, query, cursor=cursor, limit=limit)
 
-        return consecutive
+    async def get_user_summary(self, db: AsyncSession, user_id: int) -> dict:
+        """获取用户积分汇总（读取 user_points_summary，一次主键查询）"""
+        return await points_summary.get_summary(db, user_id)
 
     async def add_points(
         self,
@@ -170,11 +147,61 @@ class CRUDPointsRecord(CRUDBase):
             if user:
                 user.total_points -= points
 
+        await points_summary.add_points(db, user_id, change_type, points)
         await db.commit()
         await db.refresh(record)
         return record
 
 
+# 签到：签到记录 ON CONFLICT DO NOTHING，插入成功时同一语句内加积分、写积分记录、更新积分汇总
+# （汇总的连续天数规则同 CRUDUserPointsSummary：前一天签过 +1，同一天不变，否则从 1 开始）。
+# 用固定 SQL：postgresql.insert 构造不进入 SQLAlchemy 编译缓存，四段 CTE 每次编译约 8ms
+SIGN_IN_SQL = text("""
+    WITH inserted AS (
+        INSERT INTO sign_in_records (user_id, sign_date, points, created_at, updated_at)
+        VALUES (:user_id, :sign_date, :points, :now, :now)
+        ON CONFLICT (user_id, sign_date) DO NOTHING
+        RETURNING id, user_id, points
+    ), users_updated AS (
+        UPDATE users u
+        SET total_points = u.total_points + i.points, last_sign_in_at = :local_now, updated_at = :now
+        FROM inserted i
+        WHERE u.id = i.user_id
+        RETURNING u.id, u.total_points
+    ), points_inserted AS (
+        INSERT INTO points_records (user_id, change_type, points, source_type, source_id, description,
+                                    created_at, updated_at)
+        SELECT user_id, 1, points, 1, id, '每日签到', :now, :now FROM inserted
+    ), summary_updated AS (
+        INSERT INTO user_points_summary AS s (user_id, earned_points, spent_points, sign_count, current_streak,
+                                              last_sign_date, created_at, updated_at)
+        SELECT user_id, points, 0, 1, 1, :sign_date, :now, :now FROM inserted
+        ON CONFLICT (user_id) DO UPDATE SET
+            earned_points = s.earned_points + excluded.earned_points,
+            sign_count = s.sign_count + 1,
+            current_streak = CASE s.last_sign_date
+                WHEN :yesterday THEN s.current_streak + 1
+                WHEN :sign_date THEN s.current_streak
+                ELSE 1
+            END,
+            last_sign_date = excluded.last_sign_date,
+            updated_at = excluded.updated_at
+        RETURNING user_id, current_streak
+    )
+    SELECT i.id, u.total_points, s.current_streak
+    FROM inserted i
+    JOIN users_updated u ON u.id = i.user_id
+    JOIN summary_updated s ON s.user_id = i.user_id
+""").bindparams(
+    bindparam("user_id", type_=Integer),
+    bindparam("sign_date", type_=String),
+    bindparam("yesterday", type_=String),
+    bindparam("points", type_=Integer),
+    bindparam("now", type_=DateTime),
+    bindparam("local_now", type_=DateTime)
+)
+
+
 class CRUDSignInRecord(CRUDBase):
     """签到记录CRUD"""
 
@@ -195,32 +222,200 @@ class CRUDSignInRecord(CRUDBase):
         self,
         db: AsyncSession,
         user_id: int,
-        points: int
-    ) -> SignInRecord:
-        """签到并记录"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        record = SignInRecord(
-            user_id=user_id,
-            sign_date=today,
-            points=points
+        points: int,
+        sign_date: Optional[str] = None,
+        commit: bool = True
+    ) -> Optional[SignInResult]:
+        """
+        签到（一条语句）
+
+        签到记录 INSERT ... ON CONFLICT (user_id, sign_date) DO NOTHING RETURNING，
+        插入成功时在同一语句的 CTE 中增加用户积分、写积分记录、更新积分汇总；
+        同一天的并发/重复签到只有一个能插入，其余什么都不写。
+
+        Args:
+            sign_date: 签到日期 YYYY-MM-DD，默认今天
+
+        Returns:
+            签到结果，当天已签到返回 None
+        """
+        sign_date = sign_date or datetime.now().strftime("%Y-%m-%d")
+        yesterday = (datetime.strptime(sign_date, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+        row = (await db.execute(SIGN_IN_SQL, {
+            "user_id": user_id,
+            "sign_date": sign_date,
+            "yesterday": yesterday,
+            "points": points,
+            "now": datetime.utcnow(),
+            "local_now": datetime.now()
+        })).one_or_none()
+        if commit:
+            await db.commit()
+        if row is None:
+            return None
+        return SignInResult(
+            record_id=row[0],
+            sign_date=sign_date,
+            points=points,
+            total_points=row[1],
+            consecutive_days=row[2]
         )
-        db.add(record)
 
-        # 更新用户最后签到时间
-        user_result = await db.execute(
-            select(User).where(User.id == user_id)
+
+class CRUDUserPointsSummary(CRUDBase):
+    """
+    用户积分汇总CRUD
+
+    累计获得/消耗积分、签到次数、连续签到天数物化在每个用户一行的 user_points_summary 中，
+    由写入积分记录/签到记录的方法在同一事务内用 INSERT ... ON CONFLICT DO UPDATE 原子增量更新，
+    汇总接口只需一次主键查询。rebuild/check 按明细表重新计算（回填与一致性检查）。
+    """
+
+    async def get_summary(self, db: AsyncSession, user_id: int) -> dict:
+        """获取用户积分汇总，连续签到天数在最后签到日早于昨天时为 0"""
+        row = (await db.execute(
+            select(
+                UserPointsSummary.earned_points,
+                UserPointsSummary.spent_points,
+                UserPointsSummary.sign_count,
+                UserPointsSummary.current_streak,
+                UserPointsSummary.last_sign_date
+            ).where(UserPointsSummary.user_id == user_id)
+        )).one_or_none()
+        earned, spent, sign_count, streak, last_sign_date = row or (0, 0, 0, 0, None)
+
+        today = datetime.now()
+        active = (today.strftime("%Y-%m-%d"), (today - timedelta(days=1)).strftime("%Y-%m-%d"))
+        return {
+            "total_points": earned - spent,
+            "earned_points": earned,
+            "spent_points": spent,
+            "sign_count": sign_count,
+            "consecutive_days": streak if last_sign_date in active else 0
+        }
+
+    async def add_points(self, db: AsyncSession, user_id: int, change_type: int, points: int):
+        """积分记录写入后累加获得/消耗积分（change_type: 1-获得 2-消耗）"""
+        column = "earned_points" if change_type == 1 else "spent_points"
+        stmt = insert(UserPointsSummary).values(user_id=user_id, **{column: points})
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[UserPointsSummary.user_id],
+            set_={column: getattr(UserPointsSummary, column) + points, "updated_at": datetime.utcnow()}
+        ))
+
+    @staticmethod
+    def _expected(user_ids: Sequence[int]):
+        """按积分记录和签到记录重新计算的汇总（每个用户一行，没有记录的用户为 0）"""
+        points = (
+            select(
+                PointsRecord.user_id,
+                func.sum(PointsRecord.points).filter(PointsRecord.change_type == 1).label("earned_points"),
+                func.sum(PointsRecord.points).filter(PointsRecord.change_type == 2).label("spent_points")
+            )
+            .where(PointsRecord.user_id.in_(user_ids))
+            .group_by(PointsRecord.user_id)
+            .subquery()
+        )
+        signs = (
+            select(SignInRecord.user_id, func.count().label("sign_count"))
+            .where(SignInRecord.user_id.in_(user_ids))
+            .group_by(SignInRecord.user_id)
+            .subquery()
+        )
+
+        # 连续签到：日期减去组内序号相同的为同一段连续日期，取最后一段的长度
+        days = (
+            select(SignInRecord.user_id, cast(SignInRecord.sign_date, Date).label("day"))
+            .where(SignInRecord.user_id.in_(user_ids))
+            .distinct()
+            .subquery()
+        )
+        grouped = select(
+            days.c.user_id,
+            days.c.day,
+            (days.c.day - cast(func.row_number().over(partition_by=days.c.user_id, order_by=days.c.day), Integer))
+            .label("grp")
+        ).subquery()
+        runs = (
+            select(grouped.c.user_id, func.max(grouped.c.day).label("last_day"), func.count().label("streak"))
+            .group_by(grouped.c.user_id, grouped.c.grp)
+            .subquery()
+        )
+        last_run = (
+            select(runs.c.user_id, runs.c.streak, func.to_char(runs.c.last_day, "YYYY-MM-DD").label("last_sign_date"))
+            .distinct(runs.c.user_id)
+            .order_by(runs.c.user_id, runs.c.last_day.desc())
+            .subquery()
+        )
+
+        return (
+            select(
+                User.id.label("user_id"),
+                func.coalesce(points.c.earned_points, 0).label("earned_points"),
+                func.coalesce(points.c.spent_points, 0).label("spent_points"),
+                func.coalesce(signs.c.sign_count, 0).label("sign_count"),
+                func.coalesce(last_run.c.streak, 0).label("current_streak"),
+                last_run.c.last_sign_date
+            )
+            .outerjoin(points, points.c.user_id == User.id)
+            .outerjoin(signs, signs.c.user_id == User.id)
+            .outerjoin(last_run, last_run.c.user_id == User.id)
+            .where(User.id.in_(user_ids))
+            .subquery()
         )
-        user = user_result.scalar_one_or_none()
-        if user:
-            user.last_sign_in_at = datetime.now()
-            user.total_points += points
 
+    async def rebuild(self, db: AsyncSession, user_ids: Sequence[int]) -> int:
+        """按明细重算指定用户的汇总（一条 INSERT ... SELECT ... ON CONFLICT），返回处理的用户数"""
+        if not user_ids:
+            return 0
+        expected = self._expected(user_ids)
+        now = datetime.utcnow()
+        columns = ["user_id", "earned_points", "spent_points", "sign_count", "current_streak", "last_sign_date"]
+        stmt = insert(UserPointsSummary).from_select(
+            columns + ["created_at", "updated_at"],
+            select(*(expected.c[name] for name in columns), literal(now), literal(now))
+        )
+        result = await db.execute(stmt.on_conflict_do_update(
+            index_elements=[UserPointsSummary.user_id],
+            set_={
+                **{name: stmt.excluded[name] for name in columns[1:]},
+                "updated_at": now
+            }
+        ))
         await db.commit()
-        await db.refresh(record)
-        return record
+        return result.rowcount
+
+    async def check(self, db: AsyncSession, user_ids: Sequence[int]) -> List[dict]:
+        """对比汇总与明细，返回不一致的用户 [{user_id, stored, expected}]（缺少汇总行视为全 0）"""
+        if not user_ids:
+            return []
+        expected = self._expected(user_ids)
+        summary = UserPointsSummary
+        stored = [
+            func.coalesce(summary.earned_points, 0),
+            func.coalesce(summary.spent_points, 0),
+            func.coalesce(summary.sign_count, 0),
+            func.coalesce(summary.current_streak, 0),
+            summary.last_sign_date
+        ]
+        wanted = [
+            expected.c.earned_points,
+            expected.c.spent_points,
+            expected.c.sign_count,
+            expected.c.current_streak,
+            expected.c.last_sign_date
+        ]
+        rows = (await db.execute(
+            select(expected.c.user_id, *stored, *wanted)
+            .outerjoin(summary, summary.user_id == expected.c.user_id)
+            .where(or_(*(a.is_distinct_from(b) for a, b in zip(stored, wanted))))
+            .order_by(expected.c.user_id)
+        )).all()
+        return [{"user_id": row[0], "stored": tuple(row[1:6]), "expected": tuple(row[6:11])} for row in rows]
 
 
 # 导出实例
 point_rule = CRUDPointRule(PointRule)
 points_record = CRUDPointsRecord(PointsRecord)
 sign_in_record = CRUDSignInRecord(SignInRecord)
+points_summary = CRUDUserPointsSummary(UserPointsSummary)
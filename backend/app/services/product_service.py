@@ -1,12 +1,24 @@
 """商品服务层"""
-from typing import Optional, List, Dict, Any
+import json
+from typing import Optional, List, Dict, Any, Iterable, Mapping
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, and_
+from sqlalchemy import select, or_, and_, func
 
 from app.models.product import Product, ProductImage, Category
 from app.models.merchant import Merchant
-from app.core.crud import CRUDBase
-from app.schemas.product import ProductCreate, ProductUpdate, CategoryCreate, CategoryUpdate
+from app.core.cache import VersionedCache, make_key
+from app.core.crud import CRUDBase, Page
+from app.services.search_service import product_search
+from app.services.minio_storage import minio_storage
+from app.schemas.product import (
+    ProductCreate, ProductUpdate, CategoryCreate, CategoryUpdate,
+    ProductResponse, ProductImageResponse
+)
+
+# 首页/列表与详情分开缓存：库存变化只删对应详情，不必整体失效列表
+product_list_cache = VersionedCache("product_list")
+product_detail_cache = VersionedCache("product_detail")
 
 
 class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
@@ -30,13 +42,14 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
         is_group_buy: Optional[bool] = None,
         merchant_id: Optional[int] = None,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        with_total: bool = True
     ):
-        """搜索商品"""
+        """搜索商品（有关键词时按相关度排序）"""
         query = select(Product).where(Product.status == 1)
 
         if keyword:
-            query = query.where(Product.name.contains(keyword))
+            query = await product_search.apply(db, query, keyword)
 
         if category_id:
             query = query.where(Product.category_id == category_id)
@@ -53,16 +66,147 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
         if merchant_id:
             query = query.where(Product.merchant_id == merchant_id)
 
-        # 获取总数
-        from sqlalchemy import func
-        count_query = select(func.count()).select_from(query.subquery())
-        total = (await db.execute(count_query)).scalar()
+        return await self.paginate(db, query, skip=skip, limit=limit, with_total=with_total)
+
+    async def get_many(self, db: AsyncSession, ids: Iterable[int]) -> Dict[int, Product]:
+        """批量获取商品（一次查询）
+
+        Returns:
+            {商品ID: 商品}，不存在的ID不会出现在结果中
+        """
+        ids = set(ids)
+        if not ids:
+            return {}
+
+        result = await db.execute(select(Product).where(Product.id.in_(ids)))
+        return {p.id: p for p in result.scalars().all()}
+
+    async def get_main_images(
+        self,
+        db: AsyncSession,
+        ids: Iterable[int],
+        with_variants: bool = False
+    ) -> Dict[int, Any]:
+        """批量获取商品主图（每个商品 sort_order 最小的一张，一次查询）
+
+        Returns:
+            {商品ID: 主图URL}；with_variants 时为 {商品ID: {"url": 主图URL, "variants": 变体URL或None}}，
+            无图片的商品不会出现在结果中
+        """
+        ids = set(ids)
+        if not ids:
+            return {}
+
+        ranked = (
+            select(
+                ProductImage.product_id,
+                ProductImage.image_url,
+                ProductImage.variants,
+                func.row_number().over(
+                    partition_by=ProductImage.product_id,
+                    order_by=(ProductImage.sort_order, ProductImage.id)
+                ).label("rn")
+            )
+            .where(ProductImage.product_id.in_(ids))
+            .subquery()
+        )
+        result = await db.execute(
+            select(ranked.c.product_id, ranked.c.image_url, ranked.c.variants).where(ranked.c.rn == 1)
+        )
+        if not with_variants:
+            return {product_id: image_url for product_id, image_url, _ in result.all()}
+        return {
+            product_id: {"url": image_url, "variants": json.loads(variants) if variants else None}
+            for product_id, image_url, variants in result.all()
+        }
+
+    async def search_products_cached(
+        self,
+        db: AsyncSession,
+        redis: Optional[Redis],
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        with_total: bool = True,
+        **filters
+    ) -> Page:
+        """搜索商品（读缓存），参数同 search_products，items 为序列化后的 dict"""
+        key = make_key("search", skip=skip, limit=limit, with_total=with_total, **filters)
+
+        async def load():
+            page = await self.search_products(
+                db, skip=skip, limit=limit, with_total=with_total, **filters
+            )
+            # 列表页返回主图变体（缩略图/WebP），避免小程序为缩略图下载原图
+            images = await self.get_main_images(db, [p.id for p in page.items], with_variants=True)
+            return {
+                "items": [
+                    {
+                        **ProductResponse.model_validate(p).model_dump(mode="json"),
+                        "main_image": images.get(p.id, {}).get("url"),
+                        "main_image_variants": images.get(p.id, {}).get("variants")
+                    }
+                    for p in page.items
+                ],
+                "total": page.total,
+                "has_more": page.has_more
+            }
 
-        query = query.offset(skip).limit(limit)
-        result = await db.execute(query)
-        items = result.scalars().all()
+        return Page(**await product_list_cache.get_or_load(redis, key, load))
 
-        return list(items), total
+    async def get_product_detail_cached(
+        self,
+        db: AsyncSession,
+        redis: Optional[Redis],
+        product_id: int
+    ) -> Optional[Dict[str, Any]]:
+        """获取商品详情（读缓存），不存在返回 None（同样会被缓存）"""
+
+        async def load():
+            detail = await self.get_product_detail(db, product_id)
+            if not detail:
+                return None
+            return {
+                "product": ProductResponse.model_validate(detail["product"]).model_dump(mode="json"),
+                "images": [
+                    ProductImageResponse.model_validate(image).model_dump(mode="json")
+                    for image in detail["images"]
+                ]
+            }
+
+        return await product_detail_cache.get_or_load(redis, str(product_id), load)
+
+    async def invalidate_cache(self, redis: Optional[Redis], product_ids: Iterable[int] = ()):
+        """商品创建/修改/删除后失效缓存：列表整体失效，详情失效指定商品（未指定则整体失效）"""
+        product_search.invalidate()
+        await product_list_cache.invalidate(redis)
+        product_ids = list(product_ids)
+        if product_ids:
+            await product_detail_cache.delete(redis, [str(pid) for pid in product_ids])
+        else:
+            await product_detail_cache.invalidate(redis)
+
+    async def invalidate_stock(
+        self,
+        redis: Optional[Redis],
+        stocks: Mapping[int, int],
+        deltas: Mapping[int, int]
+    ):
+        """
+        库存变化后失效缓存
+
+        详情按商品删除；列表只在商品售罄或恢复有货时整体失效，
+        普通的库存增减在列表中最多延迟 CACHE_TTL 秒。
+
+        Args:
+            stocks: {商品ID: 变化后库存}
+            deltas: {商品ID: 库存变化量}（扣减为负）
+        """
+        if not stocks:
+            return
+        await product_detail_cache.delete(redis, [str(pid) for pid in stocks])
+        if any((stock <= 0) != (stock - deltas.get(pid, 0) <= 0) for pid, stock in stocks.items()):
+            await product_list_cache.invalidate(redis)
 
     async def get_product_detail(self, db: AsyncSession, product_id: int) -> Optional[Dict[str, Any]]:
         """获取商品详情（含图片）"""
@@ -103,6 +247,45 @@ class CRUDProductImage(CRUDBase[ProductImage, dict, dict]):
         """获取商品图片列表"""
         return await self.get_multi(db, product_id=product_id)
 
+    async def create_with_variants(
+        self,
+        db: AsyncSession,
+        product_id: int,
+        image_url: str,
+        sort_order: int = 0
+    ) -> ProductImage:
+        """添加商品图片并记录变体（变体不存在时生成，非本站图片不生成）"""
+        variants = await minio_storage.ensure_variants(image_url)
+        return await self.create(db, obj_in={
+            "product_id": product_id,
+            "image_url": image_url,
+            "variants": json.dumps(variants) if variants else None,
+            "sort_order": sort_order
+        })
+
+    async def backfill_variants(self, db: AsyncSession, batch_size: int = 100) -> int:
+        """为没有变体的商品图片生成变体，返回更新数量"""
+        updated = 0
+        last_id = 0
+        while True:
+            result = await db.execute(
+                select(ProductImage)
+                .where(ProductImage.variants.is_(None), ProductImage.id > last_id)
+                .order_by(ProductImage.id)
+                .limit(batch_size)
+            )
+            images = result.scalars().all()
+            if not images:
+                break
+            last_id = images[-1].id
+            for image in images:
+                variants = await minio_storage.ensure_variants(image.image_url)
+                if variants:
+                    image.variants = json.dumps(variants)
+                    updated += 1
+            await db.commit()
+        return updated
+
 
 # 导出实例
 product = CRUDProduct(Product)
@@ -0,0 +1,266 @@
+"""商品搜索服务
+
+LIKE '%关键词%' 无法使用索引，也不能按相关度排序。这里把商品名称/标签/描述
+切成 n-gram 词项（中文：单字 + 二元组；字母数字：整词），
+
+- PostgreSQL：写入 products.search_vector（tsvector，GIN索引），
+  用 to_tsquery 匹配、ts_rank 排序（名称 A > 标签 B > 描述 C）；
+- 其他数据库/测试：进程内 n-gram 倒排索引，排序规则一致。
+
+查询时中文按二元组（单字关键词按单字）AND 匹配，字母数字按前缀匹配。
+"""
+import re
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import (
+    event, inspect, select, update, values, column, case, false, func, literal_column,
+    Integer, Text, Select
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.models.product import Product
+
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_RUN = re.compile(f"[{_CJK}]+|[a-z0-9]+")
+_CJK_RUN = re.compile(f"[{_CJK}]")
+
+# 字段权重（与 ts_rank 默认权重 {D:0.1, C:0.2, B:0.4, A:1.0} 一致）
+FIELD_WEIGHTS = (("name", "A", 1.0), ("tags", "B", 0.4), ("description", "C", 0.2))
+
+_TS_CONFIG = literal_column("'simple'::regconfig")
+
+
+def _runs(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return _RUN.findall(unicodedata.normalize("NFKC", text).lower())
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """索引词项：中文单字 + 二元组，字母数字整词（去重，保持顺序）"""
+    terms: Dict[str, None] = {}
+    for run in _runs(text):
+        if _CJK_RUN.match(run):
+            terms.update(dict.fromkeys(run))
+            terms.update(dict.fromkeys(run[i:i + 2] for i in range(len(run) - 1)))
+        else:
+            terms[run] = None
+    return list(terms)
+
+
+def query_terms(keyword: Optional[str]) -> List[Tuple[str, bool]]:
+    """查询词项 [(词项, 是否前缀匹配)]"""
+    terms: Dict[Tuple[str, bool], None] = {}
+    for run in _runs(keyword):
+        if _CJK_RUN.match(run):
+            grams = [run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)]
+            terms.update(dict.fromkeys((gram, False) for gram in grams))
+        else:
+            terms[(run, True)] = None
+    return list(terms)
+
+
+def _vector_expr(name, tags, description):
+    """由已切好的词项文本构造带权重的 tsvector 表达式"""
+    vector = None
+    for value, (_, weight, _) in zip((name, tags, description), FIELD_WEIGHTS):
+        part = func.setweight(func.to_tsvector(_TS_CONFIG, func.coalesce(value, "")), literal_column(f"'{weight}'"))
+        vector = part if vector is None else vector.op("||")(part)
+    return vector
+
+
+def _field_terms(product_like) -> Tuple[str, str, str]:
+    return tuple(
+        " ".join(tokenize(getattr(product_like, field)))
+        for field, _, _ in FIELD_WEIGHTS
+    )
+
+
+class NgramIndex:
+    """进程内 n-gram 倒排索引"""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._docs: Dict[int, Set[str]] = {}
+
+    def add(self, doc_id: int, name: Optional[str], tags: Optional[str] = None, description: Optional[str] = None):
+        self.remove(doc_id)
+        terms: Set[str] = set()
+        for text, (_, _, weight) in zip((name, tags, description), FIELD_WEIGHTS):
+            for term in tokenize(text):
+                postings = self._postings.setdefault(term, {})
+                postings[doc_id] = max(postings.get(doc_id, 0.0), weight)
+                terms.add(term)
+        self._docs[doc_id] = terms
+
+    def remove(self, doc_id: int):
+        for term in self._docs.pop(doc_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def clear(self):
+        self._postings.clear()
+        self._docs.clear()
+
+    def _match(self, term: str, prefix: bool) -> Dict[int, float]:
+        if not prefix:
+            return self._postings.get(term, {})
+        matched: Dict[int, float] = {}
+        for indexed, postings in self._postings.items():
+            if indexed.startswith(term):
+                for doc_id, weight in postings.items():
+                    matched[doc_id] = max(matched.get(doc_id, 0.0), weight)
+        return matched
+
+    def search(self, keyword: str) -> List[int]:
+        """返回按相关度排序的文档ID（所有查询词项都需命中）"""
+        terms = query_terms(keyword)
+        if not terms:
+            return []
+
+        scores: Optional[Dict[int, float]] = None
+        for term, prefix in terms:
+            matched = self._match(term, prefix)
+            if scores is None:
+                scores = dict(matched)
+            else:
+                scores = {doc_id: score + matched[doc_id] for doc_id, score in scores.items() if doc_id in matched}
+            if not scores:
+                return []
+
+        return sorted(scores, key=lambda doc_id: (-scores[doc_id], -doc_id))
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+
+class ProductSearchService:
+    """商品搜索服务"""
+
+    def __init__(self):
+        self.index = NgramIndex()
+        self._index_ready = False
+
+    @staticmethod
+    def uses_database(db: AsyncSession) -> bool:
+        """是否走数据库 tsvector 索引（SEARCH_BACKEND=auto 时按数据库类型判断）"""
+        if settings.SEARCH_BACKEND == "memory":
+            return False
+        if settings.SEARCH_BACKEND == "database":
+            return True
+        return db.get_bind().dialect.name == "postgresql"
+
+    async def apply(self, db: AsyncSession, query: Select, keyword: Optional[str]) -> Select:
+        """
+        给商品查询加上关键词匹配和相关度排序
+
+        Args:
+            query: select(Product) 语句（不应已有排序）
+            keyword: 关键词，为空或不含可检索字符时原样返回
+        """
+        terms = query_terms(keyword)
+        if not terms:
+            return query
+
+        if self.uses_database(db):
+            tsquery = func.to_tsquery(
+                _TS_CONFIG, " & ".join(term + (":*" if prefix else "") for term, prefix in terms)
+            )
+            return query.where(Product.search_vector.op("@@")(tsquery)).order_by(
+                func.ts_rank(Product.search_vector, tsquery).desc(),
+                Product.sales_count.desc(),
+                Product.id.desc()
+            )
+
+        await self._ensure_index(db)
+        ranked = self.index.search(keyword)
+        if not ranked:
+            return query.where(false())
+        return query.where(Product.id.in_(ranked)).order_by(
+            case({product_id: rank for rank, product_id in enumerate(ranked)}, value=Product.id)
+        )
+
+    async def _ensure_index(self, db: AsyncSession):
+        """首次使用时从数据库构建内存索引（仅上架商品）"""
+        if self._index_ready:
+            return
+        result = await db.execute(
+            select(Product.id, Product.name, Product.tags, Product.description).where(Product.status == 1)
+        )
+        self.index.clear()
+        for product_id, name, tags, description in result.all():
+            self.index.add(product_id, name, tags, description)
+        self._index_ready = True
+        logger.info(f"商品内存搜索索引已构建: {len(self.index)} 个商品")
+
+    def invalidate(self):
+        """商品变更后重建内存索引（下次搜索时）"""
+        self._index_ready = False
+
+    async def rebuild(self, db: AsyncSession, batch_size: int = 1000) -> int:
+        """
+        重建 products.search_vector（迁移后回填、分词规则调整后使用）
+
+        按ID分批，每批一条 UPDATE ... FROM (VALUES ...)，每批提交一次。
+
+        Returns:
+            更新的商品数
+        """
+        updated = 0
+        last_id = 0
+        while True:
+            result = await db.execute(
+                select(Product.id, Product.name, Product.tags, Product.description)
+                .where(Product.id > last_id)
+                .order_by(Product.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+
+            lines = values(
+                column("id", Integer),
+                column("name", Text),
+                column("tags", Text),
+                column("description", Text),
+                name="terms"
+            ).data([(row.id, *_field_terms(row)) for row in rows])
+            await db.execute(
+                update(Product)
+                .where(Product.id == lines.c.id)
+                .values(search_vector=_vector_expr(lines.c.name, lines.c.tags, lines.c.description))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+            updated += len(rows)
+            last_id = rows[-1].id
+        return updated
+
+
+def _set_search_vector(mapper, connection, target: Product):
+    """插入商品时写入 search_vector"""
+    if connection.dialect.name == "postgresql":
+        target.search_vector = _vector_expr(*_field_terms(target))
+
+
+def _update_search_vector(mapper, connection, target: Product):
+    """名称、标签、描述变化时重写 search_vector"""
+    attrs = inspect(target).attrs
+    if any(attrs[field].history.has_changes() for field, _, _ in FIELD_WEIGHTS):
+        _set_search_vector(mapper, connection, target)
+
+
+event.listen(Product, "before_insert", _set_search_vector)
+event.listen(Product, "before_update", _update_search_vector)
+
+
+# 导出实例
+product_search = ProductSearchService()
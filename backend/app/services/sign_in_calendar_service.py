@@ -0,0 +1,295 @@
+"""签到日历服务（Redis 位图）
+
+签到状态按用户按月存为位图：sign:calendar:{user_id}:{yyyyMM}（用户ID为 hash tag，
+同一用户的各月在同一个槽），第 d 天对应偏移 d-1，偏移 31 为"已从签到记录加载"标记。
+整月位图用 BITFIELD GET u32 0 读出（32 位整数，最高位为 1 号），一次脚本调用读取多个月；
+"今天是否签到"、月历、当月签到次数和连续签到天数都按位计算，不访问数据库。
+
+sign_in_records 仍是签到的持久化存储：签到先写表、提交后再 SETBIT（写穿）；
+key 不存在或没有加载标记时从表中加载当月签到日期并回填（只置位，不会覆盖并发签到）。
+Redis 不可用时直接按表计算；scripts/rebuild-sign-in-calendar.py 按表重建位图。
+"""
+import calendar
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.redis import pipeline
+from app.models.user import SignInRecord
+
+KEY_PREFIX = "sign:calendar:"
+LOADED_OFFSET = 31
+# 连续签到跨月时每次往前读取的月数
+STREAK_PREFETCH_MONTHS = 6
+
+# KEYS: 各月位图key  返回: 各月的 BITFIELD u32 值（key 不存在为 0）
+READ_SCRIPT = """
+local values = {}
+for i, key in ipairs(KEYS) do
+    values[i] = redis.call('BITFIELD', key, 'GET', 'u32', 0)[1]
+end
+return values
+"""
+
+# KEYS: [位图key]  ARGV: [过期秒数, 已签到日期的偏移...]
+# 只置位不清零，加载标记最后写入
+FILL_SCRIPT = """
+for i = 2, #ARGV do
+    redis.call('SETBIT', KEYS[1], ARGV[i], 1)
+end
+redis.call('SETBIT', KEYS[1], 31, 1)
+return redis.call('EXPIRE', KEYS[1], ARGV[1])
+"""
+
+# KEYS: [位图key]  ARGV: [偏移, 过期秒数]
+MARK_SCRIPT = """
+redis.call('SETBIT', KEYS[1], ARGV[1], 1)
+return redis.call('EXPIRE', KEYS[1], ARGV[2])
+"""
+
+Month = Tuple[int, int]
+
+
+def prev_month(year: int, month: int) -> Month:
+    return (year - 1, 12) if month == 1 else (year, month - 1)
+
+
+class SignInCalendar:
+    """签到日历（每个进程共用一个实例）"""
+
+    def key(self, user_id: int, year: int, month: int) -> str:
+        return f"{KEY_PREFIX}{{{user_id}}}:{year}{month:02d}"
+
+    @staticmethod
+    def to_bits(days: Iterable[int]) -> int:
+        """签到日期 -> BITFIELD u32 值（含加载标记）"""
+        value = 1
+        for day in days:
+            value |= 1 << (32 - day)
+        return value
+
+    @staticmethod
+    def to_days(value: int) -> List[int]:
+        """BITFIELD u32 值 -> 签到日期列表"""
+        return [day for day in range(1, 32) if value >> (32 - day) & 1]
+
+    @staticmethod
+    def is_set(value: int, day: int) -> bool:
+        return bool(value >> (32 - day) & 1)
+
+    async def load_from_db(self, db: AsyncSession, user_id: int, months: Sequence[Month]) -> Dict[Month, int]:
+        """从签到记录读取多个月的签到日期（一次查询）"""
+        first, last = min(months), max(months)
+        rows = (await db.execute(
+            select(SignInRecord.sign_date).where(
+                SignInRecord.user_id == user_id,
+                SignInRecord.sign_date.between(f"{first[0]}-{first[1]:02d}-01", f"{last[0]}-{last[1]:02d}-31")
+            )
+        )).scalars().all()
+
+        days: Dict[Month, List[int]] = {month: [] for month in months}
+        for sign_date in rows:
+            month = (int(sign_date[:4]), int(sign_date[5:7]))
+            if month in days:
+                days[month].append(int(sign_date[8:10]))
+        return {month: self.to_bits(values) for month, values in days.items()}
+
+    async def get_months(
+        self,
+        redis: Optional[Redis],
+        db: AsyncSession,
+        user_id: int,
+        months: Sequence[Month]
+    ) -> Dict[Month, int]:
+        """
+        读取多个月的位图（一次往返），未加载的月份从签到记录加载并回填
+
+        Returns:
+            {(年, 月): BITFIELD u32 值}
+        """
+        values: Dict[Month, int] = {}
+        if redis is not None:
+            try:
+                keys = [self.key(user_id, year, month) for year, month in months]
+                results = await redis.eval(READ_SCRIPT, len(keys), *keys)
+                values = dict(zip(months, results))
+            except RedisError as e:
+                logger.warning(f"签到日历读取失败 user={user_id}: {e}")
+                redis = None
+
+        missing = [month for month in months if not values.get(month, 0) & 1]
+        if missing:
+            loaded = await self.load_from_db(db, user_id, missing)
+            values.update(loaded)
+            if redis is not None:
+                await self._fill(redis, user_id, loaded)
+        return values
+
+    async def _fill(self, redis: Redis, user_id: int, values: Dict[Month, int]):
+        """回填位图（只置位，不会覆盖并发签到）"""
+        try:
+            async with pipeline(redis) as pipe:
+                for (year, month), value in values.items():
+                    offsets = [day - 1 for day in self.to_days(value)]
+                    key = self.key(user_id, year, month)
+                    pipe.eval(FILL_SCRIPT, 1, key, settings.SIGN_IN_CALENDAR_TTL, *offsets)
+        except RedisError as e:
+            logger.warning(f"签到日历回填失败 user={user_id}: {e}")
+
+    async def mark(self, redis: Optional[Redis], user_id: int, sign_date: str):
+        """签到记录提交后置位（写穿）"""
+        if redis is None:
+            return
+        year, month, day = int(sign_date[:4]), int(sign_date[5:7]), int(sign_date[8:10])
+        key = self.key(user_id, year, month)
+        try:
+            await redis.eval(MARK_SCRIPT, 1, key, day - 1, settings.SIGN_IN_CALENDAR_TTL)
+        except RedisError as e:
+            # 位图可能缺少本次签到，删除后由下次读取从签到记录重新加载
+            logger.warning(f"签到日历更新失败 user={user_id}: {e}")
+            try:
+                await redis.delete(key)
+            except RedisError:
+                logger.warning(f"签到日历删除失败 user={user_id}: {key}")
+
+    async def is_signed(self, redis: Optional[Redis], db: AsyncSession, user_id: int, day: date) -> bool:
+        """指定日期是否已签到"""
+        values = await self.get_months(redis, db, user_id, [(day.year, day.month)])
+        return self.is_set(values[(day.year, day.month)], day.day)
+
+    async def streak(
+        self,
+        redis: Optional[Redis],
+        db: AsyncSession,
+        user_id: int,
+        today: date,
+        values: Optional[Dict[Month, int]] = None
+    ) -> int:
+        """
+        连续签到天数（截至今天，今天未签到时截至昨天；都未签到为 0）
+
+        从今天所在的月往前按位数连续的 1，跨月时再读取更早的月份。
+
+        Args:
+            values: 已读取的位图，缺少的月份再从Redis读取
+        """
+        values = dict(values or {})
+        year, month, day = today.year, today.month, today.day
+        wanted = [(year, month), prev_month(year, month)]
+        if any(m not in values for m in wanted):
+            values.update(await self.get_months(redis, db, user_id, [m for m in wanted if m not in values]))
+
+        if not self.is_set(values[(year, month)], day):
+            day -= 1
+
+        streak = 0
+        while True:
+            if day:
+                # 1 号到 day 号的位，最低位为 day 号；末尾连续的 1 即连续签到天数
+                bits = values[(year, month)] >> (32 - day)
+                run = (~bits & (bits + 1)).bit_length() - 1
+                streak += run
+                if run < day:
+                    return streak
+            year, month = prev_month(year, month)
+            day = calendar.monthrange(year, month)[1]
+            if (year, month) not in values:
+                months = [(year, month)]
+                while len(months) < STREAK_PREFETCH_MONTHS:
+                    months.append(prev_month(*months[-1]))
+                values.update(await self.get_months(redis, db, user_id, months))
+
+    async def month_calendar(
+        self,
+        redis: Optional[Redis],
+        db: AsyncSession,
+        user_id: int,
+        year: int,
+        month: int,
+        today: date
+    ) -> dict:
+        """月历：当月签到日期、签到次数、今天是否签到、连续签到天数（通常一次往返）"""
+        months = [(year, month)]
+        for m in ((today.year, today.month), prev_month(today.year, today.month)):
+            if m not in months:
+                months.append(m)
+        values = await self.get_months(redis, db, user_id, months)
+
+        days = self.to_days(values[(year, month)])
+        return {
+            "year": year,
+            "month": month,
+            "days": days,
+            "sign_count": len(days),
+            "signed_today": self.is_set(values[(today.year, today.month)], today.day),
+            "consecutive_days": await self.streak(redis, db, user_id, today, values)
+        }
+
+    async def rebuild(self, redis: Redis, db: AsyncSession, months: Sequence[Month], batch_size: int = 1000) -> int:
+        """
+        按签到记录重建指定月份的位图（覆盖写入，每个 key 在 MULTI 中重建）
+
+        Returns:
+            处理的用户数
+        """
+        first, last = min(months), max(months)
+        start = f"{first[0]}-{first[1]:02d}-01"
+        end = f"{last[0]}-{last[1]:02d}-31"
+        processed = 0
+        last_user_id = 0
+        while True:
+            user_ids = (await db.execute(
+                select(SignInRecord.user_id)
+                .where(SignInRecord.user_id > last_user_id, SignInRecord.sign_date.between(start, end))
+                .group_by(SignInRecord.user_id)
+                .order_by(SignInRecord.user_id)
+                .limit(batch_size)
+            )).scalars().all()
+            if not user_ids:
+                return processed
+
+            rows = (await db.execute(
+                select(SignInRecord.user_id, SignInRecord.sign_date)
+                .where(SignInRecord.user_id.in_(user_ids), SignInRecord.sign_date.between(start, end))
+            )).all()
+            days: Dict[Tuple[int, Month], List[int]] = {(u, m): [] for u in user_ids for m in months}
+            for user_id, sign_date in rows:
+                key = (user_id, (int(sign_date[:4]), int(sign_date[5:7])))
+                if key in days:
+                    days[key].append(int(sign_date[8:10]))
+
+            async with pipeline(redis, transaction=True) as pipe:
+                for (user_id, (year, month)), values in days.items():
+                    key = self.key(user_id, year, month)
+                    pipe.delete(key)
+                    for day in values:
+                        pipe.setbit(key, day - 1, 1)
+                    pipe.setbit(key, LOADED_OFFSET, 1)
+                    pipe.expire(key, settings.SIGN_IN_CALENDAR_TTL)
+            await db.rollback()
+
+            processed += len(user_ids)
+            last_user_id = user_ids[-1]
+
+    async def clear(self, redis: Redis, batch_size: int = 1000) -> int:
+        """删除全部签到位图（之后按需从签到记录重新加载），返回删除的 key 数"""
+        deleted = 0
+        batch: List[str] = []
+        async for key in redis.scan_iter(match=f"{KEY_PREFIX}*", count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                deleted += await redis.delete(*batch)
+                batch.clear()
+        if batch:
+            deleted += await redis.delete(*batch)
+        return deleted
+
+
+# 导出实例
+sign_in_calendar = SignInCalendar()
@@ -6,6 +6,7 @@ from sqlalchemy import select
 
 from app.models.user import User, UserAddress, SignInRecord, PointsRecord
 from app.core.crud import CRUDBase
+from app.services.points_service import points_summary
 from app.schemas.user import UserCreate, UserUpdate, AddressCreate, AddressUpdate
 
 
@@ -22,12 +23,12 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         change_type: int,
         source_type: int,
         description: str,
-        source_id: Optional[int] = None
+        source_id: Optional[int] = None,
+        commit: bool = True
     ) -> User:
-        """更新用户积分"""
+        """更新用户积分（积分与积分记录同一事务，commit=False 时随调用方事务提交）"""
         user.total_points += points
         db.add(user)
-        await db.commit()
 
         # 记录积分变化
         points_record = PointsRecord(
@@ -39,7 +40,9 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             description=description
         )
         db.add(points_record)
-        await db.commit()
+        await points_summary.add_points(db, user.id, change_type, points)
+        if commit:
+            await db.commit()
 
         return user
 
@@ -0,0 +1 @@
+"""后台任务（随应用 lifespan 启动，或 python -m app.tasks.<任务> 独立运行）"""
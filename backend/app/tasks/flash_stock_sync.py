@@ -0,0 +1,42 @@
+"""
+热点商品库存回写任务
+
+周期性把Redis中已扣减的库存（delta）写回 products.stock。
+
+独立运行: python -m app.tasks.flash_stock_sync
+"""
+import asyncio
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.logger import logger
+from app.core.redis import get_redis_client
+from app.services.flash_stock_service import flash_stock
+
+
+async def sync_once(redis) -> dict:
+    """执行一次回写"""
+    async with AsyncSessionLocal() as db:
+        return await flash_stock.sync(redis, db)
+
+
+async def run(interval: int = None):
+    """按固定间隔循环回写，直到任务被取消"""
+    interval = interval or settings.FLASH_STOCK_SYNC_INTERVAL
+    redis = get_redis_client()
+    try:
+        while True:
+            try:
+                deltas = await sync_once(redis)
+                if deltas:
+                    logger.info(f"热点库存回写: {deltas}")
+            except Exception as e:
+                logger.error(f"热点库存回写失败: {str(e)}")
+            await asyncio.sleep(interval)
+    finally:
+        # 退出前最后回写一次
+        await sync_once(redis)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
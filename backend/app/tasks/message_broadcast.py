@@ -0,0 +1,77 @@
+"""
+站内消息群发任务
+
+由管理端接口以后台任务方式启动，进度写入Redis哈希 msg:broadcast:{job_id}：
+status（pending/running/done/failed）、total、sent、error、started_at、finished_at。
+"""
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from app.core.database import AsyncSessionLocal
+from app.core.logger import logger
+from app.core.redis import get_redis_client
+from app.schemas.message import InternalMessageBroadcast
+from app.services.message_service import message_service
+
+KEY_PREFIX = "msg:broadcast:"
+PROGRESS_TTL = 24 * 3600
+
+
+def progress_key(job_id: str) -> str:
+    return f"{KEY_PREFIX}{job_id}"
+
+
+async def create_job(redis) -> str:
+    """登记群发任务，返回任务ID"""
+    job_id = uuid.uuid4().hex
+    await redis.hset(progress_key(job_id), mapping={"status": "pending", "sent": 0})
+    await redis.expire(progress_key(job_id), PROGRESS_TTL)
+    return job_id
+
+
+async def get_progress(redis, job_id: str) -> Optional[dict]:
+    """查询群发进度，任务不存在或已过期返回 None"""
+    progress = await redis.hgetall(progress_key(job_id))
+    if not progress:
+        return None
+    for field in ("total", "sent"):
+        if field in progress:
+            progress[field] = int(progress[field])
+    return progress
+
+
+async def run(job_id: str, request: InternalMessageBroadcast):
+    """执行群发（独立的数据库会话，使用共享Redis客户端，不依赖请求生命周期）"""
+    key = progress_key(job_id)
+    redis = get_redis_client()
+    async with AsyncSessionLocal() as db:
+        total = await message_service.count_recipients(db, request.user_ids)
+        await redis.hset(key, mapping={
+            "status": "running", "total": total, "started_at": datetime.utcnow().isoformat()
+        })
+
+        async def on_progress(sent: int):
+            await redis.hset(key, "sent", sent)
+
+        try:
+            sent = await message_service.broadcast_internal_message(
+                db,
+                request.title,
+                request.content,
+                request.message_type,
+                user_ids=request.user_ids,
+                scene_type=request.scene_type,
+                scene_id=request.scene_id,
+                redis=redis,
+                on_progress=on_progress
+            )
+        except Exception as e:
+            logger.error(f"站内消息群发失败 {job_id}: {str(e)}")
+            await redis.hset(key, mapping={
+                "status": "failed", "error": str(e), "finished_at": datetime.utcnow().isoformat()
+            })
+            return
+
+    await redis.hset(key, mapping={"status": "done", "finished_at": datetime.utcnow().isoformat()})
+    logger.info(f"站内消息群发完成 {job_id}: {sent} 条")
@@ -0,0 +1,81 @@
+"""
+消息发送 worker
+
+循环领取待发送的模板消息/短信，用信号量限制并发调用第三方接口，整批写回结果。
+可多进程/多实例同时运行（SKIP LOCKED 领取，不会重复发送）。
+
+独立运行: python -m app.tasks.notification_worker
+"""
+import asyncio
+from typing import Optional
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.logger import logger
+from app.services.notification_service import (
+    NotificationJob, NotificationSender, NotificationSendError, SendResult, get_sender, notification_queue
+)
+
+
+class NotificationWorkerPool:
+    """发送 worker 池"""
+
+    def __init__(
+        self,
+        sender: NotificationSender,
+        concurrency: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        session_factory=AsyncSessionLocal
+    ):
+        self.sender = sender
+        self.batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+        self.session_factory = session_factory
+        self._semaphore = asyncio.Semaphore(concurrency or settings.NOTIFICATION_CONCURRENCY)
+
+    async def _send(self, job: NotificationJob) -> SendResult:
+        async with self._semaphore:
+            try:
+                await self.sender.send(job)
+                return SendResult(job)
+            except NotificationSendError as e:
+                return SendResult(job, str(e))
+            except Exception as e:
+                logger.error(f"消息发送异常 {job.kind} #{job.id}: {str(e)}")
+                return SendResult(job, f"{type(e).__name__}: {e}")
+
+    async def run_once(self) -> int:
+        """领取并处理一批任务，返回处理数量"""
+        async with self.session_factory() as db:
+            jobs = await notification_queue.claim(db, self.batch_size)
+        if not jobs:
+            return 0
+
+        results = await asyncio.gather(*(self._send(job) for job in jobs))
+        async with self.session_factory() as db:
+            await notification_queue.complete(db, results)
+
+        failed = sum(1 for r in results if r.error is not None)
+        if failed:
+            logger.warning(f"消息发送: {len(jobs)} 条，失败 {failed} 条（将重试）")
+        return len(jobs)
+
+    async def run(self, poll_interval: Optional[float] = None):
+        """持续处理，队列为空时按间隔轮询，直到任务被取消"""
+        poll_interval = poll_interval or settings.NOTIFICATION_POLL_INTERVAL
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                logger.error(f"消息发送 worker 异常: {str(e)}")
+                processed = 0
+            if not processed:
+                await asyncio.sleep(poll_interval)
+
+
+async def run():
+    """按配置启动 worker 池"""
+    await NotificationWorkerPool(get_sender()).run()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+"""
+超时未支付订单自动取消任务
+
+周期性取消下单超过 ORDER_PAYMENT_TTL 仍未支付的订单并归还库存，每批一个事务。
+可多副本同时运行（FOR UPDATE SKIP LOCKED 领取，同一订单只会被一个副本取消）。
+
+独立运行: python -m app.tasks.order_expiry
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.logger import logger
+from app.core.redis import get_redis_client
+from app.services.order_service import order as order_service
+
+# 运行指标（按进程统计，/metrics 使用）
+_stats = {
+    "runs": 0,
+    "expired_total": 0,
+    "last_expired": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "errors": 0,
+}
+
+
+def expiry_stats() -> dict:
+    """自动取消任务运行情况"""
+    return dict(_stats)
+
+
+async def expire_once(
+    redis=None,
+    ttl: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    session_factory=AsyncSessionLocal
+) -> int:
+    """取消所有已超时的待支付订单（分批提交），返回取消数量"""
+    ttl = ttl if ttl is not None else settings.ORDER_PAYMENT_TTL
+    batch_size = batch_size or settings.ORDER_EXPIRY_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+
+    started = datetime.utcnow()
+    expired = 0
+    while True:
+        async with session_factory() as db:
+            order_ids = await order_service.expire_unpaid(db, redis, cutoff, batch_size)
+        expired += len(order_ids)
+        if len(order_ids) < batch_size:
+            break
+
+    _stats["runs"] += 1
+    _stats["expired_total"] += expired
+    _stats["last_expired"] = expired
+    _stats["last_run_at"] = started.isoformat()
+    _stats["last_duration_ms"] = round((datetime.utcnow() - started).total_seconds() * 1000, 1)
+    return expired
+
+
+async def run(interval: Optional[int] = None):
+    """按固定间隔循环执行，直到任务被取消"""
+    interval = interval or settings.ORDER_EXPIRY_INTERVAL
+    redis = get_redis_client()
+    while True:
+        try:
+            expired = await expire_once(redis)
+            if expired:
+                logger.info(f"自动取消超时未支付订单: {expired} 个")
+        except Exception as e:
+            _stats["errors"] += 1
+            logger.error(f"自动取消超时订单失败: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,38 @@
+"""
+站内消息未读计数对账任务
+
+周期性把 Redis 中的未读计数器与数据库 COUNT 对齐，修正并发窗口等原因造成的偏差。
+
+独立运行: python -m app.tasks.unread_reconcile
+"""
+import asyncio
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.logger import logger
+from app.core.redis import get_redis_client
+from app.services.message_service import unread_counter
+
+
+async def reconcile_once(redis) -> int:
+    """执行一次对账，返回修正的计数器数量"""
+    async with AsyncSessionLocal() as db:
+        return await unread_counter.reconcile(redis, db)
+
+
+async def run(interval: int = None):
+    """按固定间隔循环对账，直到任务被取消"""
+    interval = interval or settings.MESSAGE_UNREAD_RECONCILE_INTERVAL
+    redis = get_redis_client()
+    while True:
+        try:
+            corrected = await reconcile_once(redis)
+            if corrected:
+                logger.info(f"未读计数对账: 修正 {corrected} 个用户")
+        except Exception as e:
+            logger.error(f"未读计数对账失败: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
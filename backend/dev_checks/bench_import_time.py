@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+main.py 导入耗时压测
+
+在新的子进程中 `import main`（与 uvicorn 新 worker 启动时相同），用 -X importtime 统计各模块累计耗时，
+并拦截 socket.connect，校验导入阶段不发起任何网络连接（MinIO/Redis/数据库都应在首次使用或 lifespan 中连接）。
+不需要 MinIO、Redis、PostgreSQL 服务。
+
+用法: python dev_checks/bench_import_time.py [次数]
+"""
+import sys
+import os
+import json
+import time
+import statistics
+import subprocess
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+TOP = 10
+
+PROBE = """
+import json, socket, sys
+connects = []
+_connect = socket.socket.connect
+def connect(self, address):
+    connects.append(repr(address))
+    return _connect(self, address)
+socket.socket.connect = connect
+import main
+sys.stdout.write(json.dumps({"routes": len(main.app.routes), "connects": connects}))
+"""
+
+
+def import_once():
+    """返回 (墙钟耗时ms, main 累计导入耗时ms, 各模块累计耗时, 探针结果)"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=backend_dir, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr[-3000:])
+        raise SystemExit(f"import main 失败（返回码 {proc.returncode}）")
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative) / 1000
+    return wall_ms, modules["main"], modules, json.loads(proc.stdout)
+
+
+def main(runs: int):
+    results = [import_once() for _ in range(runs)]
+    probe = results[-1][3]
+    assert not probe["connects"], f"导入阶段发起了网络连接: {probe['connects']}"
+
+    walls = [r[0] for r in results]
+    imports = [r[1] for r in results]
+    modules = results[-1][2]
+    top = sorted(
+        ((name, ms) for name, ms in modules.items() if name.startswith("app.")),
+        key=lambda item: item[1], reverse=True
+    )[:TOP]
+
+    print(f"runs: {runs}, routes: {probe['routes']}, connects during import: 0")
+    print(f"process wall time: median {statistics.median(walls):.0f} ms (min {min(walls):.0f})")
+    print(f"import main:       median {statistics.median(imports):.0f} ms (min {min(imports):.0f})")
+    print(f"slowest app modules (cumulative, last run):")
+    for name, ms in top:
+        print(f"  {name:<45}{ms:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+库存并发扣减压测：大量协程同时抢购同一个热点商品
+
+校验：成功下单数 == 初始库存，最终库存 == 0（零超卖），并输出每秒订单数。
+需要可用的 PostgreSQL（读取 DATABASE_URL）。
+
+用法: python dev_checks/bench_inventory_concurrency.py [库存] [协程数]
+"""
+import sys
+import os
+import time
+import asyncio
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models import Merchant, Product
+from app.services.inventory_service import inventory, InsufficientStockError
+
+
+async def main(stock: int, workers: int):
+    engine = create_async_engine(
+        settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
+        pool_size=min(workers, 50),
+        max_overflow=0
+    )
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    # 准备热点商品
+    async with Session() as db:
+        merchant = Merchant(name="bench", contact_phone="00000000000")
+        db.add(merchant)
+        await db.flush()
+        product = Product(
+            merchant_id=merchant.id, name="bench-hot-sku",
+            original_price=1, price=1, stock=stock
+        )
+        db.add(product)
+        await db.commit()
+        merchant_id, product_id = merchant.id, product.id
+
+    succeeded = 0
+    rejected = 0
+
+    async def buyer():
+        nonlocal succeeded, rejected
+        while True:
+            async with Session() as db:
+                try:
+                    await inventory.reserve(db, {product_id: 1})
+                    await db.commit()
+                    succeeded += 1
+                except InsufficientStockError:
+                    rejected += 1
+                    return
+
+    started = time.perf_counter()
+    await asyncio.gather(*(buyer() for _ in range(workers)))
+    elapsed = time.perf_counter() - started
+
+    async with Session() as db:
+        final_stock = (await db.get(Product, product_id)).stock
+        await db.execute(delete(Merchant).where(Merchant.id == merchant_id))
+        await db.commit()
+    await engine.dispose()
+
+    print(f"initial stock : {stock}")
+    print(f"workers       : {workers}")
+    print(f"succeeded     : {succeeded}")
+    print(f"rejected      : {rejected}")
+    print(f"final stock   : {final_stock}")
+    print(f"orders/sec    : {succeeded / elapsed:.0f}")
+
+    assert succeeded == stock, "成功数与初始库存不一致"
+    assert final_stock == 0, "出现超卖或少卖"
+    print("OK: zero oversell")
+
+
+if __name__ == "__main__":
+    stock = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    asyncio.run(main(stock, workers))
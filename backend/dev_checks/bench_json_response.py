@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+响应序列化微基准：100 个商品的列表页、20 个含明细的订单列表页、1 个订单详情
+
+对每个响应体对比 FastAPI 的两条序列化路径（调用路由实际使用的 serialize_response + 响应类）：
+- legacy: 无 response_model，jsonable_encoder 递归遍历 + 标准库 json（改造前）
+- typed:  类型化 response_model 由 pydantic-core 校验/序列化 + orjson
+并校验两条路径输出的 JSON 完全一致（接口格式不变）。不需要数据库和 Redis。
+
+用法: python dev_checks/bench_json_response.py [次数]
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+from datetime import datetime, timedelta
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.core.response import success_response, page_data, ORJSONResponse
+from app.core.crud import Page
+from app.models import Product, Order, OrderItem, OrderLog
+from app.schemas.product import ProductResponse
+from app.api.v1.endpoints import products, orders
+
+NOW = datetime(2026, 10, 1, 8, 30, 15, 123456)
+
+
+def product_page(count: int = 100) -> Page:
+    """与 search_products_cached 缓存中的结构相同"""
+    items = []
+    for i in range(1, count + 1):
+        p = Product(
+            id=i, merchant_id=1, category_id=i % 8 + 1, name=f"本地有机蔬菜 {i} 号", description="产地直发，当日采摘" * 3,
+            original_price=12.8, price=9.9, stock=100 + i, unit="500g", is_recommended=i % 3 == 0,
+            is_hot=i % 5 == 0, is_group_buy=i % 7 == 0, group_buy_price=8.8 if i % 7 == 0 else None,
+            group_buy_min_count=3 if i % 7 == 0 else None, tags='["有机","当季"]', sales_count=i * 13,
+            status=1, created_at=NOW - timedelta(days=i), updated_at=NOW
+        )
+        base = f"http://localhost:9000/lingxian/images/p{i}"
+        items.append({
+            **ProductResponse.model_validate(p).model_dump(mode="json"),
+            "main_image": f"{base}.jpg",
+            "main_image_variants": {
+                name: {"jpeg": f"{base}/{name}.jpg", "webp": f"{base}/{name}.webp"}
+                for name in ("thumb", "medium", "large")
+            }
+        })
+    return Page(items=items, total=1000, has_more=True)
+
+
+def make_orders(count: int = 20):
+    """订单 ORM 对象（已加载明细和日志）"""
+    result = []
+    for i in range(1, count + 1):
+        o = Order(
+            id=i, order_no=f"20261001083015{i:03d}0001000", user_id=1, total_amount=59.4, discount_amount=0,
+            delivery_fee=5, final_amount=64.4, status=["pending", "paid", "delivering", "completed"][i % 4],
+            delivery_type=1, delivery_address="浙江省杭州市西湖区文三路 100 号", pickup_point_id=None,
+            delivery_time_slot="09:00-11:00", remark=None, cancelled_at=None, cancel_reason=None,
+            completed_at=None, created_at=NOW - timedelta(hours=i), updated_at=NOW
+        )
+        o.items = [
+            OrderItem(id=i * 10 + j, order_id=i, product_id=j, product_name=f"本地有机蔬菜 {j} 号",
+                      product_image=f"http://localhost:9000/lingxian/images/p{j}.jpg", price=9.9,
+                      quantity=j, subtotal=9.9 * j, created_at=NOW, updated_at=NOW)
+            for j in range(1, 4)
+        ]
+        o.logs = [
+            OrderLog(id=i * 10 + j, order_id=i, status=status, operator="系统", remark="订单创建",
+                     created_at=NOW, updated_at=NOW)
+            for j, status in enumerate(["pending", "paid"], 1)
+        ]
+        result.append(o)
+    return result
+
+
+def route(router, path: str) -> APIRoute:
+    return next(r for r in router.routes if r.path == path and "GET" in r.methods)
+
+
+async def render(field, content, response_class, exclude_unset: bool) -> bytes:
+    body = await serialize_response(field=field, response_content=content, exclude_unset=exclude_unset)
+    return response_class(body).body
+
+
+async def bench(name: str, api_route: APIRoute, make_content, rounds: int):
+    exclude_unset = api_route.response_model_exclude_unset
+    legacy = await render(None, make_content(), JSONResponse, False)
+    typed = await render(api_route.response_field, make_content(), ORJSONResponse, exclude_unset)
+    assert json.loads(legacy) == json.loads(typed), f"{name}: 输出不一致"
+
+    results = {}
+    for mode, field, response_class in (("legacy", None, JSONResponse),
+                                        ("typed", api_route.response_field, ORJSONResponse)):
+        content = make_content()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await render(field, content, response_class, exclude_unset and field is not None)
+        results[mode] = (time.perf_counter() - started) * 1000 / rounds
+    print(f"{name:<26}{len(typed) / 1024:>8.1f}{results['legacy']:>10.3f}{results['typed']:>10.3f}"
+          f"{results['legacy'] / results['typed']:>8.1f}x")
+
+
+async def main(rounds: int):
+    page = product_page()
+    order_objs = make_orders()
+
+    def product_list():
+        return success_response(data=page_data(page, page_no=1, size=100))
+
+    def order_list():
+        items = [orders._serialize_order_with_display(o, True) for o in order_objs]
+        return success_response(data=page_data(Page(order_objs, 200, True), page_no=1, size=20, items=items))
+
+    def order_detail():
+        o = order_objs[0]
+        return success_response(data={
+            "order": orders._serialize_order_with_display(o),
+            "items": orders._serialize_order_items(o.items),
+            "logs": orders._serialize_order_logs(o.logs)
+        })
+
+    print(f"rounds: {rounds}, ms per response (serialize + render)")
+    print(f"{'response':<26}{'KB':>8}{'legacy':>10}{'typed':>10}{'speedup':>9}")
+    await bench("products list (100)", route(products.router, "/"), product_list, rounds)
+    await bench("orders list (20 + items)", route(orders.router, "/"), order_list, rounds)
+    await bench("order detail", route(orders.router, "/{order_id}"), order_detail, rounds)
+    print("legacy / typed JSON identical: OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+游标分页 vs OFFSET 分页压测
+
+向 message_logs 灌入 N 行数据，分别测量第 1 页和第 10000 页的取数耗时：
+OFFSET 分页（含 count(*) OVER () 总数）随页码线性变慢，游标分页保持常数时间。
+需要可用的 PostgreSQL（读取 DATABASE_URL）。
+
+用法: python dev_checks/bench_keyset_pagination.py [行数] [每页数量] [深页页码]
+"""
+import sys
+import os
+import time
+import asyncio
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import select, delete, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.core.crud import encode_cursor
+from app.models import User
+from app.models.message import MessageLog
+from app.services.message_service import message_log
+
+ROUNDS = 20
+
+
+async def timed(fn) -> float:
+    """执行 ROUNDS 次，返回单次平均耗时（毫秒）"""
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await fn()
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+
+async def main(rows: int, size: int, deep_page: int):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with Session() as db:
+        user = User(openid="bench-keyset", nickname="bench")
+        db.add(user)
+        await db.flush()
+        user_id = user.id
+
+        # 一条 INSERT ... SELECT 灌数据，created_at 逐行递增
+        await db.execute(
+            text("""
+                INSERT INTO message_logs (user_id, message_type, content, send_status, created_at, updated_at)
+                SELECT :user_id, 3, 'bench', 1,
+                       now() - make_interval(secs => g), now() - make_interval(secs => g)
+                FROM generate_series(1, :rows) AS g
+            """),
+            {"user_id": user_id, "rows": rows}
+        )
+        await db.commit()
+        await db.execute(text("ANALYZE message_logs"))
+
+    try:
+        async with Session() as db:
+            # 深页起点：第 deep_page 页之前最后一行
+            skip = (deep_page - 1) * size
+            anchor = (await db.execute(
+                select(MessageLog.created_at, MessageLog.id)
+                .where(MessageLog.user_id == user_id)
+                .order_by(MessageLog.created_at.desc(), MessageLog.id.desc())
+                .offset(skip - 1).limit(1)
+            )).one()
+            deep_cursor = encode_cursor(*anchor)
+
+            async def offset_page(skip):
+                return await message_log.get_logs(db, user_id=user_id, skip=skip, limit=size)
+
+            async def cursor_page(cursor):
+                return await message_log.get_logs_cursor(db, user_id=user_id, cursor=cursor, limit=size)
+
+            # 两种方式取到的深页内容必须一致
+            by_offset = await offset_page(skip)
+            by_cursor = await cursor_page(deep_cursor)
+            assert [m.id for m in by_offset.items] == [m.id for m in by_cursor.items], "深页结果不一致"
+
+            results = {
+                ("offset", 1): await timed(lambda: offset_page(0)),
+                ("offset", deep_page): await timed(lambda: offset_page(skip)),
+                ("cursor", 1): await timed(lambda: cursor_page("")),
+                ("cursor", deep_page): await timed(lambda: cursor_page(deep_cursor)),
+            }
+    finally:
+        async with Session() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+    print(f"rows: {rows}, size: {size}, rounds: {ROUNDS}")
+    for (mode, page), ms in results.items():
+        print(f"{mode:<7} page {page:<6}: {ms:8.2f} ms")
+
+    ratio = results[("cursor", deep_page)] / results[("cursor", 1)]
+    print(f"cursor deep/first ratio: {ratio:.2f}")
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    deep_page = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else deep_page * size + size
+    asyncio.run(main(rows, size, deep_page))
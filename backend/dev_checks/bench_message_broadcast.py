@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+站内消息群发压测
+
+灌入 N 个用户，对比三种写入方式的吞吐（行/秒）：
+- 逐条 send_internal_message（每条 INSERT + COMMIT + refresh，抽样 2000 条）
+- 分批多行 INSERT（每批提交一次）
+- broadcast_internal_message（分批 COPY，每批提交一次）
+需要可用的 PostgreSQL（读取 DATABASE_URL）。
+
+用法: python dev_checks/bench_message_broadcast.py [接收人数] [每批数量]
+"""
+import sys
+import os
+import time
+import asyncio
+from datetime import datetime
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import select, delete, insert, func, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models import User
+from app.models.message import InternalMessage
+from app.services.message_service import message_service
+
+TAG = "bench-broadcast"
+SAMPLE = 2000
+
+
+async def main(recipients: int, chunk_size: int):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with Session() as db:
+        await db.execute(
+            text("""
+                INSERT INTO users (openid, nickname, total_points, status, created_at, updated_at)
+                SELECT :tag || '-' || g, 'u', 0, 1, now(), now() FROM generate_series(1, :rows) AS g
+            """),
+            {"tag": TAG, "rows": recipients}
+        )
+        await db.commit()
+        user_ids = (await db.execute(
+            select(User.id).where(User.openid.like(f"{TAG}-%")).order_by(User.id)
+        )).scalars().all()
+
+    recipients_query = select(User.id).where(User.openid.like(f"{TAG}-%"))
+
+    async def message_count(db) -> int:
+        result = await db.execute(
+            select(func.count()).select_from(InternalMessage).where(InternalMessage.user_id.in_(recipients_query))
+        )
+        return result.scalar_one()
+
+    async def clear_messages(db):
+        await db.execute(delete(InternalMessage).where(InternalMessage.user_id.in_(recipients_query)))
+        await db.commit()
+
+    results = {}
+    try:
+        async with Session() as db:
+            # 逐条发送（抽样）
+            started = time.perf_counter()
+            for user_id in user_ids[:SAMPLE]:
+                await message_service.send_internal_message(db, user_id, "bench", "content")
+            results["per-message commit"] = SAMPLE / (time.perf_counter() - started)
+            await clear_messages(db)
+
+            # 分批多行 INSERT
+            started = time.perf_counter()
+            for start in range(0, len(user_ids), chunk_size):
+                now = datetime.utcnow()
+                await db.execute(insert(InternalMessage), [
+                    {"user_id": user_id, "title": "bench", "content": "content", "message_type": 1,
+                     "is_read": False, "created_at": now, "updated_at": now}
+                    for user_id in user_ids[start:start + chunk_size]
+                ])
+                await db.commit()
+            results["multi-row INSERT"] = recipients / (time.perf_counter() - started)
+            assert await message_count(db) == recipients
+            await clear_messages(db)
+
+            # 分批 COPY
+            progress = []
+
+            async def on_progress(sent: int):
+                progress.append(sent)
+
+            started = time.perf_counter()
+            sent = await message_service.broadcast_internal_message(
+                db, "bench", "content", user_ids=user_ids, chunk_size=chunk_size, on_progress=on_progress
+            )
+            results["broadcast (COPY)"] = recipients / (time.perf_counter() - started)
+            assert sent == recipients and progress[-1] == recipients, (sent, progress[-1:])
+            assert await message_count(db) == recipients
+    finally:
+        async with Session() as db:
+            await db.execute(delete(User).where(User.openid.like(f"{TAG}-%")))
+            await db.commit()
+        await engine.dispose()
+
+    print(f"recipients: {recipients}, chunk size: {chunk_size}")
+    for name, rate in results.items():
+        print(f"{name:<20}: {rate:>10.0f} rows/s  ({recipients / rate:7.2f} s for {recipients})")
+
+
+if __name__ == "__main__":
+    recipients = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else settings.MESSAGE_BROADCAST_CHUNK_SIZE
+    asyncio.run(main(recipients, chunk_size))
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+MinIO 上传压测（事件循环阻塞 / 内存 / 批量并发）
+
+用模拟的 Minio 客户端（put_object 按分片读取数据流，并按带宽 time.sleep 模拟阻塞的网络发送）
+对比旧实现（await file.read() + BytesIO + 在事件循环上直接 put_object）与当前实现：
+- 上传 10MB 图片期间事件循环的最大停顿（另一个协程每 1ms 打点）
+- 单次上传的 Python 内存分配峰值（tracemalloc）
+- upload_multiple_files 顺序上传与并发上传的耗时
+需要可用的 PostgreSQL（上传登记 storage_objects 引用数），不需要 MinIO 服务。
+
+用法: python dev_checks/bench_minio_upload.py [文件MB] [模拟带宽MB/s]
+"""
+import sys
+import os
+import io
+import time
+import asyncio
+import tempfile
+import tracemalloc
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+import minio
+from minio.error import S3Error
+from starlette.datastructures import Headers, UploadFile
+
+BANDWIDTH = 100.0  # MB/s
+
+
+class FakeMinio:
+    """模拟 Minio 客户端：按分片读取数据并按带宽阻塞"""
+
+    def __init__(self, *args, **kwargs):
+        self.objects = {}
+
+    def bucket_exists(self, bucket_name):
+        return True
+
+    def put_object(self, bucket_name, object_name, data, length, content_type="application/octet-stream",
+                   part_size=0, num_parallel_uploads=3, **kwargs):
+        part_size = part_size or length
+        received = 0
+        while received < length:
+            chunk = data.read(min(part_size, length - received))
+            if not chunk:
+                break
+            received += len(chunk)
+            time.sleep(len(chunk) / (BANDWIDTH * 1024 * 1024))
+        assert received == length, (received, length)
+        self.objects[object_name] = received
+
+    def stat_object(self, bucket_name, object_name):
+        if object_name not in self.objects:
+            raise S3Error("NoSuchKey", "Object does not exist", object_name, "", "", None)
+        return object_name
+
+
+minio.Minio = FakeMinio
+
+from sqlalchemy import delete
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.storage import StorageObject
+from app.services.minio_storage import minio_storage
+
+FOLDER = "bench-upload"
+
+
+def make_upload(size: int) -> UploadFile:
+    """构造与 FastAPI 解析 multipart 后相同的 UploadFile（SpooledTemporaryFile，超过 1MB 落盘）"""
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    block = os.urandom(1024 * 1024)
+    for _ in range(size // len(block)):
+        spool.write(block)
+    spool.seek(0)
+    return UploadFile(file=spool, size=size, filename="photo.jpg",
+                      headers=Headers({"content-type": "image/jpeg"}))
+
+
+async def legacy_upload(file: UploadFile) -> str:
+    """旧实现：整体读入内存，在事件循环上直接调用阻塞的 put_object"""
+    content = await file.read()
+    minio_storage.client.put_object(
+        bucket_name=minio_storage.bucket_name,
+        object_name=f"{FOLDER}/{file.filename}",
+        data=io.BytesIO(content),
+        length=len(content),
+        content_type=file.content_type
+    )
+    return f"{FOLDER}/{file.filename}"
+
+
+async def measure(upload, size: int):
+    """返回 (耗时ms, 事件循环最大停顿ms, 内存峰值MB)"""
+    file = make_upload(size)
+    max_gap = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_gap
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            max_gap = max(max_gap, now - last)
+            last = now
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    tracemalloc.start()
+    started = time.perf_counter()
+    await upload(file)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    done.set()
+    await tick
+    await file.close()
+    return elapsed * 1000, max_gap * 1000, peak / 1024 / 1024
+
+
+async def main(size_mb: int):
+    size = size_mb * 1024 * 1024
+    legacy = await measure(legacy_upload, size)
+    current = await measure(lambda f: minio_storage.upload_file(f, folder=FOLDER), size)
+    assert current[1] < legacy[1], "上传期间事件循环仍被阻塞"
+
+    # 批量上传：8 个 2MB 文件
+    files = [make_upload(2 * 1024 * 1024) for _ in range(8)]
+    started = time.perf_counter()
+    for file in files:
+        await legacy_upload(file)
+    sequential_ms = (time.perf_counter() - started) * 1000
+
+    files = [make_upload(2 * 1024 * 1024) for _ in range(8)]
+    started = time.perf_counter()
+    urls = await minio_storage.upload_multiple_files(files, folder=FOLDER)
+    concurrent_ms = (time.perf_counter() - started) * 1000
+    assert len(set(urls)) == len(files)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(StorageObject).where(StorageObject.object_name.like(f"{FOLDER}/%")))
+        await db.commit()
+    await engine.dispose()
+    minio_storage.shutdown()
+
+    print(f"file: {size_mb} MB, simulated bandwidth: {BANDWIDTH} MB/s, part size: {settings.MINIO_PART_SIZE >> 20} MB")
+    print(f"{'':<10}{'upload ms':>12}{'max loop stall ms':>20}{'peak alloc MB':>16}")
+    for name, (elapsed, stall, peak) in (("legacy", legacy), ("current", current)):
+        print(f"{name:<10}{elapsed:>12.1f}{stall:>20.1f}{peak:>16.2f}")
+    print(f"8 x 2MB: sequential {sequential_ms:.0f} ms, "
+          f"concurrent (limit {settings.MINIO_UPLOAD_CONCURRENCY}) {concurrent_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    if len(sys.argv) > 2:
+        BANDWIDTH = float(sys.argv[2])
+    asyncio.run(main(size_mb))
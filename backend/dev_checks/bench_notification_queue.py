@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+消息发送队列压测
+
+灌入 N 条待发送模板消息（另加 10% 短信），用本地模拟通道（每次调用固定延迟）
+测量不同并发下两个 worker 池同时消费的吞吐，并校验：
+- 每条消息恰好成功发送一次（SKIP LOCKED 领取不重复）
+- 模拟失败时按退避重试，超过最大重试次数的标记为发送失败
+- 请求路径上 send_template_message 只入队，耗时与第三方接口延迟无关
+需要可用的 PostgreSQL（读取 DATABASE_URL）。
+
+用法: python dev_checks/bench_notification_queue.py [消息数] [模拟延迟ms]
+"""
+import sys
+import os
+import time
+import asyncio
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import select, delete, update, func, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models import User
+from app.models.message import TemplateMessage, MessageLog, SmsLog
+from app.services.message_service import message_service
+from app.services.notification_service import StubSender, KIND_TEMPLATE, KIND_SMS
+from app.tasks.notification_worker import NotificationWorkerPool
+
+TAG = "bench-notify"
+WORKERS = 2
+
+
+async def main(messages: int, latency_ms: float):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    sms_count = messages // 10
+
+    async with Session() as db:
+        user = User(openid=TAG, nickname="bench")
+        template = TemplateMessage(template_id=TAG, title="bench", content="c", type=99)
+        db.add_all([user, template])
+        await db.commit()
+        user_id, template_pk = user.id, template.id
+        await db.execute(
+            text("""
+                INSERT INTO message_logs (user_id, message_type, template_id, content, send_status, retry_count,
+                                          next_retry_at, created_at, updated_at)
+                SELECT :user_id, 1, :tag, 'c', 0, 0, now(), now(), now() FROM generate_series(1, :rows)
+            """),
+            {"user_id": user_id, "tag": TAG, "rows": messages}
+        )
+        await db.execute(
+            text("""
+                INSERT INTO sms_logs (phone, template_code, content, send_status, retry_count,
+                                      next_retry_at, created_at, updated_at)
+                SELECT '1380000' || lpad(g::text, 4, '0'), :tag, 'c', 0, 0, now(), now(), now()
+                FROM generate_series(1, :rows) AS g
+            """),
+            {"tag": TAG, "rows": sms_count}
+        )
+        await db.commit()
+
+    async def reset():
+        async with Session() as db:
+            for model, column in ((MessageLog, MessageLog.template_id), (SmsLog, SmsLog.template_code)):
+                await db.execute(
+                    update(model).where(column == TAG).values(
+                        send_status=0, retry_count=0, next_retry_at=func.now(), send_time=None, error_msg=None
+                    )
+                )
+            await db.commit()
+
+    async def status_counts():
+        async with Session() as db:
+            counts = {}
+            for model, column in ((MessageLog, MessageLog.template_id), (SmsLog, SmsLog.template_code)):
+                result = await db.execute(
+                    select(model.send_status, func.count()).where(column == TAG).group_by(model.send_status)
+                )
+                for status, count in result.all():
+                    counts[status] = counts.get(status, 0) + count
+            return counts
+
+    async def drain(pools):
+        async def worker(pool):
+            while await pool.run_once():
+                pass
+        await asyncio.gather(*(worker(pool) for pool in pools))
+
+    total = messages + sms_count
+    rows = []
+    try:
+        # 请求路径：入队耗时
+        async with Session() as db:
+            started = time.perf_counter()
+            for _ in range(200):
+                await message_service.send_template_message(db, user_id, 99, 0, {"k": "v"})
+            enqueue_ms = (time.perf_counter() - started) / 200 * 1000
+        total += 200
+
+        for concurrency in (1, 10, 50):
+            await reset()
+            senders = [StubSender(latency=latency_ms / 1000) for _ in range(WORKERS)]
+            pools = [NotificationWorkerPool(s, concurrency=concurrency, session_factory=Session) for s in senders]
+            started = time.perf_counter()
+            await drain(pools)
+            elapsed = time.perf_counter() - started
+
+            sent = sum((s.sent for s in senders), start=type(senders[0].sent)())
+            assert len(sent) == total and set(sent.values()) == {1}, "存在漏发或重复发送"
+            assert sum(1 for kind, _ in sent if kind == KIND_SMS) == sms_count
+            assert await status_counts() == {1: total}
+            rows.append((concurrency, total / elapsed, elapsed))
+
+        # 失败重试（退避置0以便立即重试）
+        await reset()
+        settings.NOTIFICATION_RETRY_BACKOFF = 0.0
+        sender = StubSender(failure_rate=0.3, seed=1)
+        await drain([NotificationWorkerPool(sender, concurrency=50, session_factory=Session)])
+        counts = await status_counts()
+        assert counts.get(0, 0) == 0 and counts[1] == len(sender.sent), counts
+        async with Session() as db:
+            failed_retries = (await db.execute(
+                select(func.min(MessageLog.retry_count), func.max(MessageLog.retry_count))
+                .where(MessageLog.template_id == TAG, MessageLog.send_status == 2)
+            )).one()
+        assert counts.get(2, 0) == 0 or failed_retries == (settings.NOTIFICATION_MAX_RETRIES + 1,) * 2
+    finally:
+        async with Session() as db:
+            await db.execute(delete(SmsLog).where(SmsLog.template_code == TAG))
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.execute(delete(TemplateMessage).where(TemplateMessage.id == template_pk))
+            await db.commit()
+        await engine.dispose()
+
+    print(f"messages: {total}, sender latency: {latency_ms} ms, workers: {WORKERS}")
+    print(f"enqueue (request path): {enqueue_ms:.2f} ms")
+    for concurrency, rate, elapsed in rows:
+        print(f"concurrency {concurrency:>3}/worker: {rate:>8.0f} msgs/s  ({elapsed:6.2f} s)")
+    print(f"retry run: attempts {sender.attempts}, sent {counts.get(1, 0)}, failed {counts.get(2, 0)}")
+
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(main(messages, latency_ms))
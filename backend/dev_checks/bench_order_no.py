@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+订单号生成器校验与压测（默认使用 fakeredis TCP 服务，需要 pip install fakeredis lupa）
+
+覆盖：
+- 机器号租约：多个生成器租到不同机器号，租约被他人占用后重新申请，释放后可被再次租用
+- 同一毫秒内序列号用尽借用下一毫秒、时钟回拨时仍严格递增
+- 多进程（各自租用机器号）同时生成数百万个订单号：全部唯一、进程内严格递增，并输出每秒生成数
+- 对比原实现（秒级时间 + 4位随机数）同一秒内的冲突数
+
+用法:
+    python dev_checks/bench_order_no.py [进程数] [每进程订单号数]
+    python dev_checks/bench_order_no.py 4 500000 --real   # 使用 REDIS_URL 的真实Redis
+"""
+import sys
+import os
+import time
+import random
+import asyncio
+import threading
+import multiprocessing
+from unittest import mock
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from redis import asyncio as aioredis
+
+from app.core.config import settings
+from app.services.order_no_service import OrderNoGenerator, KEY_PREFIX, MAX_SEQUENCE
+
+
+def start_redis() -> str:
+    if "--real" in sys.argv:
+        return settings.REDIS_URL
+    from fakeredis import TcpFakeServer
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return f"redis://{host}:{port}/0"
+
+
+async def check_lease(url: str):
+    redis = aioredis.from_url(url, decode_responses=True)
+    a, b = OrderNoGenerator(), OrderNoGenerator()
+    await a.generate(redis)
+    await b.generate(redis)
+    assert a.worker_id != b.worker_id
+
+    # 租约过期后被其他进程占用：续租失败，重新申请到另一个机器号
+    lost = a.worker_id
+    await redis.set(f"{KEY_PREFIX}{lost}", "someone-else")
+    a._renew_at = 0
+    await a.generate(redis)
+    assert a.worker_id not in (lost, b.worker_id)
+
+    # 释放后可被再次租用；释放不影响他人的租约
+    released = b.worker_id
+    await b.release(redis)
+    assert await redis.get(f"{KEY_PREFIX}{released}") is None
+    assert await redis.get(f"{KEY_PREFIX}{lost}") == "someone-else"
+    await a.release(redis)
+    await redis.delete(f"{KEY_PREFIX}{lost}")
+    await redis.aclose()
+    print("worker lease / renew takeover / release: OK")
+
+
+def check_clock():
+    generator = OrderNoGenerator()
+    generator._worker_id = 7
+    frozen = 1_700_000_000_123 * 1_000_000
+
+    # 同一毫秒内超出序列号上限时借用下一毫秒
+    with mock.patch("time.time_ns", return_value=frozen):
+        ids = [generator.next_id() for _ in range(3 * (MAX_SEQUENCE + 1))]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert ids[MAX_SEQUENCE + 1][14:17] == "124"
+
+    # 时钟回拨 1 秒
+    with mock.patch("time.time_ns", return_value=frozen - 1_000_000_000):
+        rollback = [generator.next_id() for _ in range(10)]
+    assert rollback[0] > ids[-1] and rollback == sorted(rollback)
+    assert all(len(i) == 24 for i in ids + rollback)
+    print("sequence overflow / clock rollback: monotonic OK")
+
+
+def worker(url: str, count: int, queue):
+    async def run():
+        redis = aioredis.from_url(url, decode_responses=True)
+        generator = OrderNoGenerator()
+        ids = []
+        started = time.perf_counter()
+        for _ in range(count):
+            ids.append(await generator.generate(redis))
+        elapsed = time.perf_counter() - started
+        worker_id = generator.worker_id
+        await generator.release(redis)
+        await redis.aclose()
+        return worker_id, ids, elapsed
+
+    worker_id, ids, elapsed = asyncio.run(run())
+    monotonic = all(ids[i] < ids[i + 1] for i in range(len(ids) - 1))
+    queue.put((worker_id, monotonic, elapsed, "\n".join(ids).encode()))
+
+
+def check_processes(url: str, processes: int, count: int):
+    queue = multiprocessing.Queue()
+    started = time.perf_counter()
+    procs = [multiprocessing.Process(target=worker, args=(url, count, queue)) for _ in range(processes)]
+    for proc in procs:
+        proc.start()
+    results = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    wall = time.perf_counter() - started
+
+    worker_ids = [r[0] for r in results]
+    assert len(set(worker_ids)) == processes, worker_ids
+    assert all(r[1] for r in results), "进程内订单号未严格递增"
+    ids = set()
+    for r in results:
+        ids.update(r[3].split(b"\n"))
+    total = processes * count
+    assert len(ids) == total, f"重复订单号: {total - len(ids)}"
+
+    per_process = [count / r[2] for r in results]
+    print(f"processes: {processes}, ids: {total}, all unique, worker ids: {sorted(worker_ids)}")
+    print(f"per process: {min(per_process):,.0f} - {max(per_process):,.0f} ids/s (generate, incl. lease)")
+    print(f"aggregate:   {sum(per_process):,.0f} ids/s  (wall {wall:.1f} s incl. process start and checks)")
+
+
+def check_legacy(orders_per_second: int = 1000):
+    suffixes = [random.randint(1000, 9999) for _ in range(orders_per_second)]
+    print(f"legacy format: {orders_per_second - len(set(suffixes))} collisions "
+          f"among {orders_per_second} orders in the same second")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    processes = int(args[0]) if args else 4
+    count = int(args[1]) if len(args) > 1 else 500000
+    url = start_redis()
+    asyncio.run(check_lease(url))
+    check_clock()
+    check_processes(url, processes, count)
+    check_legacy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+订单批量状态变更压测
+
+灌入 N 个已支付订单，对比逐单 update_order_status（每单 加载 -> 修改 -> 写日志 -> 提交 -> 刷新）
+与 bulk_transition（一条 UPDATE ... RETURNING + 一条多行 INSERT 日志）的耗时，并校验：
+- paid -> preparing -> ready 后每个订单恰好各有一条对应日志，日志中记录变更前状态
+- 混入不存在、状态不允许的订单时只有这些订单失败，且给出原因
+需要可用的 PostgreSQL（读取 DATABASE_URL）。
+
+用法: python dev_checks/bench_order_transitions.py [订单数]
+"""
+import sys
+import os
+import time
+import asyncio
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import select, delete, update, func, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models import User, Order, OrderLog
+from app.services.order_service import order as order_service
+
+TAG = "bench-transition"
+
+
+async def main(count: int):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with Session() as db:
+        user = User(openid=TAG, nickname="bench")
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+
+    try:
+        async with Session() as db:
+            result = await db.execute(
+                text("""
+                    INSERT INTO orders (order_no, user_id, total_amount, discount_amount, delivery_fee, final_amount,
+                                        status, delivery_type, created_at, updated_at)
+                    SELECT :prefix || g, :user_id, 10, 0, 0, 10, 'paid', 1, now(), now()
+                    FROM generate_series(1, :rows) AS g
+                    RETURNING id
+                """),
+                {"prefix": f"BT{user_id}-", "user_id": user_id, "rows": count}
+            )
+            ids = sorted(result.scalars().all())
+            await db.commit()
+
+        await run(Session, ids, count)
+    finally:
+        async with Session() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+
+async def run(Session, ids, count):
+    async def reset():
+        async with Session() as db:
+            await db.execute(delete(OrderLog).where(OrderLog.order_id.in_(ids)))
+            await db.execute(update(Order).where(Order.id.in_(ids)).values(status="paid"))
+            await db.commit()
+
+    async def log_counts():
+        async with Session() as db:
+            result = await db.execute(
+                select(OrderLog.status, func.count(), func.count(func.distinct(OrderLog.order_id)))
+                .where(OrderLog.order_id.in_(ids))
+                .group_by(OrderLog.status)
+            )
+            return {status: (rows, orders) for status, rows, orders in result.all()}
+
+    # 逐单
+    started = time.perf_counter()
+    async with Session() as db:
+        for order_id in ids:
+            order_obj = await order_service.get(db, order_id)
+            await order_service.update_order_status(db, order_obj, "preparing", operator="bench")
+    single_ms = (time.perf_counter() - started) * 1000
+
+    # 批量
+    await reset()
+    async with Session() as db:
+        started = time.perf_counter()
+        preparing = await order_service.bulk_transition(db, ids, "preparing", operator="bench")
+        bulk_ms = (time.perf_counter() - started) * 1000
+        ready = await order_service.bulk_transition(db, ids, "ready", operator="bench")
+    assert preparing.updated == ids and not preparing.failed
+    assert ready.updated == ids and not ready.failed
+    assert await log_counts() == {"preparing": (count, count), "ready": (count, count)}
+    async with Session() as db:
+        remark = (await db.execute(
+            select(OrderLog.remark).where(OrderLog.order_id == ids[0], OrderLog.status == "ready")
+        )).scalar_one()
+    assert remark == "订单状态从 preparing 变更为 ready", remark
+
+    # 部分失败：先推进前一半，再整批推进（前一半已是目标状态），混入不存在的订单
+    half = ids[: count // 2]
+    async with Session() as db:
+        await order_service.bulk_transition(db, half, "delivering", operator="bench")
+        mixed = await order_service.bulk_transition(db, ids + [0], "delivering", operator="bench")
+    assert mixed.updated == ids[count // 2:]
+    assert mixed.failed[0] == "订单不存在"
+    assert all(mixed.failed[i] == "订单已是 delivering 状态" for i in half)
+    async with Session() as db:
+        invalid = await order_service.bulk_transition(db, ids[:10], "preparing", operator="bench")
+    assert not invalid.updated and invalid.failed[ids[0]] == "状态不允许从 delivering 变更为 preparing"
+
+    print(f"orders: {count}")
+    print(f"per-order update_order_status: {single_ms:8.1f} ms  ({count / single_ms * 1000:.0f} orders/s)")
+    print(f"bulk_transition:               {bulk_ms:8.1f} ms  ({count / bulk_ms * 1000:.0f} orders/s)")
+    print(f"partial failure batch: updated {len(mixed.updated)}, failed {len(mixed.failed)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
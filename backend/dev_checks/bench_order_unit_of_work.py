@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+订单流程工作单元压测：每个流程的提交次数、SQL 数与往返次数
+
+直接调用下单/支付/确认收货/取消/退款端点函数，用引擎事件统计 BEGIN、SQL、写事务 COMMIT 次数，对比：
+- legacy: 服务层方法各自提交并 refresh（强制 commit=True，即改造前的行为）
+- unit-of-work: 每个端点一个事务、一次提交（commit=False + transaction）
+并校验取消/退款后库存恢复、确认收货后积分到账。
+需要可用的 PostgreSQL（读取 DATABASE_URL），不需要 Redis。
+
+说明：改造前 update_points 本身提交两次，legacy 模式下只计一次，确认收货的对比偏保守。
+
+用法: python dev_checks/bench_order_unit_of_work.py [每个流程的次数]
+"""
+import sys
+import os
+import time
+import asyncio
+from collections import Counter
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import event, select, delete
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models import Merchant, Product, User, UserAddress, PointRule
+from app.services.order_service import order as order_service
+from app.services.payment_service import payment as payment_service
+from app.services.user_service import user as user_service
+from app.api.v1.endpoints import orders, payments
+
+settings.DEBUG = True  # 模拟支付直接成功
+settings.ORDER_NO_WORKER_ID = 1
+settings.FLASH_STOCK_ENABLED = False
+
+STOCK = 100000
+PATCHED = [
+    (order_service, "create_order"), (order_service, "update_order_status"),
+    (payment_service, "create_payment"), (payment_service, "handle_payment_success"),
+    (payment_service, "request_refund"), (payment_service, "confirm_refund"),
+    (user_service, "update_points"),
+]
+
+
+def legacy_mode(enabled: bool):
+    """强制服务层方法各自提交（改造前的行为）"""
+    for obj, name in PATCHED:
+        obj.__dict__.pop(name, None)
+        if enabled:
+            original = getattr(obj, name)
+
+            async def wrapper(*args, _original=original, **kwargs):
+                kwargs["commit"] = True
+                return await _original(*args, **kwargs)
+            setattr(obj, name, wrapper)
+
+
+async def main(rounds: int):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    # 只有写过数据的事务提交时才需要刷 WAL，只读事务的提交单独计数（与回滚一样只算往返）
+    counts = Counter()
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def on_execute(conn, cursor, statement, *args):
+        counts["sql"] += 1
+        if statement.lstrip().split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+            conn.info["wrote"] = True
+
+    @event.listens_for(sync_engine, "commit")
+    def on_commit(conn):
+        counts["commit" if conn.info.pop("wrote", False) else "read_only_commit"] += 1
+
+    event.listen(sync_engine, "begin", lambda conn: counts.update(["begin"]))
+    event.listen(sync_engine, "rollback", lambda conn: counts.update(["rollback"]))
+
+    async with Session() as db:
+        merchant = Merchant(name="bench-uow", contact_phone="00000000000")
+        user = User(openid="bench-uow", nickname="bench")
+        db.add_all([merchant, user])
+        await db.flush()
+        product = Product(merchant_id=merchant.id, name="bench-uow", original_price=2, price=1, stock=STOCK)
+        address = UserAddress(user_id=user.id, receiver_name="bench", receiver_phone="00000000000",
+                              province="P", city="C", detail_address="D")
+        db.add_all([product, address])
+        rule = (await db.execute(select(PointRule).where(PointRule.rule_type == 2))).scalar_one_or_none()
+        created_rule = rule is None
+        if created_rule:
+            db.add(PointRule(rule_type=2, points=100, description="bench"))
+        await db.commit()
+        ids = {"merchant": merchant.id, "user": user.id, "product": product.id, "address": address.id}
+
+    try:
+        results = {}
+        for mode in ("legacy", "unit-of-work"):
+            legacy_mode(mode == "legacy")
+            results[mode] = await run_flows(Session, counts, ids, rounds)
+        legacy_mode(False)
+
+        async with Session() as db:
+            stock = (await db.execute(select(Product.stock).where(Product.id == ids["product"]))).scalar_one()
+            points = (await db.execute(select(User.total_points).where(User.id == ids["user"]))).scalar_one()
+        completed = 2 * rounds
+        assert stock == STOCK - completed, stock
+        assert points > 0, points
+    finally:
+        legacy_mode(False)
+        async with Session() as db:
+            await db.execute(delete(User).where(User.id == ids["user"]))
+            await db.execute(delete(Product).where(Product.id == ids["product"]))
+            await db.execute(delete(Merchant).where(Merchant.id == ids["merchant"]))
+            if created_rule:
+                await db.execute(delete(PointRule).where(PointRule.rule_type == 2))
+            await db.commit()
+        await engine.dispose()
+
+    print(f"rounds: {rounds} (averages per endpoint call)")
+    print(f"{'flow':<10}{'mode':<14}{'write commits':>14}{'sql':>6}{'round trips':>13}{'ms':>8}")
+    for flow in results["legacy"]:
+        for mode, flows in results.items():
+            c, ms, calls = flows[flow]
+            trips = c["begin"] + c["sql"] + c["commit"] + c["read_only_commit"] + c["rollback"]
+            print(f"{flow:<10}{mode:<14}{c['commit'] / calls:>14.1f}{c['sql'] / calls:>6.1f}"
+                  f"{trips / calls:>13.1f}{ms / calls:>8.2f}")
+    print(f"stock / points consistent after {completed} completed orders: OK")
+
+
+async def run_flows(Session, counts, ids, rounds):
+    user_id = ids["user"]
+    create_request = orders.OrderCreateRequest(
+        delivery_type=1, address_id=ids["address"], items=[{"product_id": ids["product"], "quantity": 1}]
+    )
+    measured = {}
+
+    async def measure(flow, call):
+        async with Session() as db:
+            before = counts.copy()
+            started = time.perf_counter()
+            response = await call(db)
+            elapsed = (time.perf_counter() - started) * 1000
+        assert response.code == 200, response.message
+        total, ms, calls = measured.get(flow, (Counter(), 0.0, 0))
+        measured[flow] = (total + (counts - before), ms + elapsed, calls + 1)
+        return response.data
+
+    async def create():
+        data = await measure("create", lambda db: orders.create_order(
+            create_request, db=db, redis=None, current_user_id=user_id))
+        return data["order_id"]
+
+    async def pay(order_id):
+        await measure("pay", lambda db: payments.create_wx_payment(
+            payments.WxPayRequest(order_id=order_id), db=db, current_user_id=user_id))
+
+    for _ in range(rounds):
+        # 下单 -> 支付 -> 发货（管理员批量，不计入） -> 确认收货
+        order_id = await create()
+        await pay(order_id)
+        async with Session() as db:
+            for target in ("preparing", "ready", "delivering"):
+                await order_service.bulk_transition(db, [order_id], target, operator="bench")
+        await measure("confirm", lambda db: orders.confirm_order(order_id, db=db, current_user_id=user_id))
+
+        # 下单 -> 取消（恢复库存）
+        order_id = await create()
+        await measure("cancel", lambda db: orders.cancel_order(order_id, "bench", db=db, redis=None,
+                                                               current_user_id=user_id))
+
+        # 下单 -> 支付 -> 申请退款 -> 管理员确认退款（恢复库存）
+        order_id = await create()
+        await pay(order_id)
+        await measure("refund", lambda db: orders.request_refund(
+            order_id, orders.OrderRefundRequest(reason="bench"), db=db, current_user_id=user_id))
+        await measure("refunded", lambda db: orders.admin_confirm_refund(order_id, db=db, redis=None, admin_id=1))
+
+    return measured
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+商品关键词搜索压测：LIKE '%关键词%' vs search_vector（GIN）vs 内存 n-gram 索引
+
+商品数依次扩到 1千 / 1万 / 10万，每个规模下固定有 20 个“松茸”商品，
+分别测量稀有词（松茸）和常见词（白菜）取第一页（20条，含总数）的耗时。
+需要可用的 PostgreSQL（读取 DATABASE_URL）。
+
+用法: python dev_checks/bench_product_search.py [规模1,规模2,...]
+"""
+import sys
+import os
+import time
+import random
+import asyncio
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import select, delete, insert, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models import Merchant, Product
+from app.services.product_service import product
+from app.services.search_service import product_search, NgramIndex
+
+ROUNDS = 20
+RARE = "松茸"
+COMMON = "白菜"
+PREFIXES = ["新鲜", "有机", "农家", "精选", "当季", "散装", "冷冻", "特级", "山地", "本地"]
+NOUNS = ["白菜", "菠菜", "土豆", "番茄", "黄瓜", "茄子", "萝卜", "芹菜", "西兰花", "苹果",
+         "香蕉", "橙子", "葡萄", "猪肉", "牛肉", "鸡蛋", "鲈鱼", "虾仁", "豆腐", "玉米",
+         "南瓜", "冬瓜", "山药", "生菜", "韭菜", "青椒", "洋葱", "大蒜", "生姜", "香菇"]
+UNITS = ["500g", "1kg", "2kg", "一箱", "一份", "3斤"]
+
+
+def random_name(rng: random.Random) -> str:
+    return f"{rng.choice(PREFIXES)}{rng.choice(NOUNS)}{rng.choice(NOUNS)} {rng.choice(UNITS)}"
+
+
+async def timed(fn) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await fn()
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+
+async def main(scales):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    rng = random.Random(42)
+
+    async with Session() as db:
+        merchant = Merchant(name="bench-search", contact_phone="00000000000")
+        db.add(merchant)
+        await db.commit()
+        merchant_id = merchant.id
+
+    async def like_search(db, keyword):
+        query = select(Product).where(Product.status == 1, Product.name.contains(keyword))
+        return await product.paginate(db, query, limit=20)
+
+    rows = []
+    seeded = 0
+    try:
+        for scale in scales:
+            async with Session() as db:
+                batch = [
+                    {"merchant_id": merchant_id, "name": random_name(rng), "original_price": 2, "price": 1,
+                     "stock": 10, "status": 1, "sales_count": rng.randint(0, 1000)}
+                    for _ in range(scale - seeded - (0 if seeded else 20))
+                ]
+                if not seeded:
+                    batch += [
+                        {"merchant_id": merchant_id, "name": f"野生{RARE} {i}号", "original_price": 2,
+                         "price": 1, "stock": 10, "status": 1, "sales_count": i}
+                        for i in range(20)
+                    ]
+                for start in range(0, len(batch), 5000):
+                    await db.execute(insert(Product), batch[start:start + 5000])
+                await db.commit()
+                seeded = scale
+
+                # Core 批量插入不触发 ORM 事件，统一回填搜索向量
+                await product_search.rebuild(db, batch_size=5000)
+                await db.execute(text("ANALYZE products"))
+
+                index = NgramIndex()
+                result = await db.execute(
+                    select(Product.id, Product.name, Product.tags, Product.description)
+                    .where(Product.merchant_id == merchant_id)
+                )
+                for row in result.all():
+                    index.add(*row)
+
+                for keyword in (RARE, COMMON):
+                    page = await product.search_products(db, keyword=keyword, limit=20)
+                    like_page = await like_search(db, keyword)
+                    assert page.total == like_page.total, (keyword, page.total, like_page.total)
+
+                    like_ms = await timed(lambda: like_search(db, keyword))
+                    tsv_ms = await timed(lambda: product.search_products(db, keyword=keyword, limit=20))
+                    started = time.perf_counter()
+                    for _ in range(ROUNDS):
+                        index.search(keyword)
+                    memory_ms = (time.perf_counter() - started) / ROUNDS * 1000
+                    rows.append((scale, keyword, page.total, like_ms, tsv_ms, memory_ms))
+    finally:
+        async with Session() as db:
+            await db.execute(delete(Merchant).where(Merchant.id == merchant_id))
+            await db.commit()
+        await engine.dispose()
+
+    print(f"{'products':>9} {'keyword':>8} {'matches':>8} {'LIKE ms':>9} {'tsvector ms':>12} {'memory ms':>10}")
+    for scale, keyword, total, like_ms, tsv_ms, memory_ms in rows:
+        print(f"{scale:>9} {keyword:>8} {total:>8} {like_ms:>9.2f} {tsv_ms:>12.2f} {memory_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    scales = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1000, 10000, 100000]
+    asyncio.run(main(scales))
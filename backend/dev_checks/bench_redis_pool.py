@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Redis 连接复用压测
+
+对比每次请求新建客户端（from_url + 命令 + 关闭，即旧的 get_redis 依赖）与共享连接池的单命令耗时，
+pipeline 与逐条命令的耗时，并校验高并发下连接数不超过 REDIS_MAX_CONNECTIONS。
+默认在本地启动 fakeredis TCP 服务（走真实 socket），--url 指定真实 Redis。
+fakeredis 在 Python 中逐条处理命令，pipeline 的收益需用真实 Redis 测量。
+
+用法: python dev_checks/bench_redis_pool.py [--url redis://host:port/0]
+"""
+import sys
+import os
+import time
+import socket
+import asyncio
+import threading
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from redis import asyncio as aioredis
+
+from app.core.config import settings
+from app.core import redis as redis_core
+
+ROUNDS = 2000
+CONCURRENT = 500
+
+
+def start_fake_server() -> str:
+    from fakeredis import TcpFakeServer
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = TcpFakeServer(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}/0"
+
+
+async def timed(fn, rounds: int = ROUNDS) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await fn()
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+async def main(url: str):
+    settings.REDIS_URL = url
+    settings.REDIS_MAX_CONNECTIONS = 20
+    client = redis_core.init_redis()
+    await client.set("bench:pool", "1")
+
+    async def per_request():
+        redis = aioredis.from_url(url, decode_responses=True)
+        try:
+            await redis.get("bench:pool")
+        finally:
+            await redis.aclose()
+
+    async def shared():
+        await client.get("bench:pool")
+
+    async def sequential_100():
+        for _ in range(100):
+            await client.get("bench:pool")
+
+    async def pipelined_100():
+        async with redis_core.pipeline() as pipe:
+            for _ in range(100):
+                pipe.get("bench:pool")
+        assert pipe.results == ["1"] * 100
+
+    results = {
+        "per-request client": await timed(per_request),
+        "shared pool": await timed(shared),
+        "100 GET sequential": await timed(sequential_100, 50),
+        "100 GET pipeline": await timed(pipelined_100, 50),
+    }
+
+    # 高并发：连接数受池上限约束
+    peak = 0
+
+    async def burst():
+        nonlocal peak
+        await client.get("bench:pool")
+        peak = max(peak, redis_core.redis_pool_stats()["in_use"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(burst() for _ in range(CONCURRENT)))
+    burst_ms = (time.perf_counter() - started) * 1000
+    stats = redis_core.redis_pool_stats()
+    assert peak <= settings.REDIS_MAX_CONNECTIONS, peak
+    assert stats["in_use"] == 0 and stats["idle"] <= settings.REDIS_MAX_CONNECTIONS, stats
+
+    await client.delete("bench:pool")
+    await redis_core.close_redis()
+    assert redis_core.redis_pool_stats() is None
+
+    print(f"redis: {url}, rounds: {ROUNDS}")
+    for name, ms in results.items():
+        print(f"{name:<20}: {ms:8.3f} ms")
+    print(f"{CONCURRENT} concurrent GETs: {burst_ms:.1f} ms, peak connections {peak}/{settings.REDIS_MAX_CONNECTIONS}")
+    print(f"pool after burst: {stats}")
+
+
+if __name__ == "__main__":
+    url = sys.argv[sys.argv.index("--url") + 1] if "--url" in sys.argv else start_fake_server()
+    asyncio.run(main(url))
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+热点商品Redis库存校验（默认使用 fakeredis，需要 pip install fakeredis lupa）
+
+覆盖：整单原子预占、库存不足不扣减、未加载商品回退、只读查看预占、取消归还幂等、
+delta 取走/放回，以及单SKU并发预占零超卖与每秒预占数。
+
+用法:
+    python dev_checks/check_flash_stock.py          # fakeredis
+    python dev_checks/check_flash_stock.py --real   # 使用 REDIS_URL 的真实Redis
+"""
+import sys
+import os
+import time
+import asyncio
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from app.services.flash_stock_service import flash_stock, FlashStockReservationError
+
+
+async def make_redis():
+    if "--real" in sys.argv:
+        from redis import asyncio as aioredis
+        from app.core.config import settings
+        redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    else:
+        import fakeredis
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    await redis.flushdb()
+    return redis
+
+
+async def check_reserve_release(redis):
+    await flash_stock.load_counters(redis, {1: 10, 2: 5})
+
+    # 整单预占，3号商品未加载应回退给数据库
+    unloaded = await flash_stock.reserve(redis, "A", {1: 3, 2: 2, 3: 1})
+    assert unloaded == {3}, unloaded
+    assert await flash_stock.get_stock(redis, 1) == 7
+    assert await flash_stock.get_stock(redis, 2) == 3
+
+    # 任一商品不足则整单不扣减
+    try:
+        await flash_stock.reserve(redis, "B", {1: 1, 2: 4})
+        raise AssertionError("应当库存不足")
+    except FlashStockReservationError as e:
+        assert e.product_id == 2
+    assert await flash_stock.get_stock(redis, 1) == 7
+
+    # 只读查看预占不归还（先提交数据库事务，提交后再 release）
+    assert await flash_stock.reserved(redis, "A") == {1: 3, 2: 2}
+    assert await flash_stock.get_stock(redis, 1) == 7
+
+    # 取消归还，重复归还无效果
+    assert await flash_stock.release(redis, "A") == {1: 3, 2: 2}
+    assert await flash_stock.release(redis, "A") == {}
+    assert await flash_stock.get_stock(redis, 1) == 10
+
+    # 预占 + 归还后净 delta 为 0
+    assert await flash_stock.drain_deltas(redis) == {}
+
+    await flash_stock.reserve(redis, "C", {1: 4})
+    deltas = await flash_stock.drain_deltas(redis)
+    assert deltas == {1: 4}, deltas
+    await flash_stock.restore_deltas(redis, deltas)
+    assert await flash_stock.drain_deltas(redis) == {1: 4}
+
+    split = flash_stock.split_lines([(1, 4), (3, 1)], {1: 4})
+    assert split == {3: 1}, split
+    print("reserve/release: OK")
+
+
+async def check_hot_sku(redis, stock=5000, workers=200):
+    await flash_stock.load_counters(redis, {100: stock})
+    succeeded = 0
+    seq = 0
+
+    async def buyer():
+        nonlocal succeeded, seq
+        while True:
+            seq += 1
+            try:
+                await flash_stock.reserve(redis, f"hot-{seq}", {100: 1})
+                succeeded += 1
+            except FlashStockReservationError:
+                return
+
+    started = time.perf_counter()
+    await asyncio.gather(*(buyer() for _ in range(workers)))
+    elapsed = time.perf_counter() - started
+
+    assert succeeded == stock, succeeded
+    assert await flash_stock.get_stock(redis, 100) == 0
+    assert (await flash_stock.drain_deltas(redis, [100])) == {100: stock}
+    print(f"hot sku: {succeeded} reservations, zero oversell, {succeeded / elapsed:.0f} reservations/sec")
+
+
+async def main():
+    redis = await make_redis()
+    try:
+        await check_reserve_release(redis)
+        await check_hot_sku(redis)
+    finally:
+        await redis.flushdb()
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
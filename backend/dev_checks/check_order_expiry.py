@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+超时未支付订单自动取消校验与压测
+
+灌入 N 个超时的待支付订单（库存已扣减）、一批未超时的待支付订单和超时的已支付订单，
+模拟多个副本同时执行 expire_once，校验：
+- 每个超时订单恰好被取消一次（恰好一条取消日志）
+- 商品库存恰好归还（回到下单前的数量）
+- 未超时订单与非待支付订单不受影响
+- 超时边界上支付回调与取消并发时，订单要么已支付（库存不归还），要么已取消且支付转为退款中
+- 用户取消与超时取消并发时，每个订单只取消一次（一条取消日志），库存只归还一次
+并输出每秒取消订单数。
+需要可用的 PostgreSQL（读取 DATABASE_URL），不需要 Redis（FLASH_STOCK_ENABLED 为 False 时）。
+
+用法: python dev_checks/check_order_expiry.py [订单数] [副本数]
+"""
+import sys
+import os
+import time
+import asyncio
+from datetime import datetime, timedelta
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import select, update, delete, func, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.core.database import transaction
+from app.models import Merchant, Product, User, Order, OrderItem, OrderLog, Payment
+from app.services.payment_service import payment
+from app.api.v1.endpoints import payments, orders
+from app.tasks import order_expiry
+
+TAG = "bench-expiry"
+PRODUCTS = 5
+STOCK = 100000
+
+
+async def main(count: int, replicas: int):
+    engine = create_async_engine(
+        settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
+        pool_size=replicas + 2
+    )
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with Session() as db:
+        merchant = Merchant(name=TAG, contact_phone="00000000000")
+        user = User(openid=TAG, nickname="bench")
+        db.add_all([merchant, user])
+        await db.flush()
+        products = [
+            Product(merchant_id=merchant.id, name=f"{TAG}-{i}", original_price=1, price=1, stock=STOCK)
+            for i in range(PRODUCTS)
+        ]
+        db.add_all(products)
+        await db.commit()
+        merchant_id, user_id = merchant.id, user.id
+        product_ids = [p.id for p in products]
+
+    try:
+        await seed(Session, user_id, product_ids, count)
+        await run(Session, user_id, product_ids, count, replicas)
+        await payment_race(Session, user_id, product_ids[0], 200)
+        await cancel_race(Session, user_id, product_ids[1], 200)
+    finally:
+        async with Session() as db:
+            await db.execute(delete(Order).where(Order.user_id == user_id))
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.execute(delete(Product).where(Product.merchant_id == merchant_id))
+            await db.execute(delete(Merchant).where(Merchant.id == merchant_id))
+            await db.commit()
+        await engine.dispose()
+
+
+async def seed(Session, user_id, product_ids, count):
+    """超时待支付 count 个、未超时待支付 100 个、超时已支付 100 个；每单两条明细，库存按待支付订单扣减"""
+    ttl = settings.ORDER_PAYMENT_TTL
+    async with Session() as db:
+        await db.execute(
+            text("""
+                INSERT INTO orders (order_no, user_id, total_amount, discount_amount, delivery_fee, final_amount,
+                                    status, delivery_type, created_at, updated_at)
+                SELECT :prefix || g, :user_id, 10, 0, 0, 10,
+                       CASE WHEN g > :rows + 100 THEN 'paid' ELSE 'pending' END::order_status, 1,
+                       now() - make_interval(secs => CASE WHEN g BETWEEN :rows + 1 AND :rows + 100
+                                                          THEN 0 ELSE :ttl + g END),
+                       now()
+                FROM generate_series(1, :rows + 200) AS g
+            """),
+            {"prefix": f"EX{user_id}-", "user_id": user_id, "rows": count, "ttl": ttl}
+        )
+        await db.execute(
+            text("""
+                INSERT INTO order_items (order_id, product_id, product_name, price, quantity, subtotal,
+                                         created_at, updated_at)
+                SELECT o.id, (CAST(:product_ids AS integer[]))[(o.id + k) % :products + 1],
+                       'bench', 1, 1 + (o.id + k) % 3,
+                       1 + (o.id + k) % 3, now(), now()
+                FROM orders o CROSS JOIN generate_series(0, 1) AS k
+                WHERE o.user_id = :user_id
+            """),
+            {"product_ids": product_ids, "products": len(product_ids), "user_id": user_id}
+        )
+        # 库存已在下单时扣减
+        await db.execute(
+            text("""
+                UPDATE products p SET stock = p.stock - s.quantity
+                FROM (
+                    SELECT i.product_id, sum(i.quantity) AS quantity
+                    FROM order_items i JOIN orders o ON o.id = i.order_id
+                    WHERE o.user_id = :user_id AND o.status = 'pending'
+                    GROUP BY i.product_id
+                ) s
+                WHERE p.id = s.product_id
+            """),
+            {"user_id": user_id}
+        )
+        await db.commit()
+
+
+async def run(Session, user_id, product_ids, count, replicas):
+    async with Session() as db:
+        recent_pending = await db.scalar(
+            select(func.sum(text("i.quantity"))).select_from(text(
+                "order_items i JOIN orders o ON o.id = i.order_id"
+            )).where(text(
+                "o.user_id = :user_id AND o.status = 'pending' AND o.created_at > now() - interval '1 minute'"
+            )).params(user_id=user_id)
+        )
+
+    batch_size = settings.ORDER_EXPIRY_BATCH_SIZE
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        order_expiry.expire_once(None, batch_size=batch_size, session_factory=Session)
+        for _ in range(replicas)
+    ))
+    elapsed = time.perf_counter() - started
+
+    async with Session() as db:
+        statuses = dict((await db.execute(
+            select(Order.status, func.count()).where(Order.user_id == user_id).group_by(Order.status)
+        )).all())
+        logs = (await db.execute(
+            select(func.count(), func.count(func.distinct(OrderLog.order_id)))
+            .join(Order, Order.id == OrderLog.order_id)
+            .where(Order.user_id == user_id, OrderLog.status == "cancelled")
+        )).one()
+        stock = await db.scalar(select(func.sum(Product.stock)).where(Product.id.in_(product_ids)))
+        reasons = set((await db.execute(
+            select(Order.cancel_reason).where(Order.user_id == user_id, Order.status == "cancelled")
+        )).scalars())
+
+    assert sum(results) == count, results
+    assert statuses == {"cancelled": count, "pending": 100, "paid": 100}, statuses
+    assert tuple(logs) == (count, count), logs
+    assert reasons == {"超时未支付"}, reasons
+    assert stock == STOCK * len(product_ids) - recent_pending, (stock, recent_pending)
+
+    # 再次执行无订单可取消
+    assert await order_expiry.expire_once(None, session_factory=Session) == 0
+
+    print(f"expired orders: {count}, replicas: {replicas}, batch size: {batch_size}")
+    print(f"per replica: {results}")
+    print(f"elapsed: {elapsed * 1000:8.1f} ms  ({count / elapsed:.0f} orders/s)")
+    print("exactly-once cancel / stock restored / recent & paid untouched: OK")
+
+
+async def seed_boundary(Session, user_id, product_id, count, prefix):
+    """count 个刚超时的待支付订单（每单 1 件，库存已扣减，含待支付的支付记录），返回 (下单前库存, 订单ID)"""
+    async with Session() as db:
+        stock_before = await db.scalar(select(Product.stock).where(Product.id == product_id))
+        created = datetime.utcnow() - timedelta(seconds=settings.ORDER_PAYMENT_TTL + 1)
+        orders = [
+            Order(order_no=f"{prefix}{user_id}-{i}", user_id=user_id, total_amount=10, final_amount=10,
+                  status="pending", delivery_type=1, created_at=created)
+            for i in range(count)
+        ]
+        db.add_all(orders)
+        await db.flush()
+        db.add_all(OrderItem(order_id=o.id, product_id=product_id, product_name="bench", price=10,
+                             quantity=1, subtotal=10) for o in orders)
+        db.add_all(Payment(order_id=o.id, prepay_id=f"{prefix}{o.id}", amount=10) for o in orders)
+        await db.execute(
+            update(Product).where(Product.id == product_id).values(stock=Product.stock - count)
+        )
+        await db.commit()
+        return stock_before, [o.id for o in orders]
+
+
+async def expire_all(Session) -> int:
+    """小批量反复执行 expire_once 直到没有超时订单，返回取消数"""
+    cancelled = 0
+    while True:
+        expired = await order_expiry.expire_once(None, batch_size=10, session_factory=Session)
+        if not expired:
+            return cancelled
+        cancelled += expired
+
+
+async def payment_race(Session, user_id, product_id, count):
+    """count 个刚超时的待支付订单，取消任务与支付回调同时处理"""
+    stock_before, order_ids = await seed_boundary(Session, user_id, product_id, count, "PR")
+
+    async def pay(order_id: int):
+        """与 /payments/callback/wx 相同的事务"""
+        async with Session() as db:
+            payment_obj = await payment.get_by_field(db, field_name="order_id", field_value=order_id)
+            async with transaction(db):
+                await payment.handle_payment_success(db, payment_obj, f"txn-{order_id}", commit=False)
+                await payments._settle_order(db, payment_obj, remark="支付成功")
+
+    results = await asyncio.gather(expire_all(Session), *(pay(order_id) for order_id in order_ids))
+
+    async with Session() as db:
+        rows = (await db.execute(
+            select(Order.status, Payment.status, func.count())
+            .join(Payment, Payment.order_id == Order.id)
+            .where(Order.id.in_(order_ids))
+            .group_by(Order.status, Payment.status)
+        )).all()
+        stock = await db.scalar(select(Product.stock).where(Product.id == product_id))
+    outcomes = {(order_status, payment_status): n for order_status, payment_status, n in rows}
+
+    assert set(outcomes) <= {("paid", "paid"), ("cancelled", "refunding")}, outcomes
+    assert outcomes.get(("cancelled", "refunding"), 0) == results[0], (outcomes, results[0])
+    assert stock == stock_before - outcomes.get(("paid", "paid"), 0), (stock, stock_before, outcomes)
+    print(f"payment at the timeout boundary: {outcomes.get(('paid', 'paid'), 0)} paid, "
+          f"{results[0]} cancelled and flagged for refund; stock consistent: OK")
+
+
+async def cancel_race(Session, user_id, product_id, count):
+    """count 个刚超时的待支付订单，取消任务与用户取消（/orders/{id}/cancel）同时处理"""
+    stock_before, order_ids = await seed_boundary(Session, user_id, product_id, count, "CR")
+
+    async def cancel(order_id: int) -> bool:
+        async with Session() as db:
+            response = await orders.cancel_order(order_id, reason="bench", db=db, redis=None,
+                                                 current_user_id=user_id)
+        assert response.code in (200, 400), response
+        return response.code == 200
+
+    results = await asyncio.gather(expire_all(Session), *(cancel(order_id) for order_id in order_ids))
+    expired, user_cancelled = results[0], sum(results[1:])
+
+    async with Session() as db:
+        statuses = dict((await db.execute(
+            select(Order.status, func.count()).where(Order.id.in_(order_ids)).group_by(Order.status)
+        )).all())
+        logs = (await db.execute(
+            select(func.count(), func.count(func.distinct(OrderLog.order_id)))
+            .where(OrderLog.order_id.in_(order_ids), OrderLog.status == "cancelled")
+        )).one()
+        stock = await db.scalar(select(Product.stock).where(Product.id == product_id))
+
+    assert statuses == {"cancelled": count}, statuses
+    assert expired + user_cancelled == count, (expired, user_cancelled)
+    assert tuple(logs) == (count, count), logs
+    assert stock == stock_before, (stock, stock_before)
+    print(f"user cancel at the timeout boundary: {user_cancelled} by user, {expired} by expiry; "
+          f"one cancel log each, stock restored once: OK")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    replicas = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    asyncio.run(main(count, replicas))
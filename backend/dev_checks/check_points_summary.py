@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+用户积分汇总校验与压测
+
+为一个用户灌入 N 条积分记录和 N 天签到记录（中间断签一次，最近一段连续签到到昨天），校验：
+- rebuild 回填的汇总与原实现（4 次聚合查询 + 遍历全部签到日期）结果一致
+- update_points / 签到（含断签后重新开始、同日重复签到）增量更新后 check 无不一致
+- 篡改汇总后 check 能发现，rebuild 后恢复
+并对比 /points/summary 原实现与主键查询的耗时。
+需要可用的 PostgreSQL（读取 DATABASE_URL），不需要 Redis。
+
+用法: python dev_checks/check_points_summary.py [记录数]
+"""
+import sys
+import os
+import time
+import asyncio
+from datetime import datetime, timedelta
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import select, delete, update, and_, desc, func, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models import User, PointsRecord, SignInRecord, UserPointsSummary
+from app.services.points_service import points_record, sign_in_record, points_summary
+from app.services.user_service import user as user_service
+
+TAG = "bench-points-summary"
+
+
+async def legacy_summary(db: AsyncSession, user_id: int) -> dict:
+    """改造前的 get_user_summary"""
+    earned = (await db.execute(select(func.sum(PointsRecord.points)).where(
+        and_(PointsRecord.user_id == user_id, PointsRecord.change_type == 1)))).scalar() or 0
+    spent = (await db.execute(select(func.sum(PointsRecord.points)).where(
+        and_(PointsRecord.user_id == user_id, PointsRecord.change_type == 2)))).scalar() or 0
+    sign_count = (await db.execute(select(func.count()).where(SignInRecord.user_id == user_id))).scalar() or 0
+
+    dates = (await db.execute(select(SignInRecord.sign_date).where(SignInRecord.user_id == user_id)
+                              .order_by(desc(SignInRecord.sign_date)))).scalars().all()
+    consecutive = 0
+    today = datetime.now().strftime("%Y-%m-%d")
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    if dates and dates[0] in (today, yesterday):
+        consecutive = 1
+        for i in range(1, len(dates)):
+            if (datetime.strptime(dates[i - 1], "%Y-%m-%d") - datetime.strptime(dates[i], "%Y-%m-%d")).days == 1:
+                consecutive += 1
+            else:
+                break
+    return {"total_points": earned - spent, "earned_points": earned, "spent_points": spent,
+            "sign_count": sign_count, "consecutive_days": consecutive}
+
+
+async def seed(Session, user_id: int, count: int, streak: int):
+    """积分记录 count 条（每 5 条一条消耗）；签到 count 天，截至昨天最近 streak 天连续，之前断签一天"""
+    async with Session() as db:
+        await db.execute(text("""
+            INSERT INTO points_records (user_id, change_type, points, source_type, description, created_at, updated_at)
+            SELECT :user_id, CASE WHEN g % 5 = 0 THEN 2 ELSE 1 END, 1 + g % 7, 1, 'bench', now(), now()
+            FROM generate_series(1, :rows) AS g
+        """), {"user_id": user_id, "rows": count})
+        await db.execute(text("""
+            INSERT INTO sign_in_records (user_id, sign_date, points, created_at, updated_at)
+            SELECT :user_id, to_char(current_date - g - CASE WHEN g > :streak THEN 1 ELSE 0 END, 'YYYY-MM-DD'),
+                   5, now(), now()
+            FROM generate_series(1, :rows) AS g
+        """), {"user_id": user_id, "rows": count, "streak": streak})
+        await db.commit()
+
+
+async def timed(Session, call, rounds: int) -> float:
+    async with Session() as db:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await call(db)
+            await db.rollback()
+        return (time.perf_counter() - started) * 1000 / rounds
+
+
+async def main(count: int):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    streak = 30
+
+    async with Session() as db:
+        users = [User(openid=f"{TAG}-{i}", nickname="bench") for i in range(2)]
+        db.add_all(users)
+        await db.commit()
+        user_id, empty_id = users[0].id, users[1].id
+
+    try:
+        await seed(Session, user_id, count, streak)
+
+        # 回填：与原实现一致；没有任何记录的用户为全 0
+        async with Session() as db:
+            assert await points_summary.rebuild(db, [user_id, empty_id]) == 2
+            expected = await legacy_summary(db, user_id)
+            assert expected["consecutive_days"] == streak, expected
+            assert await points_summary.get_summary(db, user_id) == expected
+            assert await points_record.get_user_summary(db, empty_id) == await legacy_summary(db, empty_id)
+            assert await points_summary.check(db, [user_id, empty_id]) == []
+        print(f"rebuild matches legacy summary: {expected}")
+
+        # 增量：积分变动 + 今天签到（连续 +1），另一用户首次签到
+        async with Session() as db:
+            user_obj = await db.get(User, user_id)
+            await user_service.update_points(db, user_obj, 50, 1, 2, "订单完成")
+            await user_service.update_points(db, user_obj, 20, 2, 3, "积分兑换")
+            await sign_in_record.sign_in(db, user_id, 5)
+            await sign_in_record.sign_in(db, empty_id, 5)
+            summary = await points_summary.get_summary(db, user_id)
+            assert summary == await legacy_summary(db, user_id), summary
+            assert summary["consecutive_days"] == streak + 1
+            assert (await points_summary.get_summary(db, empty_id))["consecutive_days"] == 1
+
+            # 断签后重新开始；同一天重复签到不写入
+            old = (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d")
+            await db.execute(update(UserPointsSummary).where(UserPointsSummary.user_id == empty_id)
+                             .values(last_sign_date=old, current_streak=9))
+            tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+            assert (await sign_in_record.sign_in(db, empty_id, 5, tomorrow, commit=False)).consecutive_days == 1
+            assert await sign_in_record.sign_in(db, empty_id, 5, tomorrow, commit=False) is None
+            await db.rollback()
+            assert await points_summary.check(db, [user_id, empty_id]) == []
+        print(f"incremental update_points / sign-in: consistent (streak {summary['consecutive_days']})")
+
+        # 一致性检查能发现篡改，rebuild 后恢复
+        async with Session() as db:
+            await db.execute(update(UserPointsSummary).where(UserPointsSummary.user_id == user_id)
+                             .values(earned_points=UserPointsSummary.earned_points + 1))
+            await db.commit()
+            mismatches = await points_summary.check(db, [user_id, empty_id])
+            assert [m["user_id"] for m in mismatches] == [user_id], mismatches
+            await points_summary.rebuild(db, [user_id])
+            assert await points_summary.check(db, [user_id, empty_id]) == []
+        print("check detects drift, rebuild repairs: OK")
+
+        rounds = 200
+        legacy_ms = await timed(Session, lambda db: legacy_summary(db, user_id), rounds)
+        summary_ms = await timed(Session, lambda db: points_record.get_user_summary(db, user_id), rounds)
+        print(f"summary with {count} points records / {count + 1} sign-ins, {rounds} rounds")
+        print(f"legacy (4 aggregates + walk dates): {legacy_ms:8.3f} ms")
+        print(f"summary row (primary key lookup):   {summary_ms:8.3f} ms  ({legacy_ms / summary_ms:.1f}x)")
+    finally:
+        async with Session() as db:
+            await db.execute(delete(User).where(User.id.in_([user_id, empty_id])))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
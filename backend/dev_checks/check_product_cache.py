@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+商品读缓存自检
+
+校验：L1/L2 命中、版本号失效、库存变化只删详情（售罄时失效列表）、
+并发未命中只加载一次，并输出命中统计和有无缓存的耗时对比。
+需要可用的 PostgreSQL（读取 DATABASE_URL）；Redis 默认使用 fakeredis，--real 使用 REDIS_URL。
+
+用法: python dev_checks/check_product_cache.py [--real]
+"""
+import sys
+import os
+import time
+import asyncio
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.core.cache import cache_stats
+from app.models import Merchant, Product
+from app.services.inventory_service import inventory
+from app.services.product_service import product, product_list_cache, product_detail_cache
+
+ROUNDS = 2000
+
+
+async def main(real: bool):
+    if real:
+        from redis import asyncio as aioredis
+        redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    else:
+        import fakeredis
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with Session() as db:
+        merchant = Merchant(name="bench-cache", contact_phone="00000000000")
+        db.add(merchant)
+        await db.flush()
+        products = [
+            Product(merchant_id=merchant.id, name=f"cache-{i}", original_price=2, price=1,
+                    stock=1 if i == 0 else 100, is_recommended=True)
+            for i in range(30)
+        ]
+        db.add_all(products)
+        await db.commit()
+        merchant_id, first_id = merchant.id, products[0].id
+
+    await product.invalidate_cache(redis)
+
+    try:
+        async with Session() as db:
+            loads = 0
+            search = product.search_products
+
+            async def counting_search(*args, **kwargs):
+                nonlocal loads
+                loads += 1
+                return await search(*args, **kwargs)
+
+            # 并发未命中只加载一次
+            product.search_products = counting_search
+            pages = await asyncio.gather(*(
+                product.search_products_cached(db, redis, merchant_id=merchant_id, limit=20)
+                for _ in range(50)
+            ))
+            product.search_products = search
+            assert loads == 1, f"并发未命中加载了 {loads} 次"
+            assert pages[0].total == 30 and len(pages[0].items) == 20
+
+            # L1 命中
+            await product.search_products_cached(db, redis, merchant_id=merchant_id, limit=20)
+            assert product_list_cache.stats["l1_hits"] >= 1
+
+            # L2 命中（清空本进程 L1 模拟其他进程）
+            product_list_cache.local.clear()
+            await product.search_products_cached(db, redis, merchant_id=merchant_id, limit=20)
+            assert product_list_cache.stats["l2_hits"] == 1
+
+            # 详情缓存与库存失效
+            detail = await product.get_product_detail_cached(db, redis, first_id)
+            assert detail["product"]["stock"] == 1
+            invalidations = product_list_cache.stats["invalidations"]
+
+            stocks = await inventory.reserve(db, {first_id: 1})
+            await db.commit()
+            await product.invalidate_stock(redis, stocks, {first_id: -1})
+            detail = await product.get_product_detail_cached(db, redis, first_id)
+            assert detail["product"]["stock"] == 0, "库存变化后详情未失效"
+            assert product_list_cache.stats["invalidations"] == invalidations + 1, "售罄后列表未失效"
+
+            # 不存在的商品也缓存（防穿透）
+            assert await product.get_product_detail_cached(db, redis, -1) is None
+            assert await product.get_product_detail_cached(db, redis, -1) is None
+
+            # 耗时对比
+            started = time.perf_counter()
+            for _ in range(ROUNDS // 10):
+                await product.search_products(db, merchant_id=merchant_id, limit=20)
+            uncached = (time.perf_counter() - started) / (ROUNDS // 10) * 1e6
+
+            started = time.perf_counter()
+            for _ in range(ROUNDS):
+                await product.search_products_cached(db, redis, merchant_id=merchant_id, limit=20)
+            cached = (time.perf_counter() - started) / ROUNDS * 1e6
+    finally:
+        async with Session() as db:
+            await db.execute(delete(Merchant).where(Merchant.id == merchant_id))
+            await db.commit()
+        await engine.dispose()
+        await product.invalidate_cache(redis)
+        await redis.aclose()
+
+    print(f"search_products (db)     : {uncached:8.1f} us/op")
+    print(f"search_products (cached) : {cached:8.1f} us/op")
+    for namespace, stats in cache_stats().items():
+        print(f"{namespace}: {stats}")
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main("--real" in sys.argv))
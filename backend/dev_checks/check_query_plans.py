@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+服务层查询执行计划检查
+
+按真实分布灌入数据（大量用户，每个用户少量订单/消息/签到/优惠券等），
+ANALYZE 后调用服务层方法，截获实际发出的 SQL，逐条 EXPLAIN，
+任一语句对灌数表出现 Seq Scan 即失败（退出码 1）。
+需要可用的 PostgreSQL（读取 DATABASE_URL），表结构需与 ORM 模型一致。
+数据量过小时规划器本就倾向全表扫描，请使用默认规模（2万用户）或更大。
+
+用法: python dev_checks/check_query_plans.py [用户数]
+"""
+import sys
+import os
+import json
+import asyncio
+from datetime import datetime, timedelta
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import event, select, delete, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models import User, Merchant, Activity, Coupon
+from app.services.order_service import order
+from app.services.message_service import internal_message
+from app.services.activity_service import activity, discount, user_coupon
+from app.services.points_service import points_record, sign_in_record
+from app.services.product_service import product
+
+SEEDED_TABLES = {
+    "users", "orders", "order_items", "order_logs", "internal_messages", "activity_records",
+    "sign_in_records", "points_records", "user_coupons", "products", "product_images",
+}
+TAG = "plan-check"
+
+SEED_SQL = [
+    """
+    INSERT INTO users (openid, nickname, total_points, status, created_at, updated_at)
+    SELECT :tag || '-' || g, 'u' || g, 0, 1, now(), now() FROM generate_series(1, :users) AS g
+    """,
+    """
+    INSERT INTO products (merchant_id, name, original_price, price, stock, status, sales_count,
+                          is_recommended, is_hot, is_group_buy, created_at, updated_at)
+    SELECT :merchant_id, 'p' || g, 2, 1, 10, 1, 0, false, false, false, now(), now()
+    FROM generate_series(1, :users) AS g
+    """,
+    """
+    INSERT INTO product_images (product_id, image_url, sort_order, created_at, updated_at)
+    SELECT p.id, 'img/' || p.id || '/' || g, g, now(), now()
+    FROM products p, generate_series(1, 3) AS g WHERE p.merchant_id = :merchant_id
+    """,
+    """
+    INSERT INTO orders (order_no, user_id, total_amount, final_amount, status, delivery_type, created_at, updated_at)
+    SELECT :tag || '-' || u.id || '-' || g, u.id, 10, 10,
+           (ARRAY['pending','paid','preparing','completed','cancelled'])[g]::order_status, 1,
+           now() - make_interval(days => g), now()
+    FROM users u, generate_series(1, 5) AS g WHERE u.openid LIKE :tag || '-%'
+    """,
+    """
+    INSERT INTO order_items (order_id, product_name, price, quantity, subtotal, created_at, updated_at)
+    SELECT o.id, 'p', 1, 2, 2, now(), now()
+    FROM orders o, generate_series(1, 2) AS g WHERE o.order_no LIKE :tag || '-%'
+    """,
+    """
+    INSERT INTO order_logs (order_id, status, remark, created_at, updated_at)
+    SELECT o.id, o.status, 'seed', now(), now() FROM orders o WHERE o.order_no LIKE :tag || '-%'
+    """,
+    """
+    INSERT INTO internal_messages (user_id, title, content, message_type, is_read, created_at, updated_at)
+    SELECT u.id, 't', 'c', 1, g % 3 = 0, now() - make_interval(hours => g), now()
+    FROM users u, generate_series(1, 6) AS g WHERE u.openid LIKE :tag || '-%'
+    """,
+    """
+    INSERT INTO activity_records (user_id, activity_id, record_date, display_count, created_at, updated_at)
+    SELECT u.id, a.id, to_char(current_date - g, 'YYYY-MM-DD'), 1, now(), now()
+    FROM users u
+    JOIN activities a ON a.title = :tag AND a.id % 50 = u.id % 50
+    CROSS JOIN generate_series(0, 2) AS g
+    WHERE u.openid LIKE :tag || '-%'
+    """,
+    """
+    INSERT INTO sign_in_records (user_id, sign_date, points, created_at, updated_at)
+    SELECT u.id, to_char(current_date - g, 'YYYY-MM-DD'), 5, now(), now()
+    FROM users u, generate_series(0, 6) AS g WHERE u.openid LIKE :tag || '-%'
+    """,
+    """
+    INSERT INTO points_records (user_id, change_type, points, source_type, created_at, updated_at)
+    SELECT u.id, 1 + g % 2, 5, 1, now() - make_interval(days => g), now()
+    FROM users u, generate_series(0, 7) AS g WHERE u.openid LIKE :tag || '-%'
+    """,
+    """
+    INSERT INTO user_coupons (user_id, coupon_id, status, expire_at, created_at, updated_at)
+    SELECT u.id, c.id, g % 3, now() + make_interval(days => g), now(), now()
+    FROM users u
+    CROSS JOIN generate_series(0, 3) AS g
+    JOIN coupons c ON c.name = :tag AND c.id % 50 = (u.id + g) % 50
+    WHERE u.openid LIKE :tag || '-%'
+    """,
+]
+
+
+def seq_scans(plan: dict):
+    """递归找出计划树中的 Seq Scan 节点所扫描的表"""
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan.get("Relation Name")
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+async def main(users: int):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    now = datetime.utcnow()
+
+    async with Session() as db:
+        merchant = Merchant(name=TAG, contact_phone="00000000000")
+        db.add(merchant)
+        db.add_all(
+            Activity(title=TAG, display_type=1, start_at=now - timedelta(days=1), end_at=now + timedelta(days=30))
+            for _ in range(50)
+        )
+        db.add_all(Coupon(name=TAG, coupon_type=1, valid_days=7) for _ in range(50))
+        await db.commit()
+        merchant_id = merchant.id
+
+        params = {"tag": TAG, "users": users, "merchant_id": merchant_id}
+        for sql in SEED_SQL:
+            await db.execute(text(sql), params)
+        await db.commit()
+        for table in sorted(SEEDED_TABLES):
+            await db.execute(text(f"ANALYZE {table}"))
+
+        user_id = (await db.execute(select(User.id).where(User.openid == f"{TAG}-{users // 2}"))).scalar_one()
+        activity_id = (await db.execute(select(Activity.id).where(Activity.title == TAG).limit(1))).scalar_one()
+        coupon_id = (await db.execute(select(Coupon.id).where(Coupon.name == TAG).limit(1))).scalar_one()
+        order_id = (await db.execute(text(
+            "SELECT id FROM orders WHERE user_id = :user_id LIMIT 1"), {"user_id": user_id})).scalar_one()
+        product_ids = (await db.execute(text(
+            "SELECT id FROM products WHERE merchant_id = :merchant_id ORDER BY id LIMIT 20"),
+            {"merchant_id": merchant_id})).scalars().all()
+
+    cases = {
+        "order.get_user_orders": lambda db: order.get_user_orders(db, user_id, limit=10),
+        "order.get_user_orders(status)": lambda db: order.get_user_orders(db, user_id, status="paid"),
+        "order.get_user_orders(status list)": lambda db: order.get_user_orders(
+            db, user_id, status=["paid", "preparing"], include_items=True),
+        "order.get_with_details": lambda db: order.get_with_details(db, order_id),
+        "internal_message.get_user_messages": lambda db: internal_message.get_user_messages(db, user_id),
+        "internal_message.get_unread_count": lambda db: internal_message.get_unread_count(db, user_id),
+        "internal_message.mark_all_read": lambda db: internal_message.mark_all_read(db, user_id),
+        "activity.record_activity_display": lambda db: activity.record_activity_display(db, user_id, activity_id),
+        "activity.get_activity_stats": lambda db: activity.get_activity_stats(db, activity_id),
+        "sign_in_record.check_today_signed": lambda db: sign_in_record.check_today_signed(db, user_id),
+        "points_record.get_user_summary": lambda db: points_record.get_user_summary(db, user_id),
+        "points_record.get_user_records": lambda db: points_record.get_user_records(db, user_id, change_type=1),
+        "discount.get_user_coupons_with_status": lambda db: discount.get_user_coupons_with_status(db, user_id),
+        "discount.get_user_coupons_paginated": lambda db: discount.get_user_coupons_paginated(
+            db, user_id, status=0),
+        "user_coupon.issue_coupon": lambda db: user_coupon.issue_coupon(db, user_id, coupon_id),
+        "product.get_main_images": lambda db: product.get_main_images(db, product_ids),
+        "product.get_product_detail": lambda db: product.get_product_detail(db, product_ids[0]),
+    }
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            captured.append((statement, parameters))
+
+    failures = []
+    try:
+        for name, call in cases.items():
+            captured.clear()
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            try:
+                async with Session() as db:
+                    await call(db)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+            statements = list(captured)
+            async with engine.connect() as conn:
+                for statement, parameters in statements:
+                    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                    plan = result.scalar()
+                    plan = json.loads(plan) if isinstance(plan, str) else plan
+                    scanned = sorted(set(seq_scans(plan[0]["Plan"])) & SEEDED_TABLES)
+                    status = "SEQ SCAN " + ",".join(scanned) if scanned else "ok"
+                    print(f"{name:<40} {status:<30} {' '.join(statement.split())[:90]}")
+                    if scanned:
+                        failures.append((name, scanned, statement))
+    finally:
+        async with Session() as db:
+            await db.execute(delete(User).where(User.openid.like(f"{TAG}-%")))
+            await db.execute(delete(Activity).where(Activity.title == TAG))
+            await db.execute(delete(Coupon).where(Coupon.name == TAG))
+            await db.execute(delete(Merchant).where(Merchant.id == merchant_id))
+            await db.commit()
+        await engine.dispose()
+
+    if failures:
+        print(f"\n{len(failures)} 条查询出现全表扫描")
+        sys.exit(1)
+    print("\n所有查询均走索引")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+签到日历（Redis 位图）校验与压测（默认使用 fakeredis TCP 服务，需要 pip install fakeredis）
+
+灌入几个用户跨 3 个月的签到记录（含断签、跨月连续），校验：
+- 月历、今天是否签到、连续签到天数与按签到记录计算（原实现）一致，Redis 不可用时结果相同
+- 位图按需加载；签到后写穿置位；未加载的 key 上先置位不影响之后的加载
+- 篡改位图后 rebuild 按签到记录恢复，clear 删除全部位图
+并对比早高峰"今天是否签到"检查：数据库查询 vs 位图，以及连续签到天数计算。
+需要可用的 PostgreSQL（读取 DATABASE_URL）。
+
+用法:
+    python dev_checks/check_sign_in_calendar.py [并发检查数]
+    python dev_checks/check_sign_in_calendar.py 2000 --real   # 使用 REDIS_URL 的真实Redis
+"""
+import sys
+import os
+import time
+import asyncio
+import threading
+from collections import Counter
+from datetime import datetime, date, timedelta
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from redis import asyncio as aioredis
+from sqlalchemy import event, select, delete, desc
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models import User, SignInRecord
+from app.services.points_service import sign_in_record
+from app.services.sign_in_calendar_service import sign_in_calendar, prev_month
+
+TAG = "bench-sign-calendar"
+
+
+def start_redis() -> str:
+    if "--real" in sys.argv:
+        return settings.REDIS_URL
+    from fakeredis import TcpFakeServer
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return f"redis://{host}:{port}/0"
+
+
+async def legacy_streak(db: AsyncSession, user_id: int) -> int:
+    """原实现：读出全部签到日期逐个比较"""
+    dates = (await db.execute(select(SignInRecord.sign_date).where(SignInRecord.user_id == user_id)
+                              .order_by(desc(SignInRecord.sign_date)))).scalars().all()
+    today = datetime.now().strftime("%Y-%m-%d")
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    if not dates or dates[0] not in (today, yesterday):
+        return 0
+    consecutive = 1
+    for i in range(1, len(dates)):
+        if (datetime.strptime(dates[i - 1], "%Y-%m-%d") - datetime.strptime(dates[i], "%Y-%m-%d")).days != 1:
+            break
+        consecutive += 1
+    return consecutive
+
+
+async def legacy_month(db: AsyncSession, user_id: int, year: int, month: int) -> list:
+    dates = (await db.execute(select(SignInRecord.sign_date).where(
+        SignInRecord.user_id == user_id, SignInRecord.sign_date.like(f"{year}-{month:02d}-%")))).scalars().all()
+    return sorted(int(d[8:]) for d in dates)
+
+
+async def check_user(redis, db, user_id: int, today: date):
+    months = [(today.year, today.month)]
+    for _ in range(2):
+        months.append(prev_month(*months[-1]))
+    for client in (redis, None):
+        for year, month in months:
+            data = await sign_in_calendar.month_calendar(client, db, user_id, year, month, today)
+            assert data["days"] == await legacy_month(db, user_id, year, month), (user_id, year, month, data)
+            assert data["sign_count"] == len(data["days"])
+            assert data["consecutive_days"] == await legacy_streak(db, user_id), (user_id, data)
+            assert data["signed_today"] == await sign_in_record.check_today_signed(db, user_id)
+
+
+async def main(concurrency: int):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
+                                 pool_size=20, max_overflow=0)
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    # 与应用相同的有上限连接池
+    redis = aioredis.Redis(connection_pool=aioredis.BlockingConnectionPool.from_url(
+        start_redis(), decode_responses=True, max_connections=settings.REDIS_MAX_CONNECTIONS
+    ))
+    today = datetime.now().date()
+
+    # A: 最近 75 天每天签到，40 天前断签一天（连续签到跨月）；B: 只有昨天；C: 没有签到
+    async with Session() as db:
+        users = [User(openid=f"{TAG}-{i}", nickname="bench") for i in range(3)]
+        db.add_all(users)
+        await db.flush()
+        a, b, c = (u.id for u in users)
+        db.add_all(SignInRecord(user_id=a, sign_date=(today - timedelta(days=d)).strftime("%Y-%m-%d"), points=5)
+                   for d in range(1, 76) if d != 40)
+        db.add(SignInRecord(user_id=b, sign_date=(today - timedelta(days=1)).strftime("%Y-%m-%d"), points=5))
+        await db.commit()
+
+    try:
+        async with Session() as db:
+            for user_id in (a, b, c):
+                await check_user(redis, db, user_id, today)
+            assert await redis.exists(sign_in_calendar.key(a, today.year, today.month))
+            assert await sign_in_calendar.streak(redis, db, a, today) == 39
+        print("calendar / signed today / streak match sign_in_records (redis and fallback): OK")
+
+        # 签到写穿：A 今天签到，连续 +1；C 在未加载的 key 上先置位，之后的加载仍完整
+        async with Session() as db:
+            for user_id in (a, c):
+                record = await sign_in_record.sign_in(db, user_id, 5)
+                await sign_in_calendar.mark(redis, user_id, record.sign_date)
+            assert await sign_in_calendar.streak(redis, db, a, today) == 40
+            assert await sign_in_calendar.is_signed(redis, db, c, today)
+            for user_id in (a, b, c):
+                await check_user(redis, db, user_id, today)
+        print("write-through mark after sign-in: OK")
+
+        # 篡改后重建恢复；clear 删除全部位图
+        async with Session() as db:
+            key = sign_in_calendar.key(b, *prev_month(today.year, today.month))
+            await redis.setbit(key, 0, 1)
+            months = [(today.year, today.month)]
+            for _ in range(2):
+                months.append(prev_month(*months[-1]))
+            assert await sign_in_calendar.rebuild(redis, db, months, batch_size=2) >= 3
+            for user_id in (a, b, c):
+                await check_user(redis, db, user_id, today)
+            assert await sign_in_calendar.clear(redis) >= 3
+            assert not await redis.keys(f"sign:calendar:{{{a}}}:*")
+        print("rebuild repairs drift / clear: OK")
+
+        await bench(Session, engine, redis, a, today, concurrency)
+    finally:
+        async with Session() as db:
+            await db.execute(delete(User).where(User.id.in_([a, b, c])))
+            await db.commit()
+        for user_id in (a, b, c):
+            keys = await redis.keys(f"sign:calendar:{{{user_id}}}:*")
+            if keys:
+                await redis.delete(*keys)
+        await redis.aclose()
+        await engine.dispose()
+
+
+async def bench(Session, engine, redis, user_id: int, today: date, concurrency: int):
+    queries = Counter()
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: queries.update(["sql"]))
+
+    async with Session() as db:
+        await sign_in_calendar.month_calendar(redis, db, user_id, today.year, today.month, today)
+
+    async def spike(check) -> float:
+        """concurrency 个并发"今天是否签到"检查（各自一个会话，与接口相同）"""
+        async def one():
+            async with Session() as db:
+                assert await check(db)
+        queries.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+        return time.perf_counter() - started, queries["sql"]
+
+    db_elapsed, db_queries = await spike(lambda db: sign_in_record.check_today_signed(db, user_id))
+    bitmap_elapsed, bitmap_queries = await spike(lambda db: sign_in_calendar.is_signed(redis, db, user_id, today))
+    print(f"signed-today checks: {concurrency} concurrent (fakeredis is a single-threaded Python server)")
+    print(f"sign_in_records query: {db_elapsed * 1000:8.1f} ms  ({concurrency / db_elapsed:,.0f} checks/s)"
+          f"  db queries: {db_queries}")
+    print(f"bitmap (BITFIELD):     {bitmap_elapsed * 1000:8.1f} ms  ({concurrency / bitmap_elapsed:,.0f} checks/s)"
+          f"  db queries: {bitmap_queries}")
+
+    rounds = 200
+    async with Session() as db:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await legacy_streak(db, user_id)
+        legacy_ms = (time.perf_counter() - started) * 1000 / rounds
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await sign_in_calendar.month_calendar(redis, db, user_id, today.year, today.month, today)
+        calendar_ms = (time.perf_counter() - started) * 1000 / rounds
+    print(f"streak by walking all sign-ins: {legacy_ms:8.3f} ms")
+    print(f"month calendar + streak:        {calendar_ms:8.3f} ms  (bitmaps, no database query)")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    asyncio.run(main(int(args[0]) if args else 2000))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+并发签到校验与压测
+
+同一用户同时发起 N 个签到请求（一半走 /users/sign-in，一半走 /points/sign-in，直接调用端点函数，
+各自一个会话），校验只有一个成功、其余返回"今日已签到"，且：
+- 签到记录、积分记录各一条，用户积分只增加一次
+- 积分汇总的签到次数/获得积分/连续天数与明细一致
+并统计一次签到的 SQL 数与提交次数，以及多个用户同时签到的吞吐。
+需要可用的 PostgreSQL（读取 DATABASE_URL），不需要 Redis（签到日历降级为查表）。
+
+用法: python dev_checks/check_sign_in_concurrency.py [并发数] [用户数]
+"""
+import sys
+import os
+import time
+import asyncio
+from collections import Counter
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import event, select, delete, func
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models import User, PointRule, PointsRecord, SignInRecord
+from app.services.points_service import points_summary
+from app.api.v1.endpoints import users, points
+
+TAG = "bench-sign-in"
+RULE_POINTS = 10
+
+
+async def sign_in(Session, user_id: int, via_points: bool):
+    async with Session() as db:
+        if via_points:
+            current_user = await db.get(User, user_id)
+            response = await points.user_sign_in(current_user=current_user, db=db, redis=None)
+        else:
+            response = await users.sign_in(db=db, redis=None, current_user_id=user_id)
+    return response
+
+
+async def main(concurrency: int, user_count: int):
+    engine = create_async_engine(
+        settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
+        pool_size=40, max_overflow=40
+    )
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    counts = Counter()
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", lambda *args: counts.update(["sql"]))
+    event.listen(sync_engine, "commit", lambda conn: counts.update(["commit"]))
+
+    async with Session() as db:
+        rule = (await db.execute(select(PointRule).where(PointRule.rule_type == 1))).scalar_one_or_none()
+        created_rule = rule is None
+        if created_rule:
+            db.add(PointRule(rule_type=1, points=RULE_POINTS, description="bench"))
+        user_objs = [User(openid=f"{TAG}-{i}", nickname="bench") for i in range(user_count + 1)]
+        db.add_all(user_objs)
+        await db.commit()
+        rule_points = rule.points if rule else RULE_POINTS
+        user_id = user_objs[0].id
+        other_ids = [u.id for u in user_objs[1:]]
+
+    try:
+        # 同一用户并发签到
+        responses = await asyncio.gather(*(sign_in(Session, user_id, i % 2 == 1) for i in range(concurrency)))
+        succeeded = [r for r in responses if r.code == 200]
+        assert len(succeeded) == 1, [r.message for r in responses]
+        assert all("今日已签到" in r.message for r in responses if r.code != 200)
+
+        async with Session() as db:
+            total_points = await db.scalar(select(User.total_points).where(User.id == user_id))
+            sign_ins = await db.scalar(select(func.count()).where(SignInRecord.user_id == user_id))
+            records = await db.scalar(select(func.count()).where(PointsRecord.user_id == user_id))
+            summary = await points_summary.get_summary(db, user_id)
+            assert await points_summary.check(db, [user_id]) == []
+        assert (total_points, sign_ins, records) == (rule_points, 1, 1), (total_points, sign_ins, records)
+        assert summary == {"total_points": rule_points, "earned_points": rule_points, "spent_points": 0,
+                           "sign_count": 1, "consecutive_days": 1}, summary
+        print(f"{concurrency} concurrent sign-ins by one user: 1 succeeded, {concurrency - 1} rejected")
+        print("one sign-in record, one points record, points awarded once, summary consistent: OK")
+
+        # 单次签到的 SQL 数（规则已在缓存中）与重复签到
+        for label, target in (("first sign-in", other_ids[0]), ("double tap", other_ids[0])):
+            before = counts.copy()
+            response = await sign_in(Session, target, False)
+            used = counts - before
+            print(f"{label:<14} code {response.code}: {used['sql']} sql, {used['commit']} commit")
+
+        # 多个用户同时签到
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(sign_in(Session, uid, False) for uid in other_ids[1:]))
+        elapsed = time.perf_counter() - started
+        assert all(r.code == 200 for r in responses), [r.message for r in responses if r.code != 200]
+        async with Session() as db:
+            assert await points_summary.check(db, other_ids) == []
+        print(f"{len(responses)} users signing in concurrently: {elapsed * 1000:.1f} ms "
+              f"({len(responses) / elapsed:,.0f} sign-ins/s)")
+    finally:
+        async with Session() as db:
+            await db.execute(delete(User).where(User.id.in_([user_id] + other_ids)))
+            if created_rule:
+                await db.execute(delete(PointRule).where(PointRule.rule_type == 1))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    user_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    asyncio.run(main(concurrency, user_count))
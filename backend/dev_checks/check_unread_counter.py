@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+站内消息未读计数自检
+
+校验：首次读取从数据库回填、发送/已读/全部已读同步增减、计数器不存在时不累加、
+对账修正偏差，并对比旧实现（取出全部未读ID再 len）、COUNT(*) 与 Redis 计数器的耗时。
+需要可用的 PostgreSQL（读取 DATABASE_URL）；Redis 默认使用 fakeredis，--real 使用 REDIS_URL。
+
+用法: python dev_checks/check_unread_counter.py [未读消息数] [--real]
+"""
+import sys
+import os
+import time
+import asyncio
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+from sqlalchemy import select, delete, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models import User
+from app.models.message import InternalMessage
+from app.services.message_service import internal_message, message_service, unread_counter
+
+ROUNDS = 200
+
+
+async def timed(fn) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await fn()
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+
+async def main(unread: int, real: bool):
+    if real:
+        from redis import asyncio as aioredis
+        redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    else:
+        import fakeredis
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with Session() as db:
+        user = User(openid="check-unread", nickname="check")
+        db.add(user)
+        await db.flush()
+        user_id = user.id
+        await db.execute(
+            text("""
+                INSERT INTO internal_messages (user_id, title, content, message_type, is_read, created_at, updated_at)
+                SELECT :user_id, 'broadcast', 'c', 1, false, now(), now() FROM generate_series(1, :rows)
+            """),
+            {"user_id": user_id, "rows": unread}
+        )
+        await db.commit()
+    await unread_counter.invalidate(redis, [user_id])
+
+    try:
+        async with Session() as db:
+            assert await redis.get(unread_counter.key(user_id)) is None
+            assert await unread_counter.get(redis, db, user_id) == unread
+            assert int(await redis.get(unread_counter.key(user_id))) == unread
+
+            message = await message_service.send_internal_message(db, user_id, "t", "c", redis=redis)
+            assert await unread_counter.get(redis, db, user_id) == unread + 1
+
+            await internal_message.mark_as_read(db, message.id, user_id, redis=redis)
+            await internal_message.mark_as_read(db, message.id, user_id, redis=redis)  # 重复已读不重复扣减
+            assert await unread_counter.get(redis, db, user_id) == unread
+
+            # 未传 redis 的写入造成偏差，由对账修正
+            await message_service.send_internal_message(db, user_id, "t", "c")
+            assert await unread_counter.get(redis, db, user_id) == unread
+            assert await unread_counter.reconcile(redis, db) == 1
+            assert await unread_counter.get(redis, db, user_id) == unread + 1
+            assert await unread_counter.reconcile(redis, db) == 0
+
+            # 计数器不存在时不累加（避免从0开始计成错误值）
+            await unread_counter.invalidate(redis, [user_id])
+            await message_service.send_internal_message(db, user_id, "t", "c", redis=redis)
+            assert await redis.get(unread_counter.key(user_id)) is None
+            assert await unread_counter.get(redis, db, user_id) == unread + 2
+
+            async def materialize():
+                result = await db.execute(
+                    select(InternalMessage.id).where(
+                        InternalMessage.user_id == user_id, InternalMessage.is_read == False
+                    )
+                )
+                return len(result.all())
+
+            results = {
+                "len(ids)": await timed(materialize),
+                "COUNT(*)": await timed(lambda: internal_message.get_unread_count(db, user_id)),
+                "redis": await timed(lambda: unread_counter.get(redis, db, user_id)),
+            }
+
+            marked = await internal_message.mark_all_read(db, user_id, redis=redis)
+            assert marked == unread + 2
+            assert await unread_counter.get(redis, db, user_id) == 0
+            assert await internal_message.get_unread_count(db, user_id) == 0
+    finally:
+        async with Session() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await unread_counter.invalidate(redis, [user_id])
+        await redis.aclose()
+        await engine.dispose()
+
+    print(f"unread: {unread}, rounds: {ROUNDS}")
+    for name, ms in results.items():
+        print(f"{name:<10}: {ms:8.3f} ms")
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    asyncio.run(main(int(args[0]) if args else 5000, "--real" in sys.argv))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按内容寻址上传校验与压测
+
+用模拟的 Minio 客户端（内存存储，按带宽 time.sleep 模拟传输）和本地 PostgreSQL（storage_objects 引用数）校验：
+- 同一张图片并发上传 N 次只传输一次，返回同一URL，引用数为 N
+- 删除前 N-1 个引用时对象保留，删除最后一个引用时对象及其变体一并删除
+- 删除最后一个引用与相同内容上传并发时，结束后有引用的对象一定存在
+并对比首次上传与重复上传（只计算哈希 + stat_object）的耗时。
+需要可用的 PostgreSQL（读取 DATABASE_URL），不需要 MinIO 服务。
+
+用法: python dev_checks/check_upload_dedup.py [文件MB] [次数]
+"""
+import sys
+import os
+import time
+import random
+import asyncio
+import tempfile
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+import minio
+from minio.error import S3Error
+from starlette.datastructures import Headers, UploadFile
+
+BANDWIDTH = 50.0  # MB/s
+
+
+class FakeObject:
+    def __init__(self, object_name):
+        self.object_name = object_name
+
+
+class FakeMinio:
+    """模拟 Minio 客户端：内存存储，统计传输字节数"""
+
+    def __init__(self, *args, **kwargs):
+        self.objects = {}
+        self.transferred = 0
+        self.stats = 0
+
+    def bucket_exists(self, bucket_name):
+        return True
+
+    def put_object(self, bucket_name, object_name, data, length, content_type="application/octet-stream", **kwargs):
+        content = data.read(length)
+        assert len(content) == length
+        time.sleep(length / (BANDWIDTH * 1024 * 1024))
+        self.transferred += length
+        self.objects[object_name] = content
+
+    def stat_object(self, bucket_name, object_name):
+        self.stats += 1
+        time.sleep(0.002)
+        if object_name not in self.objects:
+            raise S3Error("NoSuchKey", "Object does not exist", object_name, "", "", None)
+        return FakeObject(object_name)
+
+    def remove_object(self, bucket_name, object_name):
+        self.objects.pop(object_name, None)
+
+    def list_objects(self, bucket_name, prefix="", recursive=False):
+        return [FakeObject(name) for name in list(self.objects) if name.startswith(prefix)]
+
+
+minio.Minio = FakeMinio
+
+from sqlalchemy import select, delete
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.storage import StorageObject
+from app.services.minio_storage import minio_storage
+
+settings.IMAGE_VARIANTS_ENABLED = False
+
+
+def make_upload(content: bytes, filename: str = "photo.JPG") -> UploadFile:
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spool.write(content)
+    spool.seek(0)
+    return UploadFile(file=spool, size=len(content), filename=filename,
+                      headers=Headers({"content-type": "image/jpeg"}))
+
+
+async def ref_count(object_name: str):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(StorageObject.ref_count).where(StorageObject.object_name == object_name))
+        return result.scalar_one_or_none()
+
+
+async def main(size_mb: int, copies: int):
+    client = minio_storage.client
+    content = os.urandom(size_mb * 1024 * 1024)
+    try:
+        # 首次上传
+        started = time.perf_counter()
+        url = await minio_storage.upload_file(make_upload(content), folder="bench-dedup")
+        first_ms = (time.perf_counter() - started) * 1000
+        object_name = minio_storage.object_name_from_url(url)
+        assert object_name.endswith(".jpg"), object_name
+
+        # 重复上传（并发）
+        started = time.perf_counter()
+        urls = await minio_storage.upload_multiple_files(
+            [make_upload(content) for _ in range(copies - 1)], folder="bench-dedup"
+        )
+        repeat_ms = (time.perf_counter() - started) * 1000 / (copies - 1)
+        assert set(urls) == {url}
+        assert client.transferred == len(content), "重复内容被再次传输"
+        assert await ref_count(object_name) == copies
+
+        other = await minio_storage.upload_file(make_upload(content[:-1] + b"x"), folder="bench-dedup")
+        assert other != url
+        transferred = client.transferred
+
+        # 引用计数删除（模拟图片变体，最后一次删除时一并清理）
+        client.objects[object_name[:-len(".jpg")] + "/thumb.webp"] = b"v"
+        for _ in range(copies - 1):
+            assert await minio_storage.delete_file(object_name)
+        assert object_name in client.objects and await ref_count(object_name) == 1
+        assert await minio_storage.delete_file(object_name)
+        assert not any(name.startswith(object_name[:-len(".jpg")]) for name in client.objects)
+        assert await ref_count(object_name) is None
+
+        # 并发：删除最后一个引用的同时上传相同内容
+        small = os.urandom(64 * 1024)
+        for _ in range(20):
+            small_url = await minio_storage.upload_file(make_upload(small), folder="bench-dedup")
+            small_name = minio_storage.object_name_from_url(small_url)
+            ops = [minio_storage.delete_file(small_name)] + [
+                minio_storage.upload_file(make_upload(small), folder="bench-dedup")
+                for _ in range(random.randint(1, 3))
+            ]
+            random.shuffle(ops)
+            await asyncio.gather(*ops)
+            refs = await ref_count(small_name)
+            assert refs is None or small_name in client.objects, "有引用但对象已被删除"
+            while await ref_count(small_name):
+                await minio_storage.delete_file(small_name)
+            assert small_name not in client.objects
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(StorageObject).where(StorageObject.object_name.like("bench-dedup/%")))
+            await db.commit()
+        await engine.dispose()
+        minio_storage.shutdown()
+
+    print(f"file: {size_mb} MB, uploads: {copies}, simulated bandwidth: {BANDWIDTH} MB/s")
+    print(f"first upload:    {first_ms:8.1f} ms")
+    print(f"repeat upload:   {repeat_ms:8.1f} ms (hash + stat_object, concurrency {settings.MINIO_UPLOAD_CONCURRENCY})")
+    print(f"bytes transferred: {transferred / 1024 / 1024:.1f} MB for {copies + 1} uploads of 2 distinct files")
+    print("refcount delete / concurrent delete+upload: OK")
+
+
+if __name__ == "__main__":
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(main(size_mb, copies))
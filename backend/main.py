@@ -1,12 +1,20 @@
 """
 FastAPI主应用入口
 """
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from app.core.config import settings
 from app.core.database import engine
+from app.core.cache import cache_stats
+from app.core.response import ORJSONResponse
+from app.core.security import get_current_admin
+from app.core.redis import init_redis, close_redis, get_redis_client, redis_pool_stats
+from app.services.minio_storage import minio_storage
+from app.services.order_no_service import order_no_generator
+from app.tasks.order_expiry import expiry_stats
 from app.api import api_router
 
 
@@ -14,9 +22,33 @@ from app.api import api_router
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时执行
+    init_redis()
+    background_tasks = []
+    if settings.FLASH_STOCK_ENABLED:
+        from app.tasks import flash_stock_sync
+        background_tasks.append(asyncio.create_task(flash_stock_sync.run()))
+    if settings.MESSAGE_UNREAD_RECONCILE_INTERVAL > 0:
+        from app.tasks import unread_reconcile
+        background_tasks.append(asyncio.create_task(unread_reconcile.run()))
+    if settings.NOTIFICATION_WORKER_ENABLED:
+        from app.tasks import notification_worker
+        background_tasks.append(asyncio.create_task(notification_worker.run()))
+    if settings.ORDER_EXPIRY_ENABLED:
+        from app.tasks import order_expiry
+        background_tasks.append(asyncio.create_task(order_expiry.run()))
+
     print("FastAPI started")
     yield
+
     # 关闭时执行
+    for task in background_tasks:
+        task.cancel()
+    for task in background_tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+    await order_no_generator.release(get_redis_client())
+    await close_redis()
+    minio_storage.shutdown()
     print("FastAPI stopped")
 
 
@@ -25,7 +57,8 @@ app = FastAPI(
     title="灵鲜好物 API",
     description="微信小程序卖菜平台后端API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # 配置CORS
@@ -59,3 +92,14 @@ async def health_check():
         "status": "healthy",
         "version": "1.0.0"
     }
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", dependencies=[Depends(get_current_admin)])
+    async def metrics():
+        """运行指标（缓存命中率、Redis连接池使用情况、超时订单取消数等，按进程统计，需要管理员Token）"""
+        return {
+            "cache": cache_stats(),
+            "redis_pool": redis_pool_stats(),
+            "order_expiry": expiry_stats()
+        }
@@ -35,10 +35,12 @@ DROP TABLE IF EXISTS activities CASCADE;
 DROP TABLE IF EXISTS pickup_points CASCADE;
 DROP TABLE IF EXISTS delivery_zones CASCADE;
 
+DROP TABLE IF EXISTS storage_objects CASCADE;
 DROP TABLE IF EXISTS product_images CASCADE;
 DROP TABLE IF EXISTS products CASCADE;
 DROP TABLE IF EXISTS categories CASCADE;
 
+DROP TABLE IF EXISTS user_points_summary CASCADE;
 DROP TABLE IF EXISTS points_records CASCADE;
 DROP TABLE IF EXISTS sign_in_records CASCADE;
 DROP TABLE IF EXISTS user_addresses CASCADE;
@@ -181,8 +183,23 @@ CREATE TABLE points_records (
 CREATE INDEX idx_points_user ON points_records(user_id);
 CREATE INDEX idx_points_type ON points_records(type);
 CREATE INDEX idx_points_created ON points_records(created_at);
+CREATE INDEX idx_points_user_created_id ON points_records(user_id, created_at, id);
 COMMENT ON TABLE points_records IS '积分记录表';
 
+-- 3.5 用户积分汇总表（写入积分/签到记录时增量维护）
+CREATE TABLE user_points_summary (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    earned_points INTEGER NOT NULL DEFAULT 0,
+    spent_points INTEGER NOT NULL DEFAULT 0,
+    sign_count INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    last_sign_date VARCHAR(10),                 -- YYYY-MM-DD
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE user_points_summary IS '用户积分汇总表';
+
 -- ============================================
 -- 四、商品相关表
 -- ============================================
@@ -222,11 +239,13 @@ CREATE TABLE products (
     group_max_count INTEGER DEFAULT 0,          -- 拼团最多人数，0表示不限
     group_expire_hours INTEGER DEFAULT 24,      -- 拼团过期时间（小时）
     is_active BOOLEAN DEFAULT TRUE,
+    search_vector TSVECTOR,                     -- 搜索词项（由后端写入）
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX idx_products_merchant ON products(merchant_id);
+CREATE INDEX idx_products_search ON products USING gin(search_vector);
 CREATE INDEX idx_products_category ON products(category_id);
 CREATE INDEX idx_products_active ON products(is_active);
 CREATE INDEX idx_products_recommend ON products(is_recommended, is_active);
@@ -239,6 +258,7 @@ CREATE TABLE product_images (
     id SERIAL PRIMARY KEY,
     product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
     image_url VARCHAR(500) NOT NULL,
+    variants TEXT,
     sort_order INTEGER DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -246,6 +266,20 @@ CREATE TABLE product_images (
 CREATE INDEX idx_images_product ON product_images(product_id);
 COMMENT ON TABLE product_images IS '商品图片表';
 
+-- 4.4 上传对象表（按内容寻址，引用计数）
+CREATE TABLE storage_objects (
+    id SERIAL PRIMARY KEY,
+    object_name VARCHAR(255) NOT NULL UNIQUE,   -- MinIO对象名: {目录}/{sha256}{扩展名}
+    sha256 VARCHAR(64) NOT NULL,
+    size BIGINT NOT NULL,
+    content_type VARCHAR(100),
+    ref_count INTEGER NOT NULL DEFAULT 1,       -- 每次上传 +1，删除 -1，为 0 时删除对象
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE storage_objects IS '上传对象表';
+
 -- ============================================
 -- 五、配送相关表
 -- ============================================
@@ -405,6 +439,9 @@ CREATE INDEX idx_orders_user ON orders(user_id);
 CREATE INDEX idx_orders_merchant ON orders(merchant_id);
 CREATE INDEX idx_orders_status ON orders(status);
 CREATE INDEX idx_orders_created ON orders(created_at);
+CREATE INDEX idx_orders_created_id ON orders(created_at, id);
+CREATE INDEX idx_orders_status_created_id ON orders(status, created_at, id);
+CREATE INDEX idx_orders_user_status_created ON orders(user_id, status, created_at);
 CREATE INDEX idx_orders_no ON orders(order_no);
 COMMENT ON TABLE orders IS '订单表';
 
@@ -523,12 +560,17 @@ CREATE TABLE message_logs (
     send_status SMALLINT DEFAULT 0,             -- 0-待发送 1-已发送 2-发送失败
     error_msg TEXT,
     send_time TIMESTAMP,
+    retry_count INTEGER NOT NULL DEFAULT 0,     -- 已重试次数
+    next_retry_at TIMESTAMP,                    -- 下次可发送时间（待发送记录）
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX idx_msg_logs_user ON message_logs(user_id);
 CREATE INDEX idx_msg_logs_type ON message_logs(message_type);
 CREATE INDEX idx_msg_logs_status ON message_logs(send_status);
+CREATE INDEX idx_msg_logs_created_id ON message_logs(created_at, id);
+CREATE INDEX idx_msg_logs_user_created_id ON message_logs(user_id, created_at, id);
+CREATE INDEX idx_msg_logs_queue ON message_logs(next_retry_at) WHERE send_status = 0;
 COMMENT ON TABLE message_logs IS '消息发送记录表';
 
 -- 9.3 站内消息表
@@ -548,6 +590,8 @@ CREATE TABLE internal_messages (
 
 CREATE INDEX idx_internal_user ON internal_messages(user_id);
 CREATE INDEX idx_internal_read ON internal_messages(is_read);
+CREATE INDEX idx_internal_msgs_user_read ON internal_messages(user_id, is_read);
+CREATE INDEX idx_internal_msgs_user_created ON internal_messages(user_id, created_at);
 COMMENT ON TABLE internal_messages IS '站内消息表';
 
 -- 9.4 短信发送记录表
@@ -559,11 +603,14 @@ CREATE TABLE sms_logs (
     send_status SMALLINT DEFAULT 0,
     error_msg TEXT,
     send_time TIMESTAMP,
+    retry_count INTEGER NOT NULL DEFAULT 0,
+    next_retry_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX idx_sms_phone ON sms_logs(phone);
 CREATE INDEX idx_sms_status ON sms_logs(send_status);
+CREATE INDEX idx_sms_logs_queue ON sms_logs(next_retry_at) WHERE send_status = 0;
 COMMENT ON TABLE sms_logs IS '短信发送记录表';
 
 -- ============================================
@@ -0,0 +1,13 @@
+-- ============================================
+-- 游标分页索引
+-- 订单管理列表、消息发送记录、积分记录按 (created_at, id) 倒序做键集分页
+-- CONCURRENTLY 不锁表，需逐条执行（不能放在事务中）
+-- ============================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_created_id ON orders(created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_status_created_id ON orders(status, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_msg_logs_created_id ON message_logs(created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_msg_logs_user_created_id ON message_logs(user_id, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_points_user_created_id ON points_records(user_id, created_at, id);
@@ -0,0 +1,10 @@
+-- ============================================
+-- 商品搜索向量
+-- search_vector 由后端按 n-gram 切词写入（app/services/search_service.py），
+-- 执行后运行 scripts/rebuild-search-index.py 回填已有商品
+-- ============================================
+
+ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+COMMENT ON COLUMN products.search_vector IS '搜索向量';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_search ON products USING gin(search_vector);
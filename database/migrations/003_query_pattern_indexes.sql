@@ -0,0 +1,35 @@
+-- ============================================
+-- 按服务层查询模式补充的组合索引（与 ORM 模型 __table_args__ 一致）
+-- 校验: python backend/dev_checks/check_query_plans.py
+-- CONCURRENTLY 不锁表，需逐条执行（不能放在事务中）
+-- ============================================
+
+-- 用户订单列表（按状态筛选）
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_user_status_created ON orders(user_id, status, created_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_items_order ON order_items(order_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_logs_order ON order_logs(order_id);
+
+-- 站内消息：未读数 / 全部已读 / 消息列表
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_internal_msgs_user_read ON internal_messages(user_id, is_read);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_internal_msgs_user_created ON internal_messages(user_id, created_at);
+
+-- 活动展示记录
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_activity_records_user_activity_date ON activity_records(user_id, activity_id, record_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_activity_records_activity_date ON activity_records(activity_id, record_date);
+
+-- 签到、积分
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sign_in_user_date ON sign_in_records(user_id, sign_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_points_user_type ON points_records(user_id, change_type);
+
+-- 用户优惠券
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_coupons_user_status_expire ON user_coupons(user_id, status, expire_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_coupons_user_coupon ON user_coupons(user_id, coupon_id);
+
+-- 商品、图片
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_merchant ON products(merchant_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_category ON products(category_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_product_images_product_sort ON product_images(product_id, sort_order);
+
+-- 其他外键
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_group_buy_members_group ON group_buy_members(group_buy_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_addresses_user ON user_addresses(user_id);
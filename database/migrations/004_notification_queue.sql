@@ -0,0 +1,17 @@
+-- ============================================
+-- 消息发送队列
+-- message_logs / sms_logs 中 send_status = 0 的记录即待发送任务，
+-- 由后台 worker 用 FOR UPDATE SKIP LOCKED 领取（app/tasks/notification_worker.py）
+-- ============================================
+
+ALTER TABLE message_logs ADD COLUMN IF NOT EXISTS retry_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE message_logs ADD COLUMN IF NOT EXISTS next_retry_at TIMESTAMP;
+ALTER TABLE sms_logs ADD COLUMN IF NOT EXISTS retry_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE sms_logs ADD COLUMN IF NOT EXISTS next_retry_at TIMESTAMP;
+
+-- 升级前遗留的待发送记录立即进入队列
+UPDATE message_logs SET next_retry_at = created_at WHERE send_status = 0 AND next_retry_at IS NULL;
+UPDATE sms_logs SET next_retry_at = created_at WHERE send_status = 0 AND next_retry_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_msg_logs_queue ON message_logs(next_retry_at) WHERE send_status = 0;
+CREATE INDEX IF NOT EXISTS idx_sms_logs_queue ON sms_logs(next_retry_at) WHERE send_status = 0;
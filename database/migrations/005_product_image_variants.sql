@@ -0,0 +1,7 @@
+-- ============================================
+-- 商品图片变体
+-- 缩略图/中图/大图（JPEG + WebP）的访问URL，JSON 文本 {变体名称: {格式: URL}}，
+-- 为空时客户端使用原图 image_url
+-- ============================================
+
+ALTER TABLE product_images ADD COLUMN IF NOT EXISTS variants TEXT;
@@ -0,0 +1,16 @@
+-- ============================================
+-- 按内容寻址的上传对象
+-- 上传对象名为 {目录}/{sha256}{扩展名}，相同内容只存一份；
+-- ref_count 记录上传次数，删除时递减，为 0 时才删除 MinIO 对象
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS storage_objects (
+    id SERIAL PRIMARY KEY,
+    object_name VARCHAR(255) NOT NULL UNIQUE,
+    sha256 VARCHAR(64) NOT NULL,
+    size BIGINT NOT NULL,
+    content_type VARCHAR(100),
+    ref_count INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
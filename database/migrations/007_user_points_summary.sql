@@ -0,0 +1,19 @@
+-- ============================================
+-- 用户积分汇总
+-- 每个用户一行，物化累计获得/消耗积分、签到次数、连续签到天数和最后签到日期；
+-- 写入积分记录/签到记录时在同一事务内增量更新，/points/summary 只需一次主键查询。
+-- 执行后用 scripts/rebuild-points-summary.py 按明细回填已有用户
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS user_points_summary (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    earned_points INTEGER NOT NULL DEFAULT 0,
+    spent_points INTEGER NOT NULL DEFAULT 0,
+    sign_count INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    last_sign_date VARCHAR(10),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE user_points_summary IS '用户积分汇总表';
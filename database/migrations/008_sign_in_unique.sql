@@ -0,0 +1,27 @@
+-- ============================================
+-- 每天只能签到一次
+-- 签到改为 INSERT ... ON CONFLICT (user_id, sign_date) DO NOTHING RETURNING，
+-- 依赖 (user_id, sign_date) 唯一约束；init.sql 建的库已有该约束，按模型建的库只有普通索引。
+-- 先删除重复签到（保留最早一条），重复签到多发的积分不在此回收
+-- ============================================
+
+DELETE FROM sign_in_records a
+USING sign_in_records b
+WHERE a.user_id = b.user_id
+  AND a.sign_date = b.sign_date
+  AND a.id > b.id;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'sign_in_records'::regclass
+          AND conname = 'sign_in_records_user_id_sign_date_key'
+    ) THEN
+        ALTER TABLE sign_in_records
+            ADD CONSTRAINT sign_in_records_user_id_sign_date_key UNIQUE (user_id, sign_date);
+    END IF;
+END $$;
+
+-- 唯一约束的索引已覆盖 (user_id, sign_date) 查询
+DROP INDEX IF EXISTS idx_sign_in_user_date;
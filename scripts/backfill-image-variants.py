@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+为已有商品图片生成变体（缩略图/中图/大图，JPEG + WebP）
+
+执行 database/migrations/005_product_image_variants.sql 之后运行。
+只处理 product_images.variants 为空的记录；非本站 MinIO 的图片会跳过（客户端继续使用原图）。
+
+用法:
+    cd backend
+    python ../scripts/backfill-image-variants.py [--batch-size 100]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.core.redis import get_redis_client, close_redis
+from app.services.minio_storage import minio_storage
+from app.services.product_service import product, product_image
+
+
+async def backfill(batch_size: int):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with Session() as db:
+            updated = await product_image.backfill_variants(db, batch_size=batch_size)
+        if updated:
+            # 列表/详情缓存中没有变体URL，整体失效
+            await product.invalidate_cache(get_redis_client())
+    finally:
+        await close_redis()
+        await engine.dispose()
+        minio_storage.shutdown()
+    print(f"已为 {updated} 张商品图片生成变体")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='为已有商品图片生成变体')
+    parser.add_argument('--batch-size', '-b', type=int, default=100, help='每批图片数 (默认: 100)')
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+按积分记录和签到记录重建用户积分汇总（user_points_summary）
+
+执行 database/migrations/007_user_points_summary.sql 之后运行一次回填；
+之后可用 --check 检查汇总与明细是否一致（只读）。
+回填与线上签到/积分写入并发时，个别用户可能被覆盖为旧值，
+建议在低峰期执行，并对 --check 报告的用户用 --user-id 重新回填。
+
+用法:
+    cd backend
+    python ../scripts/rebuild-points-summary.py [--batch-size 1000] [--user-id 1 --user-id 2]
+    python ../scripts/rebuild-points-summary.py --check
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.points_service import points_summary
+
+
+async def user_batches(db: AsyncSession, batch_size: int):
+    """按主键分批遍历用户ID"""
+    last_id = 0
+    while True:
+        ids = (await db.execute(
+            select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+        )).scalars().all()
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+async def run(batch_size: int, user_ids: list, check: bool):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    processed = 0
+    mismatches = []
+    async with Session() as db:
+        batches = _once(user_ids) if user_ids else user_batches(db, batch_size)
+        async for ids in batches:
+            if check:
+                mismatches.extend(await points_summary.check(db, ids))
+                await db.rollback()
+            else:
+                await points_summary.rebuild(db, ids)
+            processed += len(ids)
+    await engine.dispose()
+
+    if not check:
+        print(f"已重建 {processed} 个用户的积分汇总")
+        return 0
+    for item in mismatches:
+        print(f"用户 {item['user_id']}: 汇总 {item['stored']} != 明细 {item['expected']}")
+    print(f"已检查 {processed} 个用户，不一致 {len(mismatches)} 个"
+          f"（字段: 获得积分, 消耗积分, 签到次数, 连续天数, 最后签到日期）")
+    return 1 if mismatches else 0
+
+
+async def _once(ids: list):
+    yield ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重建/检查用户积分汇总')
+    parser.add_argument('--batch-size', '-b', type=int, default=1000, help='每批用户数 (默认: 1000)')
+    parser.add_argument('--user-id', '-u', type=int, action='append', default=[], help='只处理指定用户（可重复）')
+    parser.add_argument('--check', action='store_true', help='只检查一致性，不写入')
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.batch_size, args.user_id, args.check)))
+
+
+if __name__ == '__main__':
+    main()
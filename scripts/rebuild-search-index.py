@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+重建商品搜索向量（products.search_vector）
+
+执行 database/migrations/002_product_search_vector.sql 之后、
+直接用 SQL 导入商品之后，或调整分词规则之后运行。
+
+用法:
+    cd backend
+    python ../scripts/rebuild-search-index.py [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.services.search_service import product_search
+
+
+async def rebuild(batch_size: int):
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as db:
+        updated = await product_search.rebuild(db, batch_size=batch_size)
+    await engine.dispose()
+    print(f"已重建 {updated} 个商品的搜索向量")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重建商品搜索向量')
+    parser.add_argument('--batch-size', '-b', type=int, default=1000, help='每批商品数 (默认: 1000)')
+    args = parser.parse_args()
+    asyncio.run(rebuild(args.batch_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+按签到记录重建签到日历位图（Redis sign:calendar:{user_id}:{yyyyMM}）
+
+位图在读取时按需从 sign_in_records 加载，一般不需要手动重建；
+Redis 数据丢失后预热最近几个月，或怀疑位图与签到记录不一致时运行。
+重建覆盖写入，与线上签到并发时个别用户可能丢失刚签到的一位，建议在低峰期执行。
+
+用法:
+    cd backend
+    python ../scripts/rebuild-sign-in-calendar.py [--months 2] [--batch-size 1000]
+    python ../scripts/rebuild-sign-in-calendar.py --clear   # 删除全部位图，之后按需重新加载
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.config import settings
+from app.core.redis import init_redis, close_redis
+from app.services.sign_in_calendar_service import sign_in_calendar, prev_month
+
+
+async def run(months: int, batch_size: int, clear: bool):
+    redis = init_redis()
+    try:
+        if clear:
+            deleted = await sign_in_calendar.clear(redis, batch_size=batch_size)
+            print(f"已删除 {deleted} 个签到日历位图")
+            return
+
+        today = date.today()
+        recent = [(today.year, today.month)]
+        while len(recent) < months:
+            recent.append(prev_month(*recent[-1]))
+
+        engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+        Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with Session() as db:
+            processed = await sign_in_calendar.rebuild(redis, db, recent, batch_size=batch_size)
+        await engine.dispose()
+        print(f"已重建 {processed} 个用户最近 {months} 个月的签到日历")
+    finally:
+        await close_redis()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重建签到日历位图')
+    parser.add_argument('--months', '-m', type=int, default=2, help='重建最近几个月（含当月，默认: 2）')
+    parser.add_argument('--batch-size', '-b', type=int, default=1000, help='每批用户数 (默认: 1000)')
+    parser.add_argument('--clear', action='store_true', help='删除全部位图，不重建')
+    args = parser.parse_args()
+    asyncio.run(run(max(args.months, 1), args.batch_size, args.clear))
+
+
+if __name__ == '__main__':
+    main()